@@ -0,0 +1,99 @@
+"""
+Measure worker cold start: module import time and time until the health probes pass.
+
+Usage (from the ai/ directory):
+    python -m benchmarks.cold_start --budget-live 3 --output cold_start.json
+
+Exits non-zero when a budget is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+AI_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    """Seconds taken by `import main` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=AI_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{out.stderr[-2000:]}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_probes(env: dict, timeout: float) -> dict:
+    """Seconds from process spawn until /api/health/live and /api/health/ready return 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=AI_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = {"live_seconds": None, "ready_seconds": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                for probe in ("live", "ready"):
+                    key = f"{probe}_seconds"
+                    if results[key] is not None:
+                        continue
+                    try:
+                        if client.get(f"/api/health/{probe}").status_code == 200:
+                            results[key] = round(time.perf_counter() - started, 3)
+                    except httpx.HTTPError:
+                        pass
+                if results["ready_seconds"] is not None:
+                    break
+                time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-import", type=float, default=None, help="Max seconds for `import main`")
+    parser.add_argument("--budget-live", type=float, default=None, help="Max seconds until /api/health/live is 200")
+    parser.add_argument("--budget-ready", type=float, default=None, help="Max seconds until /api/health/ready is 200")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up waiting for probes after this long")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    results = {"import_seconds": round(measure_import(env), 3), **measure_probes(env, args.timeout)}
+    budgets = {"import_seconds": args.budget_import, "live_seconds": args.budget_live, "ready_seconds": args.budget_ready}
+    failures = [
+        f"{key}={results[key]} exceeds budget {budget}"
+        for key, budget in budgets.items()
+        if budget is not None and (results[key] is None or results[key] > budget)
+    ]
+    results["budgets"] = {k: v for k, v in budgets.items() if v is not None}
+    results["within_budget"] = not failures
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"[BUDGET] {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
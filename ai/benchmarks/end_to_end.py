@@ -0,0 +1,278 @@
+"""
+Offline end-to-end benchmark of ingestion and chat through the real app.
+
+Starts the Voyage/OpenRouter stand-ins from `benchmarks.stubs`, launches the
+FastAPI app under uvicorn against them with Qdrant in in-memory local mode,
+ingests synthetic documents through /api/embedd/local, then fires chat
+requests at /api/chat. Reports ingestion throughput (chunks/s, MB/s), chat
+TTFT and total latency percentiles, and the server's peak RSS.
+
+Usage (from the ai/ directory):
+    python -m benchmarks.end_to_end --documents 20 --chat-requests 200 --concurrency 16 \
+        --output e2e.json --baseline previous_e2e.json
+
+No network access or API keys are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.stats import summarize
+from benchmarks.stubs import StubServer, add_arguments, config_from_args, free_port
+
+AI_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+VOCABULARY = (
+    "qdrant vector index embedding chunk document retrieval latency throughput cache "
+    "token stream provider router budget schedule answer context question section page "
+    "ingestion pipeline batch worker queue metric histogram quantile deadline request"
+).split()
+
+# Metrics compared against --baseline, with the direction that counts as better
+COMPARED = {
+    ("ingestion", "chunks_per_second"): "higher",
+    ("ingestion", "mb_per_second"): "higher",
+    ("chat", "ttft_seconds", "p50"): "lower",
+    ("chat", "ttft_seconds", "p95"): "lower",
+    ("chat", "total_seconds", "p95"): "lower",
+    ("chat", "requests_per_second"): "higher",
+    ("server", "peak_rss_mb"): "lower",
+}
+
+
+def synthetic_text(rng: random.Random, size_bytes: int) -> str:
+    words, length = [], 0
+    while length < size_bytes:
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        words.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(words)
+
+
+def app_env(stubs: StubServer, dim: int) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "VOYAGE_API_KEY": "benchmark",
+        "VOYAGE_BASE_URL": stubs.voyage_url,
+        "OPENROUTER_API_KEY": "benchmark",
+        "OPENROUTER_BASE_URL": stubs.openrouter_url,
+        "VECTOR_BACKEND": "qdrant",
+        "QDRANT_LOCATION": ":memory:",
+        "EMBEDDING_DIM": str(dim),
+        # Measure the uncached path; every chat question is distinct anyway
+        "ANSWER_CACHE_ENABLED": "false",
+        "COMPLETION_CACHE_ENABLED": "false",
+        "LLM_HEDGE_ROUTES": "",
+    }
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """High-water RSS of a process from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=base_url, timeout=1) as client:
+        while time.monotonic() < deadline:
+            try:
+                if client.get("/api/health/ready").status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+    raise RuntimeError(f"App not ready after {timeout}s")
+
+
+@contextmanager
+def running_app(stubs: StubServer, dim: int, timeout: float) -> Iterator[Tuple[str, subprocess.Popen]]:
+    """Run the app under uvicorn against the stubs; yields its base URL and process."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=AI_ROOT, env=app_env(stubs, dim), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(base_url, timeout)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def ingest(client: httpx.AsyncClient, paths: List[str], concurrency: int) -> Dict[str, object]:
+    slots = asyncio.Semaphore(concurrency)
+    document_ids: List[str] = []
+    chunks = 0
+    errors: List[str] = []
+
+    async def one(path: str) -> None:
+        nonlocal chunks
+        document_id = str(uuid.uuid4())
+        async with slots:
+            response = await client.post(
+                "/api/embedd/local", json={"file_path": [path], "document_id": document_id}, timeout=600
+            )
+        if response.status_code != 200:
+            errors.append(f"{response.status_code}: {response.text[:200]}")
+            return
+        chunks += sum(item.get("chunks_processed", 0) for item in response.json()["data"])
+        document_ids.append(document_id)
+
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in paths))
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": len(paths),
+        "chunks": chunks,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "mb_per_second": round(total_bytes / elapsed / 1e6, 3),
+        "errors": errors,
+        "document_ids": document_ids,
+    }
+
+
+async def chat(
+    client: httpx.AsyncClient, document_ids: List[str], requests: int, concurrency: int, rng: random.Random
+) -> Dict[str, object]:
+    slots = asyncio.Semaphore(concurrency)
+    ttfts: List[float] = []
+    totals: List[float] = []
+    errors: List[str] = []
+
+    async def one(i: int) -> None:
+        question = f"What does the section say about {rng.choice(VOCABULARY)} and {rng.choice(VOCABULARY)}? #{i}"
+        body = {"question": question, "documents": rng.sample(document_ids, min(2, len(document_ids)))}
+        async with slots:
+            started = time.perf_counter()
+            first = None
+            try:
+                async with client.stream("POST", "/api/chat", json=body, timeout=120) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        errors.append(f"{response.status_code}: {response.text[:200]}")
+                        return
+                    async for chunk in response.aiter_text():
+                        if chunk and first is None:
+                            first = time.perf_counter() - started
+            except httpx.HTTPError as e:
+                errors.append(str(e))
+                return
+            if first is None:
+                errors.append("empty response")
+                return
+            ttfts.append(first)
+            totals.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "ttft_seconds": summarize(ttfts),
+        "total_seconds": summarize(totals),
+        "requests_per_second": round(len(totals) / elapsed, 2),
+    }
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+    """Describe how each compared metric moved relative to a previous run."""
+    lines = []
+    for path, better in COMPARED.items():
+        current, previous = results, baseline
+        for key in path:
+            current = (current or {}).get(key)
+            previous = (previous or {}).get(key)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        improved = change > 0 if better == "higher" else change < 0
+        lines.append(f"{'.'.join(path):<28} {previous:>10} -> {current:<10} ({change:+.1f}%{', better' if improved else ''})")
+    return lines
+
+
+async def run(args: argparse.Namespace, base_url: str, workdir: str) -> Dict[str, object]:
+    rng = random.Random(args.seed)
+    paths = []
+    for i in range(args.documents):
+        path = os.path.join(workdir, f"doc_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_text(rng, args.document_kb * 1024))
+        paths.append(path)
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        ingestion = await ingest(client, paths, args.ingest_concurrency)
+        document_ids = ingestion.pop("document_ids")
+        if not document_ids:
+            raise RuntimeError(f"Ingestion failed: {ingestion['errors'][:3]}")
+        chat_results = await chat(client, document_ids, args.chat_requests, args.concurrency, rng)
+    return {"ingestion": ingestion, "chat": chat_results}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic documents to ingest")
+    parser.add_argument("--document-kb", type=int, default=64, help="Size of each document (KiB)")
+    parser.add_argument("--ingest-concurrency", type=int, default=2)
+    parser.add_argument("--chat-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent chat requests")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the app to become ready")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Previous --output file to compare against")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stub_config = config_from_args(args)
+    with StubServer(stub_config) as stubs, tempfile.TemporaryDirectory() as workdir:
+        with running_app(stubs, args.dim, args.timeout) as (base_url, proc):
+            results = asyncio.run(run(args, base_url, workdir))
+            results["server"] = {"peak_rss_mb": peak_rss_mb(proc.pid)}
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            "python": sys.version.split()[0],
+        },
+        **results,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+    return 0 if not results["ingestion"]["errors"] and not results["chat"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
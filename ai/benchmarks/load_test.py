@@ -0,0 +1,408 @@
+"""
+Load generator for the chat and ingestion APIs with concurrency or RPS sweeps.
+
+Each step holds a load level for --step-seconds, sending a weighted mix of
+request kinds:
+
+    chat_sse    POST /api/chat with Accept: text/event-stream (TTFT = first token event)
+    chat_text   POST /api/chat as plain text (TTFT = first chunk)
+    chat_json   POST /api/chat/llm with stream=false (one JSON body)
+    ingest      POST /api/embedd/local with a freshly written synthetic document
+
+Every stream is read to completion. A stream counts as an error unless it
+ends with its `done` event (SSE) or produces text (plain). For each step the
+report gives throughput, error rate, status codes (429/503 are admission
+control shedding), and TTFT and latency percentiles per kind. Steps sweep
+--concurrency (closed loop: N clients, each sending its next request as
+soon as the last one finishes) or --rps (open loop: fixed arrival rate),
+crossed with --documents-per-chat (how many documents each chat searches).
+With --ttft-p99-budget the report names the highest load level whose chat
+TTFT p99 stayed within budget.
+
+Usage (from the ai/ directory):
+    # Against a local app on the Voyage/OpenRouter stand-ins (offline)
+    python -m benchmarks.load_test --spawn --concurrency 1,8,16,32,64 --documents-per-chat 1,4 \
+        --mix chat_sse=8,chat_json=1,ingest=1 --step-seconds 20 --ttft-p99-budget 1.0 --output load.json
+
+    # Against a running worker; ingestion writes local files, so the server
+    # must share this filesystem (or pass --document-ids and leave ingest out of the mix)
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --rps 5,10,20 --mix chat_sse=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.end_to_end import VOCABULARY, peak_rss_mb, running_app, synthetic_text
+from benchmarks.stats import summarize
+from benchmarks.stubs import StubServer, add_arguments, config_from_args
+
+KINDS = ("chat_sse", "chat_text", "chat_json", "ingest")
+CHAT_KINDS = ("chat_sse", "chat_text", "chat_json")
+
+
+@dataclass
+class Outcome:
+    kind: str
+    status: int
+    latency: float
+    ttft: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Step:
+    mode: str  # "concurrency" or "rps"
+    level: float
+    documents_per_chat: int
+    outcomes: List[Outcome] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        unit = "c" if self.mode == "concurrency" else "rps"
+        return f"{self.level:g}{unit}/{self.documents_per_chat}docs"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown request kind '{kind}' (expected one of {', '.join(KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def parse_levels(text: Optional[str]) -> List[float]:
+    return [float(v) for v in text.split(",")] if text else []
+
+
+class LoadGenerator:
+    """Sends one request of a given kind and records how it went."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, document_ids: List[str], workdir: str):
+        self.client = client
+        self.args = args
+        self.document_ids = document_ids
+        self.workdir = workdir
+        self.rng = random.Random(args.seed)
+
+    def question(self) -> str:
+        words = self.rng.sample(VOCABULARY, 2)
+        # Distinct questions, so answer caches don't flatter the numbers
+        return f"What does the section say about {words[0]} and {words[1]}? #{uuid.uuid4().hex[:8]}"
+
+    def chat_body(self, documents_per_chat: int, **extra) -> dict:
+        documents = self.rng.sample(self.document_ids, min(documents_per_chat, len(self.document_ids)))
+        return {"question": self.question(), "documents": documents, "cache": not self.args.no_cache, **extra}
+
+    async def send(self, kind: str, documents_per_chat: int) -> Outcome:
+        started = time.perf_counter()
+        try:
+            if kind == "chat_sse":
+                return await self._chat_stream(kind, documents_per_chat, started, sse=True)
+            if kind == "chat_text":
+                return await self._chat_stream(kind, documents_per_chat, started, sse=False)
+            if kind == "chat_json":
+                return await self._chat_json(documents_per_chat, started)
+            return await self._ingest(started)
+        except (httpx.HTTPError, OSError) as e:
+            return Outcome(kind, 0, time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+
+    async def _chat_stream(self, kind: str, documents_per_chat: int, started: float, sse: bool) -> Outcome:
+        headers = {"Accept": "text/event-stream"} if sse else {}
+        body = self.chat_body(documents_per_chat)
+        ttft = None
+        async with self.client.stream("POST", "/api/chat", json=body, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return Outcome(kind, response.status_code, time.perf_counter() - started,
+                               error=response.text[:200])
+            if not sse:
+                async for chunk in response.aiter_text():
+                    if chunk and ttft is None:
+                        ttft = time.perf_counter() - started
+                error = None if ttft is not None else "empty stream"
+                return Outcome(kind, 200, time.perf_counter() - started, ttft, error)
+
+            event, done, error = None, False, None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    if event == "token" and ttft is None:
+                        ttft = time.perf_counter() - started
+                    elif event == "done":
+                        done = True
+                    elif event == "error":
+                        error = line[5:].strip()[:200]
+                elif not line:
+                    event = None
+        if error is None and not done:
+            error = "stream ended without a done event"
+        return Outcome(kind, 200, time.perf_counter() - started, ttft, error)
+
+    async def _chat_json(self, documents_per_chat: int, started: float) -> Outcome:
+        # /chat/llm answers the question without retrieval; documents are ignored there
+        body = self.chat_body(documents_per_chat, stream=False)
+        response = await self.client.post("/api/chat/llm", json=body)
+        latency = time.perf_counter() - started
+        if response.status_code != 200:
+            return Outcome("chat_json", response.status_code, latency, error=response.text[:200])
+        return Outcome("chat_json", 200, latency, ttft=latency)
+
+    async def _ingest(self, started: float) -> Outcome:
+        path = os.path.join(self.workdir, f"load_{uuid.uuid4().hex}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_text(self.rng, self.args.document_kb * 1024))
+        try:
+            response = await self.client.post(
+                "/api/embedd/local", json={"file_path": [path], "document_id": str(uuid.uuid4())}
+            )
+        finally:
+            os.remove(path)
+        latency = time.perf_counter() - started
+        error = None if response.status_code == 200 else response.text[:200]
+        return Outcome("ingest", response.status_code, latency, error=error)
+
+
+def pick_kind(rng: random.Random, mix: Dict[str, float]) -> str:
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+async def run_concurrency_step(generator: LoadGenerator, step: Step, mix: Dict[str, float], seconds: float) -> float:
+    deadline = time.perf_counter() + seconds
+
+    async def client() -> None:
+        while time.perf_counter() < deadline:
+            step.outcomes.append(await generator.send(pick_kind(generator.rng, mix), step.documents_per_chat))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(int(step.level))))
+    return time.perf_counter() - started
+
+
+async def run_rps_step(
+    generator: LoadGenerator, step: Step, mix: Dict[str, float], seconds: float, max_in_flight: int
+) -> float:
+    in_flight: set = set()
+    interval = 1.0 / step.level
+    started = time.perf_counter()
+    next_at = started
+    while next_at < started + seconds:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        next_at += interval
+        kind = pick_kind(generator.rng, mix)
+        if len(in_flight) >= max_in_flight:
+            # The server fell this far behind; count it instead of queueing client-side
+            step.outcomes.append(Outcome(kind, 0, 0.0, error="client in-flight limit reached"))
+            continue
+        task = asyncio.create_task(generator.send(kind, step.documents_per_chat))
+        task.add_done_callback(lambda t: step.outcomes.append(t.result()))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return time.perf_counter() - started
+
+
+def summarize_step(step: Step, elapsed: float) -> Dict[str, object]:
+    ok = [o for o in step.outcomes if o.error is None]
+    per_kind = {}
+    for kind in KINDS:
+        outcomes = [o for o in step.outcomes if o.kind == kind]
+        if not outcomes:
+            continue
+        succeeded = [o for o in outcomes if o.error is None]
+        per_kind[kind] = {
+            "requests": len(outcomes),
+            "errors": len(outcomes) - len(succeeded),
+            "ttft_seconds": summarize([o.ttft for o in succeeded if o.ttft is not None]) if kind in CHAT_KINDS else {},
+            "latency_seconds": summarize([o.latency for o in succeeded]),
+        }
+    errors = Counter(o.error for o in step.outcomes if o.error is not None)
+    return {
+        "step": step.label,
+        "mode": step.mode,
+        "level": step.level,
+        "documents_per_chat": step.documents_per_chat,
+        "seconds": round(elapsed, 2),
+        "requests": len(step.outcomes),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round((len(step.outcomes) - len(ok)) / len(step.outcomes), 4) if step.outcomes else 0.0,
+        "status_codes": dict(Counter(str(o.status) for o in step.outcomes)),
+        "top_errors": [{"error": e, "count": n} for e, n in errors.most_common(3)],
+        "kinds": per_kind,
+    }
+
+
+def chat_ttft_p99(summary: Dict[str, object]) -> Optional[float]:
+    values = [k["ttft_seconds"].get("p99") for name, k in summary["kinds"].items() if name in CHAT_KINDS]
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def print_step(summary: Dict[str, object]) -> None:
+    ttft = chat_ttft_p99(summary)
+    latencies = [k["latency_seconds"].get("p99") for k in summary["kinds"].values() if k["latency_seconds"]]
+    print(
+        f"{summary['step']:<18} {summary['requests']:>7} {summary['throughput_rps']:>9} "
+        f"{summary['error_rate'] * 100:>7.2f}% "
+        f"{(ttft * 1000 if ttft is not None else float('nan')):>12.1f} "
+        f"{(max(latencies) * 1000 if latencies else float('nan')):>12.1f}  {summary['status_codes']}",
+        flush=True,
+    )
+
+
+def capacity(summaries: List[Dict[str, object]], budget: float) -> Dict[str, Optional[float]]:
+    """Highest load level per document-set size whose chat TTFT p99 stayed within budget."""
+    result: Dict[str, Optional[float]] = {}
+    for summary in summaries:
+        key = str(summary["documents_per_chat"])
+        result.setdefault(key, None)
+        ttft = chat_ttft_p99(summary)
+        if ttft is not None and ttft <= budget and (result[key] is None or summary["level"] > result[key]):
+            result[key] = summary["level"]
+    return result
+
+
+async def ingest_corpus(client: httpx.AsyncClient, args: argparse.Namespace, workdir: str) -> List[str]:
+    """Ingest the documents chat requests search over."""
+    rng = random.Random(args.seed)
+    slots = asyncio.Semaphore(4)
+    document_ids: List[str] = []
+
+    async def one(i: int) -> None:
+        path = os.path.join(workdir, f"corpus_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_text(rng, args.document_kb * 1024))
+        document_id = str(uuid.uuid4())
+        async with slots:
+            response = await client.post("/api/embedd/local", json={"file_path": [path], "document_id": document_id})
+        if response.status_code == 200:
+            document_ids.append(document_id)
+        else:
+            print(f"Corpus ingestion failed ({response.status_code}): {response.text[:200]}", file=sys.stderr)
+
+    await asyncio.gather(*(one(i) for i in range(args.documents)))
+    return document_ids
+
+
+async def run(args: argparse.Namespace, base_url: str, workdir: str) -> Tuple[List[Dict[str, object]], List[str]]:
+    mix = parse_mix(args.mix)
+    mode, levels = ("rps", parse_levels(args.rps)) if args.rps else ("concurrency", parse_levels(args.concurrency))
+    doc_sizes = [int(v) for v in parse_levels(args.documents_per_chat)]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        if args.document_ids:
+            document_ids = args.document_ids.split(",")
+        elif any(kind in CHAT_KINDS for kind in mix):
+            args.documents = args.documents or max(doc_sizes)
+            document_ids = await ingest_corpus(client, args, workdir)
+            if not document_ids:
+                raise RuntimeError("Could not ingest any corpus documents")
+        else:
+            document_ids = []
+        generator = LoadGenerator(client, args, document_ids, workdir)
+
+        if args.warmup_seconds:
+            # Opens connections and warms the app at light load; not reported
+            if mode == "rps":
+                await run_rps_step(generator, Step(mode, levels[0], doc_sizes[0]), mix, args.warmup_seconds,
+                                   args.max_in_flight)
+            else:
+                await run_concurrency_step(generator, Step(mode, min(levels[0], 4), doc_sizes[0]), mix,
+                                           args.warmup_seconds)
+
+        print(f"{'step':<18} {'requests':>7} {'ok req/s':>9} {'errors':>8} {'TTFT p99 ms':>12} {'lat p99 ms':>12}  status")
+        summaries = []
+        for documents_per_chat in doc_sizes:
+            for level in levels:
+                step = Step(mode, level, documents_per_chat)
+                if mode == "rps":
+                    elapsed = await run_rps_step(generator, step, mix, args.step_seconds, args.max_in_flight)
+                else:
+                    elapsed = await run_concurrency_step(generator, step, mix, args.step_seconds)
+                summary = summarize_step(step, elapsed)
+                print_step(summary)
+                summaries.append(summary)
+                if args.pause_seconds:
+                    await asyncio.sleep(args.pause_seconds)
+    return summaries, document_ids
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="Worker to load, e.g. http://127.0.0.1:8000")
+    target.add_argument("--spawn", action="store_true", help="Start the app locally against the stand-in providers")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrent clients per step")
+    load.add_argument("--rps", help="Comma-separated arrival rates per step (open loop)")
+    parser.add_argument("--documents-per-chat", default="1", help="Comma-separated document-set sizes to sweep")
+    parser.add_argument("--mix", default="chat_sse=1", help="Weighted kinds, e.g. chat_sse=8,chat_json=1,ingest=1")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--warmup-seconds", type=float, default=3.0)
+    parser.add_argument("--pause-seconds", type=float, default=1.0, help="Idle time between steps")
+    parser.add_argument("--max-in-flight", type=int, default=1024, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--documents", type=int, default=0, help="Corpus size (default: largest --documents-per-chat)")
+    parser.add_argument("--document-kb", type=int, default=32, help="Size of each synthetic document (KiB)")
+    parser.add_argument("--document-ids", help="Comma-separated existing document IDs instead of ingesting a corpus")
+    parser.add_argument("--no-cache", action="store_true", help="Send cache=false with chat requests")
+    parser.add_argument("--ttft-p99-budget", type=float, help="Report the highest level with chat TTFT p99 under this (s)")
+    parser.add_argument("--max-error-rate", type=float, help="Exit non-zero if any step's error rate exceeds this")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for a spawned app to be ready")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server: Dict[str, object] = {}
+    with ExitStack() as stack:
+        workdir = stack.enter_context(tempfile.TemporaryDirectory())
+        if args.spawn:
+            stubs = stack.enter_context(StubServer(config_from_args(args)))
+            base_url, proc = stack.enter_context(running_app(stubs, args.dim, args.timeout))
+        else:
+            base_url, proc = args.base_url, None
+        summaries, document_ids = asyncio.run(run(args, base_url, workdir))
+        if proc is not None:
+            server["peak_rss_mb"] = peak_rss_mb(proc.pid)
+
+    results: Dict[str, object] = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "corpus_documents": len(document_ids),
+        "steps": summaries,
+        "server": server,
+    }
+    if args.ttft_p99_budget is not None:
+        results["capacity"] = capacity(summaries, args.ttft_p99_budget)
+        for size, level in results["capacity"].items():
+            verdict = f"up to {level:g}" if level is not None else "no level"
+            print(f"{size} docs/chat: {verdict} {'clients' if not args.rps else 'rps'} within "
+                  f"TTFT p99 {args.ttft_p99_budget:g}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.max_error_rate is not None and any(s["error_rate"] > args.max_error_rate for s in summaries):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
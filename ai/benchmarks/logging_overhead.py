@@ -0,0 +1,132 @@
+"""
+Measure what logging adds to request latency on the event loop.
+
+Simulated requests run concurrently on one loop, each logging the way an
+ingestion request does: a handful of lifecycle records plus one or more
+records per chunk. The same workload is timed with:
+
+    none            logging disabled (the floor)
+    sync_verbose    handlers writing on the calling thread, INFO f-strings per chunk (the old setup)
+    queued_verbose  QueueHandler + listener thread, same INFO records per chunk
+    queued          QueueHandler, per-chunk records at DEBUG with lazy arguments (the current code)
+    queued_json     as `queued`, with JSON output
+    queued_sampled  as `queued_verbose`, with the per call site rate limit on
+
+Usage (from the ai/ directory):
+    python -m benchmarks.logging_overhead --requests 2000 --chunks 40 --concurrency 32 --output logging.json
+
+Console output goes to /dev/null and the file handler writes to a temporary
+directory, so only the logging path itself is measured.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+
+from benchmarks.stats import summarize
+from utils.logger import setup_logger, stop_logging
+
+MODES = ("none", "sync_verbose", "queued_verbose", "queued", "queued_json", "queued_sampled")
+
+
+def build_logger(mode: str, workdir: str, console) -> Optional[logging.Logger]:
+    if mode == "none":
+        return None
+    options = {
+        "sync_verbose": dict(queued=False, rate_limit=0),
+        "queued_verbose": dict(queued=True, rate_limit=0),
+        "queued": dict(queued=True, rate_limit=0),
+        "queued_json": dict(queued=True, rate_limit=0, fmt="json"),
+        "queued_sampled": dict(queued=True, rate_limit=20),
+    }[mode]
+    options.setdefault("fmt", "text")
+    # The console handler binds sys.stdout when it is created
+    with redirect_stdout(console):
+        logger = setup_logger(f"bench-{mode}", os.path.join(workdir, f"{mode}.log"), level="INFO", **options)
+    logger.propagate = False
+    return logger
+
+
+async def request(logger: Optional[logging.Logger], verbose: bool, document_id: str, chunks: int) -> float:
+    started = time.perf_counter()
+    if logger is not None:
+        logger.info(f"[FILE] Starting local processing for: {document_id}")
+    for i in range(chunks):
+        chunk_id = f"{document_id}_chunk_{i}"
+        if logger is not None:
+            if verbose:
+                logger.info(f"[EMBED] Embedding chunk {i + 1}/{chunks}")
+                logger.info(f"Storing chunk {i + 1} with ID {chunk_id}")
+                logger.info(f"Creating Qdrant point with ID: {chunk_id}")
+            else:
+                logger.debug("[EMBED] Embedding chunk %d/%d", i + 1, chunks)
+                logger.debug("Storing chunk %d with ID %s", i + 1, chunk_id)
+                logger.debug("Creating Qdrant point with ID: %s", chunk_id)
+        # Yield like the real await points between chunks
+        await asyncio.sleep(0)
+    if logger is not None:
+        logger.info(f"[DONE] Local document processing complete: {chunks}/{chunks} stored")
+    return time.perf_counter() - started
+
+
+async def run_mode(mode: str, args: argparse.Namespace, workdir: str, console) -> Dict[str, object]:
+    logger = build_logger(mode, workdir, console)
+    verbose = mode in ("sync_verbose", "queued_verbose", "queued_sampled")
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with slots:
+            latencies.append(await request(logger, verbose, f"doc-{i}", args.chunks))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    # Queued records still being written count against the mode, just not against request latency
+    drain_started = time.perf_counter()
+    stop_logging()
+    drain = time.perf_counter() - drain_started
+    return {
+        "latency_seconds": summarize(latencies),
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "drain_seconds": round(drain, 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=40, help="Chunks (and per-chunk log calls) per request")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of " + ", ".join(MODES))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results: Dict[str, object] = {}
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as console:
+        for mode in args.modes.split(","):
+            results[mode] = asyncio.run(run_mode(mode, args, workdir, console))
+
+    floor = results.get("none", {}).get("latency_seconds", {}).get("p50")
+    print(f"{'mode':<16} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'drain s':>8}  overhead p50")
+    for mode, result in results.items():
+        latency = result["latency_seconds"]
+        overhead = f"{(latency['p50'] - floor) * 1000:+.3f} ms" if floor is not None else ""
+        print(
+            f"{mode:<16} {latency['p50'] * 1000:>9.3f} {latency['p99'] * 1000:>9.3f} "
+            f"{result['requests_per_second']:>9} {result['drain_seconds']:>8}  {overhead}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
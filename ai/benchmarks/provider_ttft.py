@@ -0,0 +1,89 @@
+"""
+Compare time-to-first-token (TTFT) and total latency across LLM providers.
+
+Usage (from the ai/ directory, with provider credentials in the environment):
+    python -m benchmarks.provider_ttft --providers openrouter,gemini,ollama --runs 5 --output ttft.json
+
+Each provider is measured through the same registry the API uses. With
+--buffered-baseline every provider is also measured the way a non-incremental
+stream behaves (nothing delivered until the whole answer exists), which is
+what the Gemini and Ollama providers did before they streamed natively.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.stats import summarize
+from services.response_generator import get_llm
+from llm_providers.registry import registry
+
+DEFAULT_PROMPT = "In three sentences, explain what a vector database is used for."
+
+
+async def measure_once(provider: str, prompt: str, buffered: bool) -> Dict[str, float]:
+    llm = get_llm(provider)
+    started = time.perf_counter()
+    first = None
+    chunks = 0
+    chars = 0
+    async for chunk in llm.generate_response_stream(prompt):
+        if not chunk:
+            continue
+        if first is None:
+            first = time.perf_counter() - started
+        chunks += 1
+        chars += len(chunk)
+    total = time.perf_counter() - started
+    if first is None:
+        raise RuntimeError(f"{provider} returned no tokens")
+    # A buffered stream hands the client its first byte only at the end
+    return {"ttft": total if buffered else first, "total": total, "chunks": chunks, "chars": chars}
+
+
+async def run(providers: List[str], prompt: str, runs: int, buffered_baseline: bool) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    modes = [("streaming", False)] + ([("buffered", True)] if buffered_baseline else [])
+    for provider in providers:
+        for mode, buffered in modes:
+            ttfts, totals, errors = [], [], []
+            for _ in range(runs):
+                try:
+                    sample = await measure_once(provider, prompt, buffered)
+                    ttfts.append(sample["ttft"])
+                    totals.append(sample["total"])
+                except Exception as e:
+                    errors.append(str(e))
+            results[f"{provider}:{mode}"] = {
+                "provider": provider,
+                "mode": mode,
+                "ttft_seconds": summarize(ttfts),
+                "total_seconds": summarize(totals),
+                "errors": errors,
+            }
+            print(f"{provider:<12} {mode:<10} ttft={summarize(ttfts)} total={summarize(totals)} errors={len(errors)}")
+    await registry.aclose()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", default="openrouter", help="Comma-separated provider names")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--buffered-baseline", action="store_true", help="Also report non-incremental streaming")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    providers = [p.strip() for p in args.providers.split(",") if p.strip()]
+    results = asyncio.run(run(providers, args.prompt, args.runs, args.buffered_baseline))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"prompt": args.prompt, "runs": args.runs, "results": results}, f, indent=2)
+    return 0 if all(not r["errors"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Summary statistics shared by the benchmark scripts."""
+import statistics
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    return {
+        "count": len(samples),
+        "mean": round(statistics.fmean(samples), 4),
+        "p50": round(percentile(samples, 50), 4),
+        "p95": round(percentile(samples, 95), 4),
+        "p99": round(percentile(samples, 99), 4),
+        "max": round(max(samples), 4),
+    }
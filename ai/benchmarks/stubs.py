@@ -0,0 +1,166 @@
+"""
+Local stand-ins for the Voyage embeddings API and OpenRouter chat completions.
+
+Both mimic the wire format the app parses, with configurable latency and
+token rate, so benchmarks run offline and are not skewed by upstream noise.
+
+Usage (from the ai/ directory), e.g. to point a manually started app at them:
+    python -m benchmarks.stubs --port 8900 --ttft 0.3 --tokens-per-second 50
+
+then set VOYAGE_BASE_URL=http://127.0.0.1:8900/v1 and
+OPENROUTER_BASE_URL=http://127.0.0.1:8900/api/v1.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Answer the OpenRouter stand-in streams, one word per SSE delta
+ANSWER_WORDS = (
+    "The documents describe this in detail, and the relevant section explains the steps, "
+    "the expected inputs and the results observed in practice."
+).split()
+
+
+@dataclass
+class StubConfig:
+    dim: int = 1024
+    # Voyage: fixed latency per request plus a per-input cost (seconds)
+    embed_latency: float = 0.02
+    embed_per_input: float = 0.0005
+    # OpenRouter: time to first token, then a steady token rate
+    ttft: float = 0.3
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 60
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """Deterministic unit vector per text, so repeated texts embed identically."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def build_app(config: StubConfig) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(config.embed_latency + config.embed_per_input * len(texts))
+        return JSONResponse({
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(t, config.dim)}
+                     for i, t in enumerate(texts)],
+            "model": body.get("model"),
+            "usage": {"total_tokens": sum(len(t.split()) for t in texts)},
+        })
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(config.answer_tokens)]
+        if not body.get("stream"):
+            await asyncio.sleep(config.ttft + len(words) / config.tokens_per_second)
+            return JSONResponse({"choices": [{"message": {"role": "assistant", "content": " ".join(words)}}]})
+
+        async def events():
+            await asyncio.sleep(config.ttft)
+            interval = 1.0 / config.tokens_per_second
+            next_at = time.perf_counter()
+            for i, word in enumerate(words):
+                delta = {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+                yield f"data: {json.dumps(delta)}\n\n"
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.api_route("/{path:path}", methods=["HEAD", "GET"])
+    async def warm(path: str):
+        # Connection warm-ups HEAD the base URL
+        return Response(status_code=200)
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StubServer:
+    """Runs the stand-ins with uvicorn on a background thread."""
+
+    def __init__(self, config: StubConfig, port: int = 0):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(
+            build_app(config), host="127.0.0.1", port=self.port, log_level="warning", lifespan="off"
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def voyage_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def openrouter_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Stub server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = StubConfig()
+    parser.add_argument("--dim", type=int, default=defaults.dim, help="Embedding dimension")
+    parser.add_argument("--embed-latency", type=float, default=defaults.embed_latency)
+    parser.add_argument("--embed-per-input", type=float, default=defaults.embed_per_input)
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="Stub LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        dim=args.dim,
+        embed_latency=args.embed_latency,
+        embed_per_input=args.embed_per_input,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_app(config_from_args(args)), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,3 +26,201 @@ CHUNK_OVERLAP = int(os.environ.get('CHUNK_OVERLAP', '100'))
 # Embedding dimension must match the selected model
 # Default aligns with voyage-3.5-lite
 EMBEDDING_DIM = int(os.environ.get('EMBEDDING_DIM', '1024'))
+
+# Lexical (BM25) index built alongside the vector store during ingestion.
+# Keyword-dominant questions ("lab 5", part numbers, error codes) can be
+# answered from it without an embedding round-trip; other questions fuse
+# lexical and dense rankings.
+LEXICAL_INDEX_ENABLED = os.environ.get('LEXICAL_INDEX_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+# A question with at most this many terms (after stopwords) that contains an
+# identifier-like token is treated as keyword-dominant
+LEXICAL_SHORTCUT_MAX_TERMS = int(os.environ.get('LEXICAL_SHORTCUT_MAX_TERMS', '4'))
+BM25_K1 = float(os.environ.get('BM25_K1', '1.2'))
+BM25_B = float(os.environ.get('BM25_B', '0.75'))
+
+# Retrieval result cache in front of StoreService searches. Entries are
+# invalidated whenever a document in the cached set is re-ingested or deleted.
+RETRIEVAL_CACHE_ENABLED = os.environ.get('RETRIEVAL_CACHE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.environ.get('RETRIEVAL_CACHE_MAX_ENTRIES', '2048'))
+RETRIEVAL_CACHE_MAX_BYTES = int(os.environ.get('RETRIEVAL_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Document versions invalidating the retrieval, answer and session caches are
+# counted per process, so a re-ingestion handled by one worker is invisible to
+# the others. Entries in those caches are therefore never served once older
+# than CACHE_MAX_STALENESS seconds. 0 removes the cap, which is only safe with
+# a single worker: with WEB_CONCURRENCY > 1 the cap is kept at its default.
+APP_WORKERS = int(os.environ.get('WEB_CONCURRENCY', '1'))
+CACHE_MAX_STALENESS = float(os.environ.get('CACHE_MAX_STALENESS', '300'))
+
+# Semantic answer cache: a question whose embedding is at least this
+# cosine-similar to an earlier one over the same documents, provider, model
+# and prompt version gets the earlier answer replayed. TTL is in seconds
+# (0 disables expiry); entries are also dropped on re-ingestion.
+ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+ANSWER_CACHE_SIMILARITY = float(os.environ.get('ANSWER_CACHE_SIMILARITY', '0.95'))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', '1024'))
+ANSWER_CACHE_TTL = float(os.environ.get('ANSWER_CACHE_TTL', '86400'))
+
+# Completion cache for byte-identical prompts: an in-memory LRU (bytes) in
+# front of an SQLite file shared by all workers. Set COMPLETION_CACHE_PATH
+# empty to keep it in memory only. TTL is in seconds (0 disables expiry).
+COMPLETION_CACHE_ENABLED = os.environ.get('COMPLETION_CACHE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+COMPLETION_CACHE_MAX_BYTES = int(os.environ.get('COMPLETION_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+COMPLETION_CACHE_PATH = os.environ.get('COMPLETION_CACHE_PATH', './completion_cache.db')
+COMPLETION_CACHE_DISK_MAX_BYTES = int(os.environ.get('COMPLETION_CACHE_DISK_MAX_BYTES', str(256 * 1024 * 1024)))
+COMPLETION_CACHE_TTL = float(os.environ.get('COMPLETION_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Coalesce identical in-flight chat requests onto one generation
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+
+# Chat streaming: deltas arriving within STREAM_FLUSH_MS are merged into one
+# write (flushed early at STREAM_FLUSH_MAX_CHARS); SSE streams send a
+# keep-alive comment after SSE_HEARTBEAT_SECONDS without output
+STREAM_FLUSH_MS = float(os.environ.get('STREAM_FLUSH_MS', '10'))
+STREAM_FLUSH_MAX_CHARS = int(os.environ.get('STREAM_FLUSH_MAX_CHARS', '256'))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+
+# Vector store backend: "qdrant" (server) or "embedded" (in-process, numpy
+# memory-mapped matrix). The embedded backend persists under
+# EMBEDDED_VECTOR_PATH; leave it empty to keep vectors in memory only. A
+# persisted store is locked by the process that opens it, so run a single
+# worker (WEB_CONCURRENCY=1) with it.
+VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND', 'qdrant').lower()
+EMBEDDED_VECTOR_PATH = os.environ.get('EMBEDDED_VECTOR_PATH', './vector_db')
+# "auto" uses HNSW once a collection reaches HNSW_MIN_POINTS, "exact" always
+# scores every candidate, "hnsw" always walks the graph
+EMBEDDED_VECTOR_SEARCH = os.environ.get('EMBEDDED_VECTOR_SEARCH', 'auto').lower()
+HNSW_MIN_POINTS = int(os.environ.get('HNSW_MIN_POINTS', '20000'))
+HNSW_M = int(os.environ.get('HNSW_M', '16'))
+HNSW_EF_CONSTRUCTION = int(os.environ.get('HNSW_EF_CONSTRUCTION', '100'))
+HNSW_EF_SEARCH = int(os.environ.get('HNSW_EF_SEARCH', '64'))
+
+# Background re-index when EMBEDDING_DIM/EMBEDDINGS_MODEL change
+# (QDRANT_REINDEX_ON_DIM_MISMATCH=true). The source model defaults to the
+# `embedding_model` recorded on stored chunks.
+REINDEX_SOURCE_MODEL = os.environ.get('QDRANT_REINDEX_SOURCE_MODEL', '')
+REINDEX_BATCH_SIZE = int(os.environ.get('REINDEX_BATCH_SIZE', '32'))
+# Chunks embedded per second by the migration (0 disables throttling)
+REINDEX_EMBED_RATE = float(os.environ.get('REINDEX_EMBED_RATE', '20'))
+# Every worker that sees the mismatch starts a migration, but only the one
+# holding the lock file in REINDEX_LOCK_DIR runs it. The others (and anyone
+# waiting to take over) check the alias every REINDEX_POLL_SECONDS and switch
+# their serving model once it moves. Put the directory on storage shared by
+# every instance when they run on several hosts.
+REINDEX_LOCK_DIR = os.environ.get('REINDEX_LOCK_DIR', './reindex_locks')
+REINDEX_POLL_SECONDS = float(os.environ.get('REINDEX_POLL_SECONDS', '2'))
+
+# Context packing for RAG prompts
+# Number of candidate chunks fetched per question before packing
+RETRIEVAL_LIMIT = int(os.environ.get('RETRIEVAL_LIMIT', '10'))
+# Maximum prompt tokens spent on document context
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', '3000'))
+# Drop chunks scoring below this fraction of the best chunk's score
+CONTEXT_RELATIVE_SCORE_CUTOFF = float(os.environ.get('CONTEXT_RELATIVE_SCORE_CUTOFF', '0.7'))
+# Absolute score floor (0 disables; only meaningful for cosine scores)
+CONTEXT_MIN_SCORE = float(os.environ.get('CONTEXT_MIN_SCORE', '0'))
+# tiktoken encoding used for counting when tiktoken is installed
+CONTEXT_TOKENIZER = os.environ.get('CONTEXT_TOKENIZER', 'cl100k_base')
+
+# Chat sessions: follow-ups re-score the previous turn's candidate chunks locally
+# Candidate chunks (with vectors) kept per session; larger pools survive more topic drift
+SESSION_CANDIDATE_POOL = int(os.environ.get('SESSION_CANDIDATE_POOL', '40'))
+# Search the vector store again when the best local cosine score falls below this
+SESSION_REUSE_MIN_SCORE = float(os.environ.get('SESSION_REUSE_MIN_SCORE', '0.5'))
+SESSION_TTL = float(os.environ.get('SESSION_TTL', '1800'))
+SESSION_MAX_SESSIONS = int(os.environ.get('SESSION_MAX_SESSIONS', '4096'))
+
+# Batch chat (/api/chat/batch)
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '5000'))
+# Questions per embeddings API request
+BATCH_EMBED_SIZE = int(os.environ.get('BATCH_EMBED_SIZE', '128'))
+# Concurrent LLM calls per provider across all batches; <PROVIDER>_BATCH_CONCURRENCY overrides
+BATCH_LLM_CONCURRENCY = {
+    name: int(os.environ.get(f'{name.upper()}_BATCH_CONCURRENCY', os.environ.get('BATCH_LLM_CONCURRENCY', '8')))
+    for name in ('openrouter', 'ollama', 'gemini')
+}
+
+# LLM providers
+OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL') or os.environ.get('LLAMA3_API_KEY', 'http://localhost:11434')
+# Shared keep-alive HTTP client per upstream
+LLM_HTTP2 = os.environ.get('LLM_HTTP2', 'true').lower() in {'1', 'true', 'yes', 'y'}
+LLM_POOL_MAX_CONNECTIONS = int(os.environ.get('LLM_POOL_MAX_CONNECTIONS', '100'))
+LLM_POOL_MAX_KEEPALIVE = int(os.environ.get('LLM_POOL_MAX_KEEPALIVE', '20'))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get('LLM_KEEPALIVE_EXPIRY', '120'))
+# Providers whose connections are opened at startup (comma-separated)
+LLM_PREWARM_PROVIDERS = [p.strip() for p in os.environ.get('LLM_PREWARM_PROVIDERS', 'openrouter').split(',') if p.strip()]
+# How long Ollama keeps the model loaded after a request (Ollama duration
+# string, e.g. "30m"; "-1" keeps it resident indefinitely)
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+
+# Hedged LLM streams: when the primary has produced no token within its
+# rolling TTFT quantile, a secondary is started and the first to stream wins.
+# Routes are "primary=secondary[:model]" pairs, comma-separated, e.g.
+# "openrouter=ollama,ollama=openrouter:openai/gpt-4o-mini". Empty disables hedging.
+LLM_HEDGE_ROUTES = os.environ.get('LLM_HEDGE_ROUTES', '')
+LLM_HEDGE_QUANTILE = float(os.environ.get('LLM_HEDGE_QUANTILE', '0.95'))
+# Until a provider has this many TTFT samples, LLM_HEDGE_DEFAULT_DEADLINE is used
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', '20'))
+LLM_HEDGE_DEFAULT_DEADLINE = float(os.environ.get('LLM_HEDGE_DEFAULT_DEADLINE', '3.0'))
+LLM_HEDGE_MIN_DEADLINE = float(os.environ.get('LLM_HEDGE_MIN_DEADLINE', '0.5'))
+# Number of recent TTFT samples kept per provider/model
+LLM_LATENCY_WINDOW = int(os.environ.get('LLM_LATENCY_WINDOW', '256'))
+
+# Per-provider rate-limit budgets shared by all requests in the worker:
+# <PROVIDER>_RPM (requests/min) and <PROVIDER>_TPM (tokens/min); 0 = unlimited
+# until the upstream advertises a limit in its rate-limit headers.
+LLM_RATE_LIMITS = {
+    name: (
+        float(os.environ.get(f'{name.upper()}_RPM', '0')),
+        float(os.environ.get(f'{name.upper()}_TPM', '0')),
+    )
+    for name in ('openrouter', 'ollama', 'gemini')
+}
+# Requests allowed to wait for budget per provider, and the longest wait (seconds)
+# before failing fast with a Retry-After hint
+LLM_QUEUE_MAX = int(os.environ.get('LLM_QUEUE_MAX', '64'))
+LLM_QUEUE_MAX_WAIT = float(os.environ.get('LLM_QUEUE_MAX_WAIT', '10'))
+
+# Bounded thread pool for blocking calls made from async request handlers
+BLOCKING_POOL_SIZE = int(os.environ.get('BLOCKING_POOL_SIZE', '16'))
+
+# Logging: level, "text" or "json" lines, and whether records are written from a
+# listener thread (QueueHandler) instead of the calling thread
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+LOG_QUEUE_ENABLED = os.environ.get('LOG_QUEUE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+# Per call site rate limit for records below WARNING (records/second after a
+# burst of LOG_RATE_BURST; 0 disables)
+LOG_RATE_LIMIT = float(os.environ.get('LOG_RATE_LIMIT', '20'))
+LOG_RATE_BURST = int(os.environ.get('LOG_RATE_BURST', '50'))
+
+# Admin-only endpoints (profiling). Callers send it as `X-Admin-Token` or a
+# bearer token; when unset, the endpoints are disabled.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+# Upper bound and default sampling interval for on-demand CPU profiles (seconds)
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.005'))
+
+# Per-request stage timing (Server-Timing header, final SSE event)
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+# Also export spans over OTLP (needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http;
+# configured with the standard OTEL_EXPORTER_OTLP_* variables)
+TRACING_OTEL_ENABLED = os.environ.get('TRACING_OTEL_ENABLED', 'false').lower() in {'1', 'true', 'yes', 'y'}
+# Log the stage breakdown of requests slower than this (seconds; 0 disables)
+TRACING_SLOW_SECONDS = float(os.environ.get('TRACING_SLOW_SECONDS', '10'))
+
+# Admission control: per route class (max concurrent, max queued, longest queue wait in seconds).
+# Override with ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _QUEUE_TIMEOUT.
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'y'}
+ADMISSION_LIMITS = {
+    name: (
+        int(os.environ.get(f'ADMISSION_{name.upper()}_CONCURRENCY', concurrency)),
+        int(os.environ.get(f'ADMISSION_{name.upper()}_QUEUE', queue)),
+        float(os.environ.get(f'ADMISSION_{name.upper()}_QUEUE_TIMEOUT', timeout)),
+    )
+    for name, (concurrency, queue, timeout) in {
+        'chat': ('64', '128', '5'),
+        'batch': ('2', '4', '30'),
+        'ingest': ('4', '16', '30'),
+    }.items()
+}
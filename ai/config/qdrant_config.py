@@ -67,5 +67,13 @@ class QdrantService:
 
 qdrant_host = os.environ.get("QDRANT_HOST", "localhost")
 qdrant_port = int(os.environ.get("QDRANT_PORT", "6333"))
-print(f"Qdrant Host : {qdrant_host} : {qdrant_port}")
-qdrant_service = QdrantService(collection_name=QDRANT_COLLECTION_NAME, embedding_dim=EMBEDDING_DIM, host=qdrant_host, port=qdrant_port)
\ No newline at end of file
+_qdrant_service = None
+
+
+def get_qdrant_service() -> QdrantService:
+    """Return the shared QdrantService, building its client on first use."""
+    global _qdrant_service
+    if _qdrant_service is None:
+        print(f"Qdrant Host : {qdrant_host} : {qdrant_port}")
+        _qdrant_service = QdrantService(collection_name=QDRANT_COLLECTION_NAME, embedding_dim=EMBEDDING_DIM, host=qdrant_host, port=qdrant_port)
+    return _qdrant_service
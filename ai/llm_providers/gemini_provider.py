@@ -26,40 +26,36 @@ class GeminiProvider(LLMProvider):
         self.model_name = model_name
 
     async def generate_response(self, prompt: str, stream: bool = False) -> str:
-        """Generate a response using the Gemini model."""
-        
-        try:
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            
-            if response and response.text:
-                return response.text
-            else:
-                return "I apologize, but I couldn't generate a response. Please try again."
-                
-        except Exception as e:
-            return f"Sorry, I encountered an error: {str(e)}"
-    
+        """Generate a response using the Gemini model.
 
-    async def generate_response_stream(self, prompt: str) -> AsyncGenerator[str, None]:
-        """Generate response in streaming mode using Gemini."""
-        try:
-            # Define a synchronous function to get and iterate the stream
-            def _sync_stream_generator():
-                stream = self.model.generate_content(prompt, stream=True)
-                for chunk in stream:
-                    if chunk and chunk.text:
-                        logger.debug(f"Yielding Gemini chunk inside: {chunk.text}")
-                        yield chunk.text
+        Raises:
+            Exception: If the call fails or returns no text, so the failure is
+                never returned (or cached) as if it were an answer
+        """
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        if not (response and response.text):
+            raise ValueError("Gemini returned an empty response")
+        return response.text
 
-            # Run the synchronous generator in a separate thread
-            async def _async_stream_wrapper():
-                loop = asyncio.get_event_loop()
-                for chunk in await loop.run_in_executor(None, lambda: list(_sync_stream_generator())):
-                    yield chunk
+    async def generate_response_stream(self, prompt: str) -> AsyncGenerator[str, None]:
+        """Stream Gemini tokens as they arrive using the native async API.
 
-            async for text_chunk in _async_stream_wrapper():
-                yield text_chunk
+        Closing the generator (client disconnect, hedging loser) cancels the
+        underlying gRPC call instead of letting generation run to completion.
+        """
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. a safety finish) carry nothing to emit
+                    continue
+                if text:
+                    logger.debug(f"Yielding Gemini chunk: {text[:50]}")
+                    yield text
 
         except Exception as e:
+            # Raised so a failed stream never completes and is never cached as an answer
             logger.error(f"Error during Gemini streaming: {e}")
-            yield ""
+            raise
@@ -0,0 +1,373 @@
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config.constants import (
+    LLM_HEDGE_DEFAULT_DEADLINE,
+    LLM_HEDGE_MIN_DEADLINE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_QUANTILE,
+    LLM_HEDGE_ROUTES,
+    LLM_LATENCY_WINDOW,
+)
+from utils.logger import logger
+from utils.tracing import mark
+from utils.metrics import (
+    LLM_STREAM_ERRORS,
+    LLM_STREAM_SECONDS,
+    LLM_STREAM_TOKENS,
+    LLM_STREAMS_IN_FLIGHT,
+    LLM_TOKENS_PER_SECOND,
+    LLM_TTFT_SECONDS,
+)
+from .rate_limit import RateLimitExceeded, estimate_tokens, schedulers
+from .registry import registry
+
+# Bucket upper bounds (seconds) for the exported TTFT histogram
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0, 60.0)
+
+
+class LatencyHistogram:
+    """Rolling window of latency samples with bucket counts and quantiles.
+
+    Only the most recent `window` samples are kept, so deadlines derived from
+    it follow a provider that slows down or recovers.
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW, buckets: Tuple[float, ...] = TTFT_BUCKETS):
+        self.buckets = buckets
+        self._samples: deque = deque(maxlen=window)
+        self._counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self._counts[bisect.bisect_left(self.buckets, self._samples[0])] -= 1
+            self._samples.append(seconds)
+            self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return window bucket counts (cumulative, Prometheus-style) and quantiles."""
+        with self._lock:
+            counts = list(self._counts)
+            samples = len(self._samples)
+        cumulative, running = {}, 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {
+            "samples": samples,
+            "total": self.total,
+            "buckets": cumulative,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+def parse_routes(spec: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Parse "primary=secondary[:model]" pairs into {primary: (secondary, model)}."""
+    routes = {}
+    for pair in spec.split(","):
+        if "=" not in pair:
+            continue
+        primary, secondary = (part.strip() for part in pair.split("=", 1))
+        provider, _, model = secondary.partition(":")
+        if primary and provider:
+            routes[primary.lower()] = (provider.strip().lower(), model.strip() or None)
+    return routes
+
+
+class _StreamMetrics:
+    """Prometheus children bound once per provider/model."""
+
+    __slots__ = ("ttft", "duration", "tokens_per_second", "tokens")
+
+    def __init__(self, provider: str, model: str):
+        self.ttft = LLM_TTFT_SECONDS.labels(provider, model)
+        self.duration = LLM_STREAM_SECONDS.labels(provider, model)
+        self.tokens_per_second = LLM_TOKENS_PER_SECOND.labels(provider, model)
+        self.tokens = LLM_STREAM_TOKENS.labels(provider, model)
+
+
+class _Attempt:
+    """One provider stream, advanced until it yields its first non-empty token."""
+
+    def __init__(self, provider: str, model_name: Optional[str], prompt: str):
+        self.llm = registry.get(provider, model_name)
+        self.provider = provider
+        self.model = getattr(self.llm, "model_name", model_name or "")
+        self.label = f"{provider}:{self.model}"
+        self.stream = self.llm.generate_response_stream(prompt)
+        self.started = time.monotonic()
+        self.task = asyncio.create_task(self._first_token())
+
+    async def _first_token(self) -> str:
+        async for token in self.stream:
+            if token:
+                return token
+        raise RuntimeError(f"{self.label} finished without producing a token")
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        try:
+            await self.task
+        except BaseException:
+            pass
+        try:
+            await self.stream.aclose()
+        except Exception:
+            pass
+
+
+class HedgedStream:
+    """Tokens of a routed stream, plus the provider and model that produced them.
+
+    `provider` and `model` stay None until the first token is yielded. They
+    then name the attempt that won, which is not the requested provider when
+    a hedge or failover request got there first.
+    """
+
+    def __init__(self):
+        self.provider: Optional[str] = None
+        self.model: Optional[str] = None
+        self._tokens: Optional[AsyncIterator[str]] = None
+
+    def __aiter__(self) -> "HedgedStream":
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._tokens.__anext__()
+
+    async def aclose(self) -> None:
+        await self._tokens.aclose()
+
+    def pipe(self, wrap: Callable[[AsyncIterator[str]], AsyncIterator[str]]) -> "HedgedStream":
+        """Pass the tokens through `wrap` (e.g. a cache recorder), keeping the winner visible."""
+        self._tokens = wrap(self._tokens)
+        return self
+
+
+class HedgedRouter:
+    """Routes LLM streams, hedging slow primaries with a secondary provider.
+
+    Every stream's time to first token is recorded per provider/model. When a
+    hedge route is configured for the primary and it has not produced a token
+    by its rolling TTFT quantile, the secondary is started too; whichever
+    streams a token first is committed to and the other is cancelled. A
+    primary that fails before its first token fails over immediately.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+        quantile: float = LLM_HEDGE_QUANTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        default_deadline: float = LLM_HEDGE_DEFAULT_DEADLINE,
+        min_deadline: float = LLM_HEDGE_MIN_DEADLINE,
+    ):
+        self.routes = parse_routes(LLM_HEDGE_ROUTES) if routes is None else routes
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_deadline = default_deadline
+        self.min_deadline = min_deadline
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._metrics: Dict[str, _StreamMetrics] = {}
+        self.counters = {"streams": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def histogram(self, label: str) -> LatencyHistogram:
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms.setdefault(label, LatencyHistogram())
+        return histogram
+
+    def deadline(self, label: str) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        histogram = self.histograms.get(label)
+        if histogram is None or len(histogram) < self.min_samples:
+            return self.default_deadline
+        return max(self.min_deadline, histogram.quantile(self.quantile))
+
+    async def admit(
+        self,
+        prompt: str,
+        provider: str = "openrouter",
+        model_name: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Wait for rate-limit budget on the primary, or fail over to its hedge route.
+
+        Args:
+            prompt: Full prompt, used to estimate token usage
+            provider: Primary provider name
+            model_name: Optional primary model override
+            deadline: Longest the caller will wait for budget, in seconds
+
+        Returns:
+            Tuple[str, Optional[str]]: Provider and model to send the request to
+
+        Raises:
+            RateLimitExceeded: If neither the primary nor its secondary has budget in time
+        """
+        provider = (provider or "openrouter").lower()
+        tokens = estimate_tokens(prompt)
+        try:
+            await schedulers.get(provider).acquire(tokens, deadline)
+            return provider, model_name
+        except RateLimitExceeded as e:
+            secondary_route = self.routes.get(provider)
+            if secondary_route is None:
+                raise
+            logger.warning(f"🔀 {e}; sending to {secondary_route[0]} instead")
+            self.counters["failovers"] += 1
+            await schedulers.get(secondary_route[0]).acquire(tokens, deadline)
+            return secondary_route
+
+    def stream(self, prompt: str, provider: str = "openrouter", model_name: Optional[str] = None) -> HedgedStream:
+        """
+        Stream a completion, hedging to the configured secondary if the primary is slow.
+
+        Call `admit` first; this only charges a hedge request against its budget.
+
+        Args:
+            prompt: Full prompt
+            provider: Primary provider name
+            model_name: Optional primary model override
+
+        Returns:
+            HedgedStream: Tokens from whichever provider won, naming the winner
+        """
+        served = HedgedStream()
+        served._tokens = self._stream(prompt, provider, model_name, served)
+        return served
+
+    async def _stream(
+        self, prompt: str, provider: str, model_name: Optional[str], served: HedgedStream
+    ) -> AsyncGenerator[str, None]:
+        provider = (provider or "openrouter").lower()
+        self.counters["streams"] += 1
+        in_flight = LLM_STREAMS_IN_FLIGHT.labels(provider)
+        in_flight.inc()
+        try:
+            primary = _Attempt(provider, model_name, prompt)
+        except Exception:
+            in_flight.dec()
+            raise
+        secondary_route = self.routes.get(provider)
+        attempts: List[_Attempt] = [primary]
+        winner: Optional[_Attempt] = None
+        try:
+            if secondary_route is not None:
+                done, _ = await asyncio.wait({primary.task}, timeout=self.deadline(primary.label))
+                if not done or primary.task.exception() is not None:
+                    self._record_slow(primary, failed=bool(done))
+                    scheduler, tokens = schedulers.get(secondary_route[0]), estimate_tokens(prompt)
+                    try:
+                        # A hedge is only worth sending if its budget is free right now
+                        scheduler.reserve(tokens, deadline=0)
+                    except RateLimitExceeded as e:
+                        logger.error(f"❌ Could not start hedge request to {secondary_route[0]}: {e}")
+                    else:
+                        try:
+                            attempts.append(_Attempt(*secondary_route, prompt))
+                        except Exception as e:
+                            scheduler.refund(tokens)
+                            logger.error(f"❌ Could not start hedge request to {secondary_route[0]}: {e}")
+            winner = await self._first_to_stream(attempts)
+            served.provider, served.model = winner.provider, winner.model
+            first = winner.task.result()
+            first_at = time.monotonic()
+            self.histogram(winner.label).observe(first_at - winner.started)
+            metrics = self._stream_metrics(winner)
+            metrics.ttft.observe(first_at - winner.started)
+            mark("llm_ttft", first_at - winner.started, provider=winner.provider, model=winner.model)
+            if winner is not primary:
+                self.counters["hedge_wins"] += 1
+                logger.info(f"🏁 Hedged stream won by {winner.label} over {primary.label}")
+            for attempt in attempts:
+                if attempt is not winner:
+                    if not attempt.task.done():
+                        # Its real TTFT is at least this long; recording it lets the deadline adapt upward
+                        self.histogram(attempt.label).observe(time.monotonic() - attempt.started)
+                    await attempt.cancel()
+            yield first
+            produced = 1
+            async for token in winner.stream:
+                if token:
+                    produced += 1
+                yield token
+            finished_at = time.monotonic()
+            metrics.duration.observe(finished_at - winner.started)
+            mark("llm_stream", finished_at - winner.started, provider=winner.provider, model=winner.model)
+            metrics.tokens.inc(produced)
+            if produced > 1 and finished_at > first_at:
+                metrics.tokens_per_second.observe((produced - 1) / (finished_at - first_at))
+        except Exception:
+            LLM_STREAM_ERRORS.labels(provider).inc()
+            raise
+        finally:
+            in_flight.dec()
+            # Client disconnects or errors must not leave upstream streams open
+            for attempt in attempts:
+                if attempt is not winner or not attempt.task.done():
+                    await attempt.cancel()
+            if winner is not None:
+                await winner.stream.aclose()
+
+    def _stream_metrics(self, attempt: _Attempt) -> _StreamMetrics:
+        metrics = self._metrics.get(attempt.label)
+        if metrics is None:
+            metrics = self._metrics.setdefault(attempt.label, _StreamMetrics(attempt.provider, attempt.model))
+        return metrics
+
+    async def _first_to_stream(self, attempts: List[_Attempt]) -> _Attempt:
+        pending = {attempt.task: attempt for attempt in attempts}
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempt = pending.pop(task)
+                if task.exception() is None:
+                    return attempt
+                error = task.exception()
+                logger.warning(f"⚠️ {attempt.label} failed before its first token: {error}")
+        raise error
+
+    def _record_slow(self, attempt: _Attempt, failed: bool) -> None:
+        elapsed = time.monotonic() - attempt.started
+        if failed:
+            self.counters["failovers"] += 1
+            logger.warning(f"🔀 {attempt.label} failed after {elapsed:.2f}s; failing over")
+            return
+        self.counters["hedged"] += 1
+        logger.info(f"⏱️ No token from {attempt.label} after {elapsed:.2f}s; starting hedge request")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self.counters,
+            "routes": {k: f"{p}:{m}" if m else p for k, (p, m) in self.routes.items()},
+            "ttft": {
+                label: {**h.snapshot(), "deadline": self.deadline(label)}
+                for label, h in self.histograms.items()
+            },
+        }
+
+
+# Process-wide router shared by every chat route
+hedged_router = HedgedRouter()
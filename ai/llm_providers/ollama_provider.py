@@ -1,34 +1,36 @@
 
-import os
-import requests
 import httpx
 import json
 from typing import AsyncGenerator
 from .base import LLMProvider
+from config.constants import OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE
 from utils.logger import logger
-from dotenv import load_dotenv
 
-load_dotenv()
+# Local models can take a while to load before the first token
+STREAM_TIMEOUT = httpx.Timeout(None, connect=10.0, pool=10.0)
 
 class OllamaProvider(LLMProvider):
-    def __init__(self, model_name="llama3.2-vision:latest", host=os.getenv('LLAMA3_API_KEY')):
+    def __init__(self, model_name="llama3.2-vision:latest", host=OLLAMA_BASE_URL, client: httpx.AsyncClient | None = None):
         self.model_name = model_name
-        self.host = host
+        self.host = host.rstrip("/")
+        # Shared keep-alive client from the provider registry
+        self.client = client or httpx.AsyncClient(timeout=None)
 
     async def generate_response(self, prompt: str, stream: bool = False):
     # async def generate_response(self, prompt: str, stream: bool = False):
-        logger.info(f"Looking for the generating response on : {prompt}")
+        logger.debug("Ollama prompt (%d chars): %s", len(prompt), prompt)
         url = f"{self.host}/api/generate"
         payload = {
             "model": self.model_name,
             "prompt": prompt,
-            "stream": stream
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
         }
-        logger.info(f"API URL : {url}")
+        logger.debug("API URL: %s", url)
         
 
         try:
-            r = requests.post(url, json=payload)
+            r = await self.client.post(url, json=payload, timeout=None)
             if r.status_code == 200:
                 response_json = r.json()
                 response = response_json.get("response")
@@ -48,40 +50,51 @@ class OllamaProvider(LLMProvider):
         """
         Generate a response from the LLM in a streaming manner.
 
+        Tokens are yielded as Ollama emits each NDJSON line. If the consumer
+        stops early, leaving the `stream` context closes the connection, which
+        makes Ollama abort the generation.
+
         Args:
             prompt: The input prompt for the LLM
 
         Returns:
             AsyncGenerator[str, None]: A generator yielding response chunks
         """
-        logger.info(f"Streaming response for prompt: {prompt}")
+        logger.debug("Ollama streaming prompt (%d chars): %s", len(prompt), prompt)
         url = f"{self.host}/api/generate"
         payload = {
             "model": self.model_name,
             "prompt": prompt,
-            "stream": True  # Keep this to inform the API that you want streaming
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                # No stream=True here
-                response = await client.post(url, json=payload)
-                
-                if response.status_code == 200:
-                    # Stream the response using aiter_lines
-                    async for line in response.aiter_lines():
-                        if line:
-                            # Parse the JSON string into a dictionary
-                            try:
-                                parsed_line = json.loads(line)
-                                # Access the 'response' field from the parsed dictionary
-                                yield parsed_line.get("response", "")
-                            except json.JSONDecodeError as e:
-                                logger.error(f"Error parsing JSON: {e}")
-                                yield ""  # If JSON parsing fails, yield empty string
-                else:
-                    logger.error(f"Failed to get response, status code: {response.status_code}")
-                    yield ""
+            async with self.client.stream("POST", url, json=payload, timeout=STREAM_TIMEOUT) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise RuntimeError(f"Ollama returned status {response.status_code}: {body[:200]!r}")
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        parsed_line = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Error parsing JSON: {e}")
+                        continue
+                    if parsed_line.get("error"):
+                        raise RuntimeError(f"Ollama stream error: {parsed_line['error']}")
+                    token = parsed_line.get("response")
+                    if token:
+                        yield token
+                    if parsed_line.get("done"):
+                        logger.debug(
+                            f"Ollama done: eval_count={parsed_line.get('eval_count')} "
+                            f"load_duration={parsed_line.get('load_duration')}"
+                        )
+                        break
         except Exception as e:
+            # Raised so a failed stream never completes and is never cached as an answer
             logger.error(f"Error during request: {e}")
-            yield ""
+            raise
@@ -4,19 +4,26 @@ import os
 import json
 import httpx
 import asyncio
+from config.constants import OPENROUTER_BASE_URL
 from utils.logger import logger
+from .rate_limit import RateLimitExceeded, retry_after_seconds, schedulers
+
+# Streams may think for a long time between tokens; only bound connect/pool waits
+STREAM_TIMEOUT = httpx.Timeout(None, connect=10.0, pool=10.0)
 
 class OpenRouterProvider(LLMProvider):
     """LLM provider for OpenRouter"""
 
-    BASE_URL = "https://openrouter.ai/api/v1"
+    BASE_URL = OPENROUTER_BASE_URL.rstrip("/")
 
-    def __init__(self, model_name: str | None = None):
+    def __init__(self, model_name: str | None = None, client: httpx.AsyncClient | None = None):
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise ValueError("OPENROUTER_API_KEY not set in environment variables.")
         self.api_key = api_key
         self.model_name = model_name or os.getenv("OPENROUTER_MODEL", "gpt-3.5-turbo")
+        # Shared keep-alive client from the provider registry
+        self.client = client or httpx.AsyncClient(timeout=60)
 
         # Log basic configuration
         logger.info(f"🤖 OpenRouter initialized with model: {self.model_name}")
@@ -39,28 +46,24 @@ class OpenRouterProvider(LLMProvider):
                     "messages": [{"role": "user", "content": prompt}],
                 }
 
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{self.BASE_URL}/chat/completions",
-                        headers=self.headers,
-                        json=payload,
-                        timeout=60,
-                    )
+                response = await self.client.post(
+                    f"{self.BASE_URL}/chat/completions",
+                    headers=self.headers,
+                    json=payload,
+                    timeout=60,
+                )
 
-                    response.raise_for_status()
-                    data = response.json()
+                self._check_rate_limit(response)
+                response.raise_for_status()
+                data = response.json()
 
-                    return data["choices"][0]["message"]["content"].strip()
+                return data["choices"][0]["message"]["content"].strip()
+            except RateLimitExceeded:
+                # The scheduler now holds new requests; retrying here would just pin the socket
+                raise
             except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429 and attempt < retries - 1:
-                    # Rate limited - exponential backoff
-                    wait_time = (2 ** attempt) * 60  # 2min, 4min, 8min
-                    logger.warning(f"🚦 OpenRouter rate limited (attempt {attempt + 1}/{retries}). Waiting {wait_time}s before retry.")
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"❌ OpenRouter HTTP {e.response.status_code}: {e.response.text[:200]}...")
-                    raise
+                logger.error(f"❌ OpenRouter HTTP {e.response.status_code}: {e.response.text[:200]}...")
+                raise
             except Exception as e:
                 logger.error(f"💥 OpenRouter request failed: {str(e)}")
                 if attempt < retries - 1:
@@ -76,24 +79,38 @@ class OpenRouterProvider(LLMProvider):
             "messages": [{"role": "user", "content": prompt}],
             "stream": True,
         }
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{self.BASE_URL}/chat/completions",
-                headers=self.headers,
-                json=payload,
-            ) as response:
-                async for line in response.aiter_lines():
-                    if not line or not line.startswith("data:"):
-                        continue
-                    data = line[len("data:"):].strip()
-                    if data == "[DONE]":
-                        break
-                    try:
-                        chunk = json.loads(data)
-                        content = chunk["choices"][0]["delta"].get("content")
-                        if content:
-                            yield content
-                    except Exception as e:
-                        logger.error(f"Error parsing OpenRouter stream chunk: {e}")
-                        continue
+        async with self.client.stream(
+            "POST",
+            f"{self.BASE_URL}/chat/completions",
+            headers=self.headers,
+            json=payload,
+            timeout=STREAM_TIMEOUT,
+        ) as response:
+            self._check_rate_limit(response)
+            if response.status_code >= 400:
+                await response.aread()
+                logger.error(f"❌ OpenRouter HTTP {response.status_code}: {response.text[:200]}...")
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                    content = chunk["choices"][0]["delta"].get("content")
+                    if content:
+                        yield content
+                except Exception as e:
+                    logger.error(f"Error parsing OpenRouter stream chunk: {e}")
+                    continue
+
+    def _check_rate_limit(self, response: httpx.Response) -> None:
+        """Feed rate-limit headers to the shared scheduler; raise on 429."""
+        scheduler = schedulers.get("openrouter")
+        scheduler.update_from_headers(response.headers)
+        if response.status_code == 429:
+            retry_after = retry_after_seconds(response.headers, default=5.0)
+            scheduler.penalize(retry_after)
+            raise RateLimitExceeded("openrouter", retry_after)
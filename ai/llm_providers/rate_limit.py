@@ -0,0 +1,250 @@
+import asyncio
+import email.utils
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from config.constants import LLM_QUEUE_MAX, LLM_QUEUE_MAX_WAIT, LLM_RATE_LIMITS
+from utils.logger import logger
+from utils.tokenizer import count_tokens
+
+# Completion tokens reserved per request on top of the prompt for tokens/min budgets
+COMPLETION_TOKEN_ESTIMATE = 512
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of queueing when a provider's budget cannot be met in time."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} rate limit reached; retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Budget of `per_minute` units refilling continuously; 0 means unlimited.
+
+    The level may go negative: callers reserve capacity up front and wait out
+    the deficit, which keeps waiters in FIFO order without a separate queue.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def refill(self, now: float) -> None:
+        if self.unlimited:
+            return
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` units would be available."""
+        if self.unlimited or self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.per_minute
+
+    def set_limit(self, per_minute: float) -> None:
+        if per_minute > 0 and per_minute != self.per_minute:
+            if self.unlimited:
+                self.level = per_minute
+            self.per_minute = per_minute
+
+
+class ProviderScheduler:
+    """Requests/min and tokens/min budgets shared by every call to one provider.
+
+    `acquire` reserves budget and sleeps until it is available. When the wait
+    would exceed the caller's deadline, or too many callers are already
+    waiting, it raises `RateLimitExceeded` with a retry hint instead.
+    Budgets tighten from upstream rate-limit headers and 429 responses.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_queue: int = LLM_QUEUE_MAX,
+        max_wait: float = LLM_QUEUE_MAX_WAIT,
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0, deadline: Optional[float] = None) -> float:
+        """
+        Reserve budget for one request and return how long to wait before sending it.
+
+        Args:
+            tokens: Estimated prompt plus completion tokens
+            deadline: Longest wait the caller accepts, in seconds
+
+        Returns:
+            float: Seconds to wait
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed the deadline or the queue is full
+        """
+        limit = self.max_wait if deadline is None else min(deadline, self.max_wait)
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(
+                self.blocked_until - now,
+                self.requests.wait_for(1),
+                self.tokens.wait_for(tokens),
+            )
+            if wait > limit or (wait > 0 and self.waiting >= self.max_queue):
+                self.rejected += 1
+                raise RateLimitExceeded(self.provider, max(wait, 1.0))
+            if not self.requests.unlimited:
+                self.requests.level -= 1
+            if not self.tokens.unlimited:
+                self.tokens.level -= tokens
+            self.admitted += 1
+            return max(wait, 0.0)
+
+    async def acquire(self, tokens: int = 0, deadline: Optional[float] = None) -> None:
+        """Reserve budget and wait until the request may be sent."""
+        wait = self.reserve(tokens, deadline)
+        if wait <= 0:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # The request will never be sent; hand its budget to later callers
+            self.refund(tokens)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def refund(self, tokens: int = 0) -> None:
+        """Return a reservation whose request was never sent."""
+        with self._lock:
+            if not self.requests.unlimited:
+                self.requests.level = min(self.requests.per_minute, self.requests.level + 1)
+            if not self.tokens.unlimited:
+                self.tokens.level = min(self.tokens.per_minute, self.tokens.level + tokens)
+            self.admitted -= 1
+
+    def penalize(self, retry_after: float) -> None:
+        """Hold every request to this provider for `retry_after` seconds (after a 429)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"🚦 {self.provider} rate limited; holding requests for {retry_after:.1f}s")
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adopt budgets advertised by the upstream (OpenAI/OpenRouter-style headers)."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        now = time.monotonic()
+        with self._lock:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = _number(headers.get(f"x-ratelimit-limit-{kind}"))
+                remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+                reset = _reset_seconds(headers.get(f"x-ratelimit-reset-{kind}"))
+                if kind == "requests":
+                    # OpenRouter's unsuffixed headers describe request budgets
+                    limit = limit if limit is not None else _number(headers.get("x-ratelimit-limit"))
+                    remaining = remaining if remaining is not None else _number(headers.get("x-ratelimit-remaining"))
+                    reset = reset if reset is not None else _reset_seconds(headers.get("x-ratelimit-reset"))
+                if limit is not None:
+                    # Advertised limits are per minute, like the configured budgets
+                    bucket.set_limit(limit)
+                if remaining is not None and not bucket.unlimited:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, remaining)
+                if remaining == 0 and reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "requests_per_minute": self.requests.per_minute,
+            "tokens_per_minute": self.tokens.per_minute,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "blocked_for": max(0.0, self.blocked_until - time.monotonic()),
+        }
+
+
+def retry_after_seconds(headers: Mapping[str, str], default: float = 1.0) -> float:
+    """Parse a Retry-After header (seconds or HTTP date), falling back to `default`."""
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return _reset_seconds(headers.get("x-ratelimit-reset")) or default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _reset_seconds(value: Optional[str]) -> Optional[float]:
+    """Reset hints come as durations ("6m0s", "250ms"), seconds, or epoch milliseconds."""
+    if not value:
+        return None
+    number = _number(value)
+    if number is None:
+        parts = _DURATION_RE.findall(value)
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts) if parts else None
+    if number > 1e12:
+        return max(0.0, number / 1000.0 - time.time())
+    if number > 1e9:
+        return max(0.0, number - time.time())
+    return number
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Tokens charged against a tokens/min budget: the prompt plus a completion allowance."""
+    # Bypass count_tokens' cache: prompts are large and rarely repeat
+    return count_tokens.__wrapped__(prompt) + COMPLETION_TOKEN_ESTIMATE
+
+
+class Schedulers:
+    """Lazily created scheduler per provider, configured from LLM_RATE_LIMITS."""
+
+    def __init__(self):
+        self._schedulers: Dict[str, ProviderScheduler] = {}
+
+    def get(self, provider: str) -> ProviderScheduler:
+        provider = (provider or "openrouter").lower()
+        scheduler = self._schedulers.get(provider)
+        if scheduler is None:
+            rpm, tpm = LLM_RATE_LIMITS.get(provider, (0, 0))
+            scheduler = self._schedulers.setdefault(provider, ProviderScheduler(provider, rpm, tpm))
+        return scheduler
+
+    def stats(self) -> Dict[str, object]:
+        return {name: scheduler.stats() for name, scheduler in self._schedulers.items()}
+
+
+schedulers = Schedulers()
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from config.constants import (
+    LLM_HTTP2,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_PREWARM_PROVIDERS,
+    OLLAMA_BASE_URL,
+    OPENROUTER_BASE_URL,
+)
+from utils.logger import logger
+from utils.tracing import span
+from .base import LLMProvider
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Upstream base URL per provider; one pooled client is kept per upstream
+UPSTREAMS = {
+    "openrouter": OPENROUTER_BASE_URL,
+    "ollama": OLLAMA_BASE_URL,
+}
+# Gemini talks gRPC through google-generativeai, so it has no httpx upstream
+PROVIDERS = (*UPSTREAMS, "gemini")
+
+
+class ProviderRegistry:
+    """Process-wide cache of LLM providers and their pooled HTTP clients.
+
+    Each provider/model pair is built once and shares a keep-alive
+    `httpx.AsyncClient` with every other provider on the same upstream, so
+    chats reuse warm TCP+TLS connections instead of handshaking per request.
+    """
+
+    def __init__(self):
+        self._providers: Dict[Tuple[str, Optional[str]], LLMProvider] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._last_warm: Dict[str, float] = {}
+
+    def http_client(self, base_url: str) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, creating it on first use."""
+        client = self._clients.get(base_url)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(base_url)
+            if client is None:
+                http2 = LLM_HTTP2 and _HTTP2_AVAILABLE
+                client = httpx.AsyncClient(
+                    http2=http2,
+                    limits=httpx.Limits(
+                        max_connections=LLM_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                )
+                self._clients[base_url] = client
+                logger.info(f"🔌 Created pooled HTTP client for {base_url} (http2={http2})")
+        return client
+
+    def get(self, provider: str = "openrouter", model_name: Optional[str] = None) -> LLMProvider:
+        """
+        Return the provider instance for a provider/model pair.
+
+        Args:
+            provider: Provider name ("openrouter", "ollama", "gemini")
+            model_name: Optional model override; None uses the provider default
+
+        Returns:
+            LLMProvider: Shared provider instance
+        """
+        provider = (provider or "openrouter").lower()
+        if provider not in PROVIDERS:
+            provider = "openrouter"
+        key = (provider, model_name)
+        instance = self._providers.get(key)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._providers.get(key)
+        if instance is None:
+            instance = self._create(provider, model_name)
+            with self._lock:
+                instance = self._providers.setdefault(key, instance)
+        return instance
+
+    async def prewarm(self, providers: Iterable[str] = LLM_PREWARM_PROVIDERS) -> None:
+        """Open a pooled connection to each upstream so the first chat skips the handshake."""
+        async def _warm(name: str) -> None:
+            base_url = UPSTREAMS.get(name)
+            if not base_url:
+                return
+            try:
+                await self.http_client(base_url).head(base_url, timeout=5.0)
+                self._last_warm[base_url] = time.monotonic()
+                logger.info(f"🔥 Pre-warmed connection to {name} ({base_url})")
+            except Exception as e:
+                logger.warning(f"Could not pre-warm {name} ({base_url}): {e}")
+
+        await asyncio.gather(*(_warm(name) for name in providers))
+
+    async def ensure_warm(self, provider: str) -> None:
+        """
+        Re-open the upstream connection for a provider if it may have idled out.
+
+        Meant to run alongside retrieval so the LLM handshake overlaps the
+        embedding round-trip; a no-op while the pooled connection is fresh.
+        """
+        base_url = UPSTREAMS.get((provider or "openrouter").lower())
+        if not base_url:
+            return
+        now = time.monotonic()
+        if now - self._last_warm.get(base_url, float("-inf")) < LLM_KEEPALIVE_EXPIRY / 2:
+            return
+        self._last_warm[base_url] = now
+        try:
+            with span("connect", provider=provider):
+                await self.http_client(base_url).head(base_url, timeout=5.0)
+        except Exception as e:
+            logger.debug(f"Could not warm {provider} ({base_url}): {e}")
+
+    async def aclose(self) -> None:
+        """Close every pooled client; providers are rebuilt on next use."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._providers.clear()
+            self._last_warm.clear()
+        for client in clients:
+            await client.aclose()
+
+    def _create(self, provider: str, model_name: Optional[str]) -> LLMProvider:
+        if provider == "gemini":
+            from .gemini_provider import GeminiProvider
+            return GeminiProvider(model_name) if model_name else GeminiProvider()
+        client = self.http_client(UPSTREAMS[provider])
+        kwargs = {"client": client}
+        if model_name:
+            kwargs["model_name"] = model_name
+        if provider == "ollama":
+            from .ollama_provider import OllamaProvider
+            return OllamaProvider(**kwargs)
+        from .openrouter_provider import OpenRouterProvider
+        return OpenRouterProvider(**kwargs)
+
+
+registry = ProviderRegistry()
@@ -1,13 +1,31 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from utils.logger import logger
 from routes.main_router import main_router
+from routes.metrics_router import router as metrics_router
+from services.startup import warm_up, shut_down
+from utils.admission import AdmissionControlMiddleware
+from utils.tracing import TracingMiddleware
+from config.constants import ADMISSION_CONTROL_ENABLED, TRACING_ENABLED
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect external clients in the background: the worker answers
+    # /api/health/live immediately and /api/health/ready once connected.
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    await shut_down()
+
+
 app = FastAPI(
     title="Chatbot Server",
     version='1.0',
@@ -20,9 +38,14 @@ app = FastAPI(
 
         This API is designed to power an AI chatbot service.
     """,
-    #lifespan=lifespan,
+    lifespan=lifespan,
 )
 
+# Per-route concurrency limits and load shedding; added before CORS so
+# rejections still carry CORS headers
+if ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -32,7 +55,13 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Outermost, so Server-Timing covers admission queueing too
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 app.include_router(main_router, prefix='/api')
+# Scraped at the conventional path, outside the /api prefix
+app.include_router(metrics_router, tags=["Metrics"])
 
 @app.get("/", tags=["Root"])
 def root():
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 # Define the ChatRequest using Pydantic
 class ChatRequest(BaseModel):
@@ -8,3 +8,25 @@ class ChatRequest(BaseModel):
     documents: List[str] = []
     stream: bool = False
     provider: str = 'openrouter'
+    # Set False to bypass the answer and completion caches
+    cache: bool = True
+    # Longest the client will wait for provider rate-limit budget (seconds)
+    timeout: Optional[float] = None
+    # Conversation ID; follow-ups in a session reuse the previous turn's retrieved chunks
+    session_id: Optional[str] = None
+
+
+class BatchChatItem(BaseModel):
+    question: str
+    documents: List[str] = []
+    # Echoed back on the item's result line
+    id: Optional[str] = None
+
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+    provider: str = 'openrouter'
+    # Set False to bypass the completion cache
+    cache: bool = True
+    # Longest each item will wait for provider rate-limit budget (seconds)
+    timeout: Optional[float] = None
@@ -1,33 +1,79 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
-from models.chat_model import ChatRequest
-from utils.response_formatter import format_error_response
+from models.chat_model import BatchChatRequest, ChatRequest
+from utils.response_formatter import format_error_response, format_rate_limited_response, format_success_response
 from services.chatbot_service import ChatbotService
+from services.chat_session import chat_sessions
+from services.batch_chat import BatchChatService
+from config.constants import BATCH_MAX_ITEMS
+from llm_providers.rate_limit import RateLimitExceeded
+from utils.sse import chat_streaming_response
 from utils.logger import logger
 
 router = APIRouter()
 
 @router.post('/chat')
-async def chatbot(chat: ChatRequest):
+async def chatbot(chat: ChatRequest, request: Request):
     """
     Endpoint to handle chat requests and return streaming responses.
 
+    Clients sending `Accept: text/event-stream` get typed SSE events
+    (sources, token, done, error); others get the plain-text stream.
+
     Args:
         chat (ChatRequest): The chat request containing question and documents.
+        request (Request): Incoming request, used to pick the stream format.
     Returns:
         StreamingResponse: Always returns a streaming response for better UX.
     """
     try:
         chatbot_service = ChatbotService()
+        # Resolved before the response starts so rate limits surface as a 429
+        response_gen = await chatbot_service.get_response(chat)
 
-        async def stream_gen():
-            response_gen = await chatbot_service.get_response(chat)
-            async for chunk in response_gen:
-                logger.debug(f"Streaming chunk: {chunk[:50]}...")
-                yield chunk
-
-        return StreamingResponse(stream_gen(), media_type="text/plain")
+        return chat_streaming_response(request, response_gen)
 
+    except RateLimitExceeded as e:
+        logger.warning(f"Chatbot rate limited: {e}")
+        return format_rate_limited_response(str(e), e.retry_after)
     except Exception as e:
         logger.error(f"Chatbot error: {str(e)}")
         return format_error_response(str(e), status_code=500)
+
+@router.post('/chat/batch')
+async def chatbot_batch(batch: BatchChatRequest):
+    """
+    Answer many questions in one request, for evaluation and bulk Q&A runs.
+
+    Questions are embedded and searched in batches, LLM calls run with
+    bounded per-provider concurrency, and results stream back as NDJSON
+    lines in completion order (each carries its input `index`), followed
+    by a summary line.
+
+    Args:
+        batch (BatchChatRequest): Items (question, documents, optional id) and shared settings.
+    Returns:
+        StreamingResponse: application/x-ndjson stream of results.
+    """
+    if not batch.items:
+        return format_error_response("Batch has no items", status_code=400)
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        return format_error_response(f"Batch exceeds {BATCH_MAX_ITEMS} items", status_code=413)
+    try:
+        lines = await BatchChatService().run(batch)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    except Exception as e:
+        logger.error(f"Batch chat error: {str(e)}")
+        return format_error_response(str(e), status_code=500)
+
+@router.delete('/chat/sessions/{session_id}')
+async def end_session(session_id: str):
+    """
+    Drop a chat session's retained chunks once the conversation is over.
+
+    Args:
+        session_id (str): The conversation ID sent with chat requests.
+    Returns:
+        JSON response saying whether the session existed.
+    """
+    return format_success_response(data={"ended": chat_sessions.end(session_id)})
@@ -3,6 +3,7 @@ from utils.response_formatter import format_success_response, format_error_respo
 from models.document_model import Document, Documents, LocalDocument
 from services.document import DocumentService
 from services.store import StoreService
+from utils.executor import run_blocking
 from utils.logger import logger
 import os
 
@@ -50,7 +51,8 @@ async def embedd_local_file(request_data: dict):
                 file_type=os.path.splitext(path)[-1],
                 file_size=os.path.getsize(path),
             )
-            result = document_object.local_process_document(document)
+            # Parsing and embedding block; keep them off the event loop
+            result = await run_blocking(document_object.local_process_document, document)
             response.append(result)
 
         return format_success_response(data=response)
@@ -59,6 +61,64 @@ async def embedd_local_file(request_data: dict):
         logger.exception(f"Error while embedding local files: {e}")
         return format_error_response("Internal Server Error", status_code=500)
 
+@router.delete('/embedd/{document_id}')
+async def delete_document_embeddings(document_id: str):
+    """
+    Delete all stored chunks of a document.
+    Args:
+        document_id: ID of the document to delete
+    Returns:
+        JSON response indicating success or failure.
+    """
+    try:
+        # Off the loop: deletes wait while a re-index cut-over has writes paused
+        result = await run_blocking(DocumentService().delete_document, document_id)
+        return format_success_response(data=result)
+    except Exception as e:
+        logger.exception(f"Error deleting document {document_id}: {e}")
+        return format_error_response("Internal Server Error", status_code=500)
+
+@router.get('/debug/cache')
+async def debug_cache():
+    """
+    Debug endpoint exposing retrieval and answer cache hit ratios and memory use.
+    Returns:
+        JSON response with cache statistics.
+    """
+    from services.retrieval_cache import retrieval_cache
+    from services.answer_cache import answer_cache
+    from services.completion_cache import completion_cache
+    from services.single_flight import single_flight
+    from services.chat_session import chat_sessions
+    return format_success_response(data={
+        **retrieval_cache.stats(),
+        "answers": answer_cache.stats(),
+        "completions": completion_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "sessions": chat_sessions.stats(),
+    })
+
+@router.get('/debug/llm')
+async def debug_llm():
+    """
+    Debug endpoint exposing per-provider TTFT histograms, hedging counters and rate limits.
+    Returns:
+        JSON response with LLM routing statistics.
+    """
+    from llm_providers.hedging import hedged_router
+    from llm_providers.rate_limit import schedulers
+    return format_success_response(data={**hedged_router.stats(), "rate_limits": schedulers.stats()})
+
+@router.get('/debug/admission')
+async def debug_admission():
+    """
+    Debug endpoint exposing admission-control queue depth, in-flight requests and shed counts.
+    Returns:
+        JSON response with per-route admission statistics.
+    """
+    from utils.admission import admission
+    return format_success_response(data=admission.stats())
+
 @router.get('/debug/documents/{document_id}')
 async def debug_document_chunks(document_id: str):
     """
@@ -73,8 +133,6 @@ async def debug_document_chunks(document_id: str):
         
         # Search all chunks with this document ID
         from qdrant_client.models import Filter, FieldCondition, MatchValue
-        from utils.qdrant_db import client
-        from config.constants import QDRANT_COLLECTION_NAME
         
         # Filter by document ID
         filter_condition = Filter(
@@ -87,8 +145,8 @@ async def debug_document_chunks(document_id: str):
         )
         
         # Search with no vector (scroll through all matching)
-        results = client.scroll(
-            collection_name=QDRANT_COLLECTION_NAME,
+        results = store_service.client.scroll(
+            collection_name=store_service.collection_name,
             scroll_filter=filter_condition,
             limit=100,
             with_payload=True,
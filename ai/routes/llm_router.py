@@ -1,15 +1,15 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request
 from services.response_generator import generate_response
-from utils.response_formatter import format_success_response, format_error_response
+from utils.response_formatter import format_success_response, format_error_response, format_rate_limited_response
+from llm_providers.rate_limit import RateLimitExceeded
 from models.chat_model import ChatRequest
+from utils.sse import chat_streaming_response
 from utils.logger import logger
-import asyncio
 
 router = APIRouter(prefix='/chat')
 
 @router.post("/llm")
-async def call_llm(chat: ChatRequest):
+async def call_llm(chat: ChatRequest, request: Request):
     try:
         # Extract question and stream flag from the incoming request
         prompt = chat.question
@@ -17,18 +17,20 @@ async def call_llm(chat: ChatRequest):
         provider = chat.provider
 
         if stream:
-            # Ensure async generator is being correctly iterated
-            async def stream_gen():
-                async for chunk in generate_response(prompt, provider=provider, stream=True):
-                    logger.debug(f"Yielding chunk on route: {chunk}")
-                    yield chunk
-                    await asyncio.sleep(0.02)
+            # Resolved before the response starts so rate limits surface as a 429
+            response_gen = await generate_response(
+                prompt, provider=provider, stream=True, use_cache=chat.cache, route="chat_llm", deadline=chat.timeout
+            )
+            return chat_streaming_response(request, response_gen)
 
-            return StreamingResponse(stream_gen(), media_type="text/plain")
-
-        response = await generate_response(prompt, provider)
+        response = await generate_response(
+            prompt, provider, use_cache=chat.cache, route="chat_llm", deadline=chat.timeout
+        )
         return format_success_response(response)
 
+    except RateLimitExceeded as e:
+        logger.warning(f"LLM route rate limited: {e}")
+        return format_rate_limited_response(str(e), e.retry_after)
     except Exception as e:
         logger.exception(f"LLM route error: {e}")
         return format_error_response("Internal Server Error", status_code=500)
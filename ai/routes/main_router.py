@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from utils.logger import logger
 from qdrant_client import QdrantClient
 import socket
@@ -7,12 +8,14 @@ import os
 from routes.llm_router import router as llm_routes
 from routes.embed_router import router as embed_routes
 from routes.chatbot_router import router as chatbot_routes
+from routes.profiling_router import router as profiling_routes
 
 main_router = APIRouter()
 
 main_router.include_router(embed_routes, tags=["Embed"])
 main_router.include_router(chatbot_routes, tags=["Chatbot"])
 main_router.include_router(llm_routes, tags=["LLM"])
+main_router.include_router(profiling_routes, prefix="/debug/profile", tags=["Profiling"])
 
 def check_qdrant_health() -> dict:
     """
@@ -137,6 +140,17 @@ def check_LLM_health() -> dict:
 
     return health_status
 
+@main_router.get("/health/live")
+def liveness():
+    """Liveness probe: the worker is up and serving requests."""
+    return {"status": "alive"}
+
+@main_router.get("/health/ready")
+def readiness_probe():
+    """Readiness probe: 200 once external clients are connected, 503 before."""
+    from services.startup import readiness
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.snapshot())
+
 @main_router.get("/health/qdrant")
 def qdrant_health():
     return check_qdrant_health()
@@ -145,6 +159,14 @@ def qdrant_health():
 def llm_health():
     return check_LLM_health()
 
+@main_router.get("/health/reindex")
+def reindex_status():
+    """Report progress of a background embedding-model re-index, if one is running."""
+    from services.reindex import current_migration
+    if current_migration is None:
+        return {"state": "idle"}
+    return current_migration.status
+
 @main_router.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -0,0 +1,125 @@
+import asyncio
+import hmac
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from config.constants import ADMIN_TOKEN, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL
+from utils.logger import logger
+from utils.profiler import ProfilerBusy, cpu_profiler, memory_profiler
+from utils.response_formatter import format_error_response, format_success_response
+
+router = APIRouter()
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+
+def _check_admin(request: Request) -> Optional[JSONResponse]:
+    """Return an error response unless the request carries the admin token."""
+    if not ADMIN_TOKEN:
+        # Disabled without a token: don't advertise the endpoints
+        return format_error_response("Not Found", status_code=404)
+    token = request.headers.get("x-admin-token", "")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return format_error_response("Admin token required", status_code=401)
+    return None
+
+
+@router.get('/cpu')
+async def profile_cpu(request: Request, seconds: float = 10.0, interval: Optional[float] = None, idle: bool = False):
+    """
+    Sample every thread's stack for a while and return collapsed stacks.
+
+    The output feeds flamegraph.pl, speedscope or inferno directly.
+    Args:
+        seconds: How long to sample (capped by PROFILE_MAX_SECONDS)
+        interval: Seconds between samples (default PROFILE_SAMPLE_INTERVAL)
+        idle: Include threads parked in waits, selects and queue gets
+    Returns:
+        Plain-text collapsed stacks, one `frame;frame;... count` line per stack.
+    """
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return format_error_response(f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]", status_code=400)
+    interval = interval or PROFILE_SAMPLE_INTERVAL
+    if not 0.001 <= interval <= 1:
+        return format_error_response("interval must be between 0.001 and 1 second", status_code=400)
+    if cpu_profiler.running:
+        return format_error_response("A CPU profile is already running", status_code=409)
+
+    logger.info(f"🔬 CPU profile started ({seconds:g}s every {interval * 1000:g}ms)")
+    try:
+        # Its own thread, so it neither blocks the loop nor holds an executor worker
+        result = await asyncio.to_thread(cpu_profiler.profile, seconds, interval, idle)
+    except ProfilerBusy as e:
+        return format_error_response(str(e), status_code=409)
+    logger.info(f"🔬 CPU profile finished: {result['samples']} samples over {result['ticks']} ticks")
+    return PlainTextResponse(
+        result["collapsed"],
+        headers={
+            "Content-Disposition": f'attachment; filename="cpu-{int(time.time())}.collapsed"',
+            "X-Profile-Samples": str(result["samples"]),
+            "X-Profile-Ticks": str(result["ticks"]),
+        },
+    )
+
+
+@router.post('/memory/start')
+async def memory_start(request: Request, frames: int = 25):
+    """
+    Start tracemalloc and take the baseline snapshot (restarts if already running).
+    Args:
+        frames: Stack frames kept per allocation; more frames cost more memory
+    Returns:
+        JSON response with tracing status.
+    """
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    if not 1 <= frames <= 100:
+        return format_error_response("frames must be between 1 and 100", status_code=400)
+    status = await asyncio.to_thread(memory_profiler.start, frames)
+    logger.info(f"🔬 Memory profiling started ({frames} frames)")
+    return format_success_response(data=status)
+
+
+@router.get('/memory')
+async def memory_diff(request: Request, limit: int = 30, group_by: str = "lineno", reset: bool = False):
+    """
+    Diff a new tracemalloc snapshot against the baseline.
+    Args:
+        limit: Number of allocation sites to return, largest growth first
+        group_by: "lineno", "filename" or "traceback"
+        reset: Use the new snapshot as the baseline for the next diff
+    Returns:
+        JSON response with traced totals and the top allocation differences.
+    """
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    if group_by not in GROUP_BY:
+        return format_error_response(f"group_by must be one of {', '.join(GROUP_BY)}", status_code=400)
+    try:
+        # Snapshots of a large heap take a while; keep them off the event loop
+        data = await asyncio.to_thread(memory_profiler.diff, max(1, limit), group_by, reset)
+    except RuntimeError as e:
+        return format_error_response(str(e), status_code=409)
+    return format_success_response(data=data)
+
+
+@router.post('/memory/stop')
+async def memory_stop(request: Request):
+    """
+    Stop tracemalloc and drop the baseline, removing its overhead.
+    Returns:
+        JSON response with the final tracing status.
+    """
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    status = memory_profiler.stop()
+    logger.info("🔬 Memory profiling stopped")
+    return format_success_response(data=status)
@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL,
+)
+from services.document_versions import document_versions, DocumentVersions
+from services.retrieval_cache import question_fingerprint
+from utils.metrics import CACHE_LOOKUPS
+
+_hit = CACHE_LOOKUPS.labels("answer", "hit")
+_miss = CACHE_LOOKUPS.labels("answer", "miss")
+
+# Characters per chunk when a cached answer is replayed as a stream
+_REPLAY_CHUNK_CHARS = 64
+
+
+@dataclass
+class CachedAnswer:
+    """A final LLM answer and the question it was generated for."""
+    question: str
+    answer: str
+    vector: Optional[np.ndarray]
+    versions: Tuple[int, ...]
+    created_at: float
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class _Bucket:
+    """Answers for one (documents, provider, model, prompt version) scope."""
+
+    __slots__ = ("entries", "_matrix")
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> Optional[np.ndarray]:
+        """Stacked question vectors; answers cached without one get a zero row that never matches."""
+        if self._matrix is None:
+            vectors = [entry.vector for entry in self.entries.values()]
+            dim = next((len(v) for v in vectors if v is not None), None)
+            if dim is None:
+                return None
+            zero = np.zeros(dim, dtype=np.float32)
+            self._matrix = np.stack([zero if v is None else v for v in vectors])
+        return self._matrix
+
+    def changed(self) -> None:
+        self._matrix = None
+
+
+class AnswerCache:
+    """Semantic cache of final answers, scoped by document set and model.
+
+    Questions are matched by cosine similarity of their embeddings, but only
+    against answers produced for the exact same sorted document set, provider,
+    model and prompt version. Entries record the document versions observed
+    before retrieval ran and are dropped as soon as any of those documents is
+    re-ingested or deleted, or once past the versions' staleness cap.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = ANSWER_CACHE_TTL,
+        versions: DocumentVersions = document_versions,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.versions = versions
+        self._buckets: Dict[tuple, _Bucket] = {}
+        # Global recency order of (scope, question fingerprint) for eviction
+        self._lru: "OrderedDict[tuple, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        versions.subscribe(self.invalidate_document)
+
+    @staticmethod
+    def make_scope(document_ids: Sequence[str], provider: str, model: str, prompt_version: str) -> tuple:
+        return (tuple(sorted(set(document_ids))), provider, model, prompt_version)
+
+    def lookup_exact(self, scope: tuple, question: str) -> Optional[CachedAnswer]:
+        """Return the answer cached for the same normalized question, if any."""
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            entry = bucket.entries.get(question_fingerprint(question)) if bucket else None
+            if entry is not None and self._fresh(scope, entry):
+                self._touch(scope, question_fingerprint(question))
+                self.hits += 1
+                self.exact_hits += 1
+                _hit.inc()
+                return entry
+            return None
+
+    def lookup(self, scope: tuple, vector: Sequence[float]) -> Optional[CachedAnswer]:
+        """
+        Return the closest cached answer whose question clears the threshold.
+
+        Args:
+            scope: Key from `make_scope`
+            vector: Embedding of the new question
+
+        Returns:
+            Optional[CachedAnswer]: Best match, or None on a miss
+        """
+        query = _normalize(vector)
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            matrix = bucket.matrix() if bucket else None
+            if matrix is None:
+                self.misses += 1
+                _miss.inc()
+                return None
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                _miss.inc()
+                return None
+            fingerprint = list(bucket.entries)[best]
+            entry = bucket.entries[fingerprint]
+            if not self._fresh(scope, entry):
+                self.misses += 1
+                _miss.inc()
+                return None
+            self._touch(scope, fingerprint)
+            self.hits += 1
+            _hit.inc()
+            return entry
+
+    def put(
+        self,
+        scope: tuple,
+        question: str,
+        vector: Optional[Sequence[float]],
+        answer: str,
+        versions: Tuple[int, ...],
+        sources: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Store a final answer computed against the given document versions.
+
+        Args:
+            scope: Key from `make_scope`
+            question: The question as asked
+            vector: Embedding of the question, or None to match the exact question only
+            answer: Full answer text
+            versions: `DocumentVersions.snapshot` taken before retrieval ran
+            sources: Sources the answer was generated from
+        """
+        fingerprint = question_fingerprint(question)
+        with self._lock:
+            if versions != self.versions.snapshot(scope[0]):
+                # A document changed while the answer was being generated
+                return
+            bucket = self._buckets.setdefault(scope, _Bucket())
+            bucket.entries[fingerprint] = CachedAnswer(
+                question=question,
+                answer=answer,
+                vector=_normalize(vector) if vector is not None else None,
+                versions=versions,
+                created_at=time.monotonic(),
+                sources=sources or [],
+            )
+            bucket.changed()
+            self._touch(scope, fingerprint)
+            while len(self._lru) > self.max_entries:
+                oldest_scope, oldest_fp = next(iter(self._lru))
+                self._remove(oldest_scope, oldest_fp)
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: str) -> None:
+        """Drop every bucket whose document set contains the document."""
+        with self._lock:
+            for scope in [s for s in self._buckets if document_id in s[0]]:
+                for fingerprint in list(self._buckets[scope].entries):
+                    self._remove(scope, fingerprint)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit ratio and size metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "scopes": len(self._buckets),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    # --- Internal helpers ---
+    def _fresh(self, scope: tuple, entry: CachedAnswer) -> bool:
+        if (self.ttl > 0 and time.monotonic() - entry.created_at > self.ttl) or self.versions.expired(entry.created_at):
+            self._remove(scope, question_fingerprint(entry.question))
+            return False
+        if entry.versions != self.versions.snapshot(scope[0]):
+            self._remove(scope, question_fingerprint(entry.question))
+            self.invalidations += 1
+            return False
+        return True
+
+    def _touch(self, scope: tuple, fingerprint: str) -> None:
+        self._lru[(scope, fingerprint)] = None
+        self._lru.move_to_end((scope, fingerprint))
+
+    def _remove(self, scope: tuple, fingerprint: str) -> None:
+        self._lru.pop((scope, fingerprint), None)
+        bucket = self._buckets.get(scope)
+        if bucket is None or bucket.entries.pop(fingerprint, None) is None:
+            return
+        bucket.changed()
+        if not bucket.entries:
+            del self._buckets[scope]
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm else arr
+
+
+async def replay_answer(answer: str, chunk_chars: int = _REPLAY_CHUNK_CHARS) -> AsyncGenerator[str, None]:
+    """Stream a cached answer back in small chunks, like a live LLM response."""
+    for start in range(0, len(answer), chunk_chars):
+        yield answer[start:start + chunk_chars]
+
+
+# Process-wide cache of final chat answers
+answer_cache = AnswerCache()
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncGenerator
+from typing import Any, Dict, List
+
+from langchain_core.documents import Document as LangchainDocument
+
+from config.constants import (
+    BATCH_EMBED_SIZE,
+    BATCH_LLM_CONCURRENCY,
+    LEXICAL_INDEX_ENABLED,
+    RETRIEVAL_LIMIT,
+)
+from llm_providers.registry import registry
+from models.chat_model import BatchChatItem, BatchChatRequest
+from services.chatbot_service import ChatbotService
+from services.context_builder import ContextAssembler
+from services.embedding import EmbeddingService
+from services.lexical_index import lexical_index, reciprocal_rank_fusion
+from services.response_generator import generate_response
+from services.store import StoreService
+from utils.logger import logger
+
+# Embedding requests in flight at once while embedding a batch's questions
+_EMBED_CONCURRENCY = 4
+
+# Process-wide, so concurrent batches share each provider's concurrency budget
+_llm_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def llm_slots(provider: str) -> asyncio.Semaphore:
+    provider = (provider or "openrouter").lower()
+    slots = _llm_slots.get(provider)
+    if slots is None:
+        slots = _llm_slots.setdefault(provider, asyncio.Semaphore(BATCH_LLM_CONCURRENCY.get(provider, 8)))
+    return slots
+
+
+class BatchChatService:
+    """Answers many chat questions in one request.
+
+    Questions are embedded in batched API calls and searched with a single
+    vector store batch request; LLM calls then run concurrently, bounded per
+    provider, and results are streamed back as NDJSON in completion order.
+    """
+
+    def __init__(self):
+        self.chatbot = ChatbotService()
+
+    async def run(self, batch: BatchChatRequest) -> AsyncGenerator[str, None]:
+        """
+        Retrieve context for every item, then return the stream of answers.
+
+        Retrieval runs before the response starts, so embedding or vector
+        store failures surface as an HTTP error rather than mid-stream.
+
+        Args:
+            batch: Items to answer plus shared provider and cache settings
+
+        Returns:
+            AsyncGenerator[str, None]: One JSON line per item, then a summary line
+        """
+        started = time.perf_counter()
+        results, _ = await asyncio.gather(
+            self.retrieve_all(batch.items),
+            registry.ensure_warm(batch.provider),
+        )
+        logger.info(
+            f"📦 Retrieved context for {len(batch.items)} batch items in {time.perf_counter() - started:.2f}s"
+        )
+        return self._answer_all(batch, results, started)
+
+    async def retrieve_all(self, items: List[BatchChatItem], limit: int = RETRIEVAL_LIMIT) -> List[list]:
+        """
+        Retrieve chunks for every item, mirroring `ChatbotService.retrieve`.
+
+        Args:
+            items: Batch items
+            limit: Maximum number of chunks per item
+
+        Returns:
+            List[list]: Hits for each item, in input order (empty without documents)
+        """
+        results: List[list] = [[] for _ in items]
+        lexical: List[list] = [[] for _ in items]
+        dense: List[int] = []
+        for i, item in enumerate(items):
+            if not item.documents:
+                continue
+            if LEXICAL_INDEX_ENABLED and lexical_index.covers(item.documents):
+                hits = lexical_index.search(item.question, item.documents, limit=limit)
+                if hits and hits[0].coverage == 1.0 and lexical_index.is_keyword_query(item.question):
+                    results[i] = hits
+                    continue
+                lexical[i] = hits
+            dense.append(i)
+        if not dense:
+            return results
+
+        vectors = await self.embed_questions([items[i].question for i in dense])
+        found = await StoreService().asearch_chunks_batch(vectors, [items[i].documents for i in dense], limit=limit)
+        for i, hits in zip(dense, found):
+            results[i] = reciprocal_rank_fusion(hits, lexical[i], limit=limit) if lexical[i] else hits
+        return results
+
+    async def embed_questions(self, questions: List[str]) -> List[List[float]]:
+        """Embed questions in BATCH_EMBED_SIZE slices, a few requests at a time."""
+        embedding = EmbeddingService()
+        slots = asyncio.Semaphore(_EMBED_CONCURRENCY)
+
+        async def embed(texts: List[str]) -> List[List[float]]:
+            async with slots:
+                return await embedding.aembed_documents([LangchainDocument(page_content=t) for t in texts])
+
+        slices = [questions[i:i + BATCH_EMBED_SIZE] for i in range(0, len(questions), BATCH_EMBED_SIZE)]
+        vectors = await asyncio.gather(*(embed(s) for s in slices))
+        return [vector for part in vectors for vector in part]
+
+    async def _answer_all(
+        self, batch: BatchChatRequest, results: List[list], started: float
+    ) -> AsyncGenerator[str, None]:
+        tasks = [
+            asyncio.create_task(self._answer(i, item, hits, batch))
+            for i, (item, hits) in enumerate(zip(batch.items, results))
+        ]
+        errors = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                errors += "error" in line
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            elapsed = time.perf_counter() - started
+            logger.info(f"📦 Batch of {len(tasks)} answered in {elapsed:.2f}s ({errors} errors)")
+            yield json.dumps({
+                "type": "summary",
+                "items": len(tasks),
+                "errors": errors,
+                "elapsed_ms": round(elapsed * 1000),
+            }) + "\n"
+        finally:
+            # The client went away: stop queued and running LLM calls
+            for task in tasks:
+                task.cancel()
+
+    async def _answer(self, index: int, item: BatchChatItem, hits: list, batch: BatchChatRequest) -> Dict[str, Any]:
+        started = time.perf_counter()
+        line: Dict[str, Any] = {"type": "result", "index": index, "id": item.id, "question": item.question}
+        try:
+            assembled = ContextAssembler().assemble(hits) if hits else None
+            prompt = self.chatbot.generate_prompt(item.question, assembled.text if assembled else "")
+            async with llm_slots(batch.provider):
+                answer = await generate_response(
+                    prompt, batch.provider, use_cache=batch.cache, route="chat_batch", deadline=batch.timeout
+                )
+            line["answer"] = answer
+            line["sources"] = assembled.sources if assembled else []
+        except Exception as e:
+            logger.warning(f"⚠️ Batch item {index} failed: {e}")
+            line["error"] = str(e)
+        line["latency_ms"] = round((time.perf_counter() - started) * 1000)
+        return line
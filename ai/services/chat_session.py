@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import SESSION_MAX_SESSIONS, SESSION_REUSE_MIN_SCORE, SESSION_TTL
+from services.document_versions import document_versions, DocumentVersions
+from services.lexical_index import SearchHit
+
+
+@dataclass
+class ChatSession:
+    """Candidate chunks retrieved for the last turn of a conversation."""
+    documents: Tuple[str, ...]
+    versions: Tuple[int, ...]
+    ids: List[str]
+    payloads: List[Dict[str, Any]]
+    # Unit-normalized candidate vectors, one row per chunk
+    matrix: np.ndarray
+    updated_at: float
+    # time.monotonic() when the pool was searched, for the staleness cap
+    fetched_at: float
+    turns: int = 1
+    reused: int = 0
+
+    def rescore(self, query_vector: Sequence[float], limit: int) -> List[SearchHit]:
+        """Rank the candidate pool against a new question by cosine similarity."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0 or not len(self.ids):
+            return []
+        scores = self.matrix @ (query / norm)
+        top = np.argsort(-scores)[:limit]
+        return [SearchHit(id=self.ids[i], score=float(scores[i]), payload=self.payloads[i]) for i in top]
+
+
+class SessionStore:
+    """Server-side chat sessions keeping the last retrieved candidate pool.
+
+    A follow-up question in the same session is re-scored locally against the
+    chunks (and vectors) retrieved for an earlier turn; the vector store is
+    only searched again when the best local score drops below
+    `min_score`, i.e. the conversation moved to a different topic. Sessions
+    expire after `ttl` seconds idle and are dropped when their document set
+    or any of its documents changes, or once the pool is past the versions'
+    staleness cap.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SESSION_TTL,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        min_score: float = SESSION_REUSE_MIN_SCORE,
+        versions: DocumentVersions = document_versions,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.min_score = min_score
+        self.versions = versions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reuses = 0
+        self.refreshes = 0
+        self.expired = 0
+
+    def reuse(
+        self, session_id: str, document_ids: Sequence[str], query_vector: Sequence[float], limit: int
+    ) -> Optional[List[SearchHit]]:
+        """
+        Answer a follow-up from the session's candidate pool when it still fits.
+
+        Args:
+            session_id: Client-chosen conversation ID
+            document_ids: Documents the question is asked against
+            query_vector: Embedding of the new question
+            limit: Maximum number of chunks to return
+
+        Returns:
+            Optional[List[SearchHit]]: Re-scored hits, or None when a fresh search is needed
+        """
+        documents = tuple(sorted(set(document_ids)))
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if (
+                time.time() - session.updated_at > self.ttl
+                or session.documents != documents
+                or session.versions != self.versions.snapshot(documents)
+                or self.versions.expired(session.fetched_at)
+            ):
+                del self._sessions[session_id]
+                self.expired += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            session.updated_at = time.time()
+        hits = session.rescore(query_vector, limit)
+        if not hits or hits[0].score < self.min_score:
+            with self._lock:
+                self.refreshes += 1
+            return None
+        with self._lock:
+            session.turns += 1
+            session.reused += 1
+            self.reuses += 1
+        return hits
+
+    def put(self, session_id: str, document_ids: Sequence[str], results: List[Any], versions: tuple) -> None:
+        """
+        Replace a session's candidate pool with freshly searched results.
+
+        Args:
+            session_id: Client-chosen conversation ID
+            document_ids: Documents that were searched
+            results: Hits retrieved with their vectors
+            versions: `DocumentVersions.snapshot` taken before the search ran
+        """
+        rows = [hit for hit in results if getattr(hit, "vector", None) is not None]
+        if not rows:
+            return
+        matrix = np.asarray([hit.vector for hit in rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            self._sessions[session_id] = ChatSession(
+                documents=tuple(sorted(set(document_ids))),
+                versions=versions,
+                ids=[str(hit.id) for hit in rows],
+                payloads=[hit.payload or {} for hit in rows],
+                matrix=matrix,
+                updated_at=time.time(),
+                fetched_at=time.monotonic(),
+                turns=previous.turns + 1 if previous else 1,
+                reused=previous.reused if previous else 0,
+            )
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def end(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.reuses + self.refreshes
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "reuses": self.reuses,
+                "refreshes": self.refreshes,
+                "reuse_ratio": (self.reuses / lookups) if lookups else 0.0,
+                "expired": self.expired,
+            }
+
+
+# Process-wide chat sessions
+chat_sessions = SessionStore()
@@ -0,0 +1,22 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+class ChatStream:
+    """Answer chunks plus the sources retrieved for them.
+
+    Iterates exactly like the async generators the providers return, so
+    callers that only want text are unaffected; SSE callers also read
+    `sources` to send them ahead of the first token.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str], sources: Optional[List[Dict[str, Any]]] = None):
+        self._chunks = chunks
+        self.sources = sources or []
+
+    def __aiter__(self):
+        return self._chunks.__aiter__()
+
+    async def aclose(self) -> None:
+        aclose = getattr(self._chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
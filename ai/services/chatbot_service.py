@@ -1,72 +1,260 @@
-from typing import List, Optional
+import asyncio
+import logging
+from typing import List, Optional, Tuple
 from collections.abc import AsyncGenerator
 from langchain_core.documents import Document as LangchainDocument
 from services.embedding import EmbeddingService
 from services.store import StoreService
 from models.chat_model import ChatRequest
 from services.response_generator import generate_response
+from services.lexical_index import lexical_index, reciprocal_rank_fusion
+from services.context_builder import ContextAssembler
+from services.answer_cache import answer_cache, replay_answer
+from services.document_versions import document_versions
+from services.retrieval_cache import question_fingerprint
+from services.single_flight import single_flight
+from services.chat_stream import ChatStream
+from services.chat_session import chat_sessions
+from llm_providers.registry import registry
+from config.constants import (
+    ANSWER_CACHE_ENABLED,
+    LEXICAL_INDEX_ENABLED,
+    RETRIEVAL_LIMIT,
+    SESSION_CANDIDATE_POOL,
+    SINGLE_FLIGHT_ENABLED,
+)
 from utils.logger import logger
+from utils.tracing import span
+
+# Bump whenever generate_prompt changes so cached answers from the old prompt are not replayed
+PROMPT_VERSION = "1"
 
 class ChatbotService:
     def __init__(self):
         pass
 
-    async def get_response(self, chat: ChatRequest) -> AsyncGenerator[str, None]:
+    async def get_response(self, chat: ChatRequest) -> ChatStream:
         """
         Generate a response based on the input query.
+
+        Identical concurrent requests (same normalized question, document set,
+        provider, session and timeout) share one generation; late joiners
+        first receive the chunks already produced. The session is part of the
+        key because the leader fills its own session's candidate pool, and the
+        timeout because followers would otherwise inherit the leader's deadline.
         
         Args:
             chat: The chat request containing question and other parameters
         
         Returns:
-            AsyncGenerator[str, None]: The streaming response generator
+            ChatStream: The streaming response, with the sources it drew on
         """
+        if not (SINGLE_FLIGHT_ENABLED and chat.cache):
+            return await self._generate(chat)
+        key = (
+            question_fingerprint(chat.question),
+            tuple(sorted(set(chat.documents))),
+            (chat.provider or "openrouter").lower(),
+            chat.session_id,
+            chat.timeout,
+        )
+        return await single_flight.stream(key, lambda: self._generate(chat))
+
+    async def _generate(self, chat: ChatRequest) -> ChatStream:
         context = ""
+        sources = []
+        scope = None
+        query_vector = None
         
         # If documents are provided, search for relevant context
         if chat.documents and len(chat.documents) > 0:
-            # Step 1: Embed question
-            query_doc = LangchainDocument(page_content=chat.question)
-            embedding_service = EmbeddingService()
-            query_vector = embedding_service.embed_document(query_doc)
+            if ANSWER_CACHE_ENABLED and chat.cache:
+                scope = self.answer_scope(chat)
+                cached = answer_cache.lookup_exact(scope, chat.question)
+                if cached is not None:
+                    logger.debug("♻️ Answer cache hit (exact question) for %d documents", len(scope[0]))
+                    return ChatStream(replay_answer(cached.answer), cached.sources)
+                versions = document_versions.snapshot(scope[0])
+                lexical = self.lexical_search(chat.question, chat.documents)
+                if lexical[1]:
+                    # Keyword shortcut: no embedding, so the semantic lookup is skipped too
+                    results, _ = await asyncio.gather(
+                        self.retrieve(chat.question, chat.documents, session_id=chat.session_id, lexical=lexical),
+                        registry.ensure_warm(chat.provider),
+                    )
+                else:
+                    # The semantic lookup needs the question embedding, so compute
+                    # it up front while the LLM connection warms up
+                    query_vector, _ = await asyncio.gather(
+                        self.embed_question(chat.question),
+                        registry.ensure_warm(chat.provider),
+                    )
+                    with span("answer_cache"):
+                        cached = answer_cache.lookup(scope, query_vector)
+                    if cached is not None:
+                        logger.debug("♻️ Answer cache hit (similar to '%s')", cached.question[:50])
+                        return ChatStream(replay_answer(cached.answer), cached.sources)
+                    results = await self.retrieve(
+                        chat.question, chat.documents, query_vector=query_vector,
+                        session_id=chat.session_id, lexical=lexical,
+                    )
+            else:
+                # Retrieval and the LLM connection warm-up are independent, so overlap them
+                results, _ = await asyncio.gather(
+                    self.retrieve(chat.question, chat.documents, session_id=chat.session_id),
+                    registry.ensure_warm(chat.provider),
+                )
 
-            # Step 2: Search from Qdrant filtered by IDs in metadata
-            store_service = StoreService()
-            results = store_service.search_chunks_by_ids(query_vector, chat.documents)
-            
             if results:
-                logger.info(f"📄 Found {len(results)} relevant chunks:")
-                for i, result in enumerate(results[:3]):  # Show top 3 chunks
-                    chunk_id = result.payload.get('id', 'unknown')[:8]
-                    score = result.score
-                    content_preview = result.payload.get("page_content", "")[:100].replace('\n', ' ')
-                    logger.info(f"   • Chunk {i+1}: {chunk_id}... (score: {score:.3f}) - '{content_preview}...'")
-                if len(results) > 3:
-                    logger.info(f"   • ... and {len(results) - 3} more chunks")
+                logger.debug("📄 Found %d relevant chunks (best score %.3f)", len(results), results[0].score)
+                if logger.isEnabledFor(logging.DEBUG):
+                    for i, result in enumerate(results[:3]):  # Show top 3 chunks
+                        chunk_id = result.payload.get('id', 'unknown')[:8]
+                        content_preview = result.payload.get("page_content", "")[:100].replace('\n', ' ')
+                        logger.debug("   • Chunk %d: %s... (score: %.3f) - '%s...'", i + 1, chunk_id, result.score, content_preview)
             else:
-                logger.warning(f"❌ No chunks found for document IDs: {chat.documents}")
+                logger.warning("❌ No chunks found for document IDs: %s", chat.documents)
 
-            # Step 3: Collect context
-            context_chunks = [r.payload.get("page_content", "") for r in results if "page_content" in r.payload]
-            context = "\n\n".join(context_chunks)
+            # Step 3: Pack context into the token budget, merging adjacent chunks
+            with span("context"):
+                assembled = ContextAssembler().assemble(results)
+            context = assembled.text
+            sources = assembled.sources
 
             if context:
-                logger.info(f"📝 Context compiled from {len(context_chunks)} chunks ({len(context)} chars)")
+                logger.debug(
+                    "📝 Context compiled from %d chunks in %d sections (%d tokens, %d dropped)",
+                    assembled.chunks_used, assembled.sections, assembled.tokens, assembled.chunks_dropped,
+                )
             else:
-                logger.warning(f"⚠️ No usable context extracted from {len(results)} results")
-        else:
-            logger.info(f"🔄 [CHATBOT_SERVICE] No documents provided, proceeding with direct LLM call")
+                logger.warning("⚠️ No usable context extracted from %d results", len(results))
 
         # Step 4: Call LLM with streaming (always enabled for better UX)
-        logger.info(f"🚀 Calling {chat.provider} LLM (stream: always enabled)")
         if context:
-            logger.info(f"📋 Using context from {len(chat.documents)} documents ({len(context)} chars)")
+            logger.debug("📋 Using context from %d documents (%d chars)", len(chat.documents), len(context))
         else:
-            logger.info(f"🔄 No documents provided - direct LLM call")
+            logger.debug("🔄 No document context - direct LLM call")
 
         # Always use streaming for better user experience
-        return await self.call_llm(chat.question, context, provider=chat.provider, stream=True)
-    
+        stream = await self.call_llm(
+            chat.question, context, provider=chat.provider, stream=True, use_cache=chat.cache, deadline=chat.timeout
+        )
+        if scope is not None:
+            stream = self._record_answer(stream, scope, chat.question, query_vector, versions, sources)
+        return ChatStream(stream, sources)
+
+    def answer_scope(self, chat: ChatRequest) -> tuple:
+        """Answer cache scope: sorted documents, provider, model and prompt version."""
+        provider = (chat.provider or "openrouter").lower()
+        model = getattr(registry.get(provider), "model_name", "")
+        return answer_cache.make_scope(chat.documents, provider, model, PROMPT_VERSION)
+
+    async def embed_question(self, question: str) -> List[float]:
+        with span("embed"):
+            return await EmbeddingService().aembed_document(LangchainDocument(page_content=question))
+
+    async def _record_answer(
+        self,
+        stream: AsyncGenerator[str, None],
+        scope: tuple,
+        question: str,
+        query_vector: List[float],
+        versions: tuple,
+        sources: list,
+    ) -> AsyncGenerator[str, None]:
+        """Pass the LLM stream through and cache the answer once it completes."""
+        parts = []
+        async for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        # Only reached when the stream finished; aborted streams are not cached
+        answer = "".join(parts)
+        provider = getattr(stream, "provider", None)
+        if provider is not None:
+            # Scope by whoever answered; a hedge or failover winner is not the requested provider
+            scope = answer_cache.make_scope(scope[0], provider, stream.model, PROMPT_VERSION)
+        if answer.strip():
+            answer_cache.put(scope, question, query_vector, answer, versions, sources)
+
+    async def retrieve(
+        self,
+        question: str,
+        document_ids: List[str],
+        limit: int = RETRIEVAL_LIMIT,
+        query_vector: Optional[List[float]] = None,
+        session_id: Optional[str] = None,
+        lexical: Optional[Tuple[list, bool]] = None,
+    ) -> list:
+        """
+        Retrieve the chunks most relevant to a question from the given documents.
+
+        Keyword-dominant questions whose terms all appear in a lexical hit are
+        answered from the BM25 index without embedding the question. Otherwise
+        the dense Qdrant ranking is fused with the lexical one when available.
+        Within a chat session, follow-ups are ranked against the chunks kept
+        from an earlier turn instead of searching Qdrant again.
+
+        Args:
+            question: The user question
+            document_ids: IDs of the documents to search
+            limit: Maximum number of chunks to return
+            query_vector: Question embedding, if the caller already computed it
+            session_id: Chat session whose candidate pool may be reused
+            lexical: Result of `lexical_search`, if the caller already ran it
+
+        Returns:
+            list: Hits exposing `id`, `score` and `payload`
+        """
+        lexical_hits, answered = lexical if lexical is not None else self.lexical_search(question, document_ids, limit)
+        if answered:
+            logger.debug("🔎 Keyword query answered from BM25 index (%d hits)", len(lexical_hits))
+            return lexical_hits
+
+        # Step 1: Embed question
+        if query_vector is None:
+            query_vector = await self.embed_question(question)
+
+        # Step 2: Search from Qdrant filtered by IDs in metadata
+        if session_id:
+            results = await self._session_search(session_id, query_vector, document_ids, limit)
+        else:
+            store_service = StoreService()
+            with span("search"):
+                results = await store_service.asearch_chunks_by_ids(query_vector, document_ids, limit=limit)
+
+        if lexical_hits:
+            return reciprocal_rank_fusion(results, lexical_hits, limit=limit)
+        return results
+
+    def lexical_search(
+        self, question: str, document_ids: List[str], limit: int = RETRIEVAL_LIMIT
+    ) -> Tuple[list, bool]:
+        """BM25 hits for the question, and whether they answer it without a dense search."""
+        if not (LEXICAL_INDEX_ENABLED and lexical_index.covers(document_ids)):
+            return [], False
+        with span("lexical"):
+            hits = lexical_index.search(question, document_ids, limit=limit)
+        answered = bool(hits) and hits[0].coverage == 1.0 and lexical_index.is_keyword_query(question)
+        return hits, answered
+
+    async def _session_search(
+        self, session_id: str, query_vector: List[float], document_ids: List[str], limit: int
+    ) -> list:
+        """Re-score the session's candidate pool, searching Qdrant only when it no longer fits."""
+        with span("session_rescore"):
+            hits = chat_sessions.reuse(session_id, document_ids, query_vector, limit)
+        if hits is not None:
+            logger.debug("💬 Follow-up ranked against session pool (best score %.3f)", hits[0].score)
+            return hits
+        # A wider pool than one turn needs, with vectors, so later follow-ups can be ranked locally
+        versions = document_versions.snapshot(sorted(set(document_ids)))
+        with span("search"):
+            pool = await StoreService().asearch_chunks_by_ids(
+                query_vector, document_ids, limit=max(limit, SESSION_CANDIDATE_POOL), with_vectors=True
+            )
+        chat_sessions.put(session_id, document_ids, pool, versions)
+        return pool[:limit]
+
     def generate_prompt(self, question, context):
         """
         Generate a prompt for the LLM based on the question and context.
@@ -103,24 +291,37 @@ Question: {question}
 Answer:"""
         return prompt
 
-    async def call_llm(self, question: str, context: str, provider: str = "openrouter", stream: bool = False):
-        prompt = self.generate_prompt(question, context)
+    async def call_llm(
+        self,
+        question: str,
+        context: str,
+        provider: str = "openrouter",
+        stream: bool = False,
+        use_cache: bool = True,
+        deadline: Optional[float] = None,
+    ):
+        with span("prompt"):
+            prompt = self.generate_prompt(question, context)
 
-        logger.info(f"🤖 Sending to {provider}: '{question[:50]}{'...' if len(question) > 50 else ''}'")
+        logger.debug("🤖 Sending to %s: '%.50s'", provider, question)
 
         try:
             # Always use streaming for better UX
             if stream:
                 # Return async generator directly
-                return await generate_response(prompt, provider, stream=True)
+                return await generate_response(
+                    prompt, provider, stream=True, use_cache=use_cache, route="chat", deadline=deadline
+                )
             else:
                 # For non-streaming, accumulate the response
                 full_response = ""
-                async for chunk in await generate_response(prompt, provider, stream=True):
+                async for chunk in await generate_response(
+                    prompt, provider, stream=True, use_cache=use_cache, route="chat", deadline=deadline
+                ):
                     full_response += chunk
-                logger.info(f"✅ {provider} responded ({len(full_response)} chars)")
+                logger.debug("✅ %s responded (%d chars)", provider, len(full_response))
                 return full_response
 
         except Exception as e:
-            logger.error(f"❌ {provider} failed: {str(e)}")
+            logger.error("❌ %s failed: %s", provider, e)
             raise
@@ -0,0 +1,269 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Optional, Union
+
+from config.constants import (
+    COMPLETION_CACHE_DISK_MAX_BYTES,
+    COMPLETION_CACHE_MAX_BYTES,
+    COMPLETION_CACHE_PATH,
+    COMPLETION_CACHE_TTL,
+)
+from utils.executor import run_blocking
+from utils.logger import logger
+from utils.metrics import CACHE_LOOKUPS
+
+# Re-check the disk tier size every this many writes
+_PRUNE_EVERY = 64
+
+_LOOKUPS = {
+    outcome: CACHE_LOOKUPS.labels("completion", result)
+    for outcome, result in (
+        ("memory_hits", "memory_hit"),
+        ("disk_hits", "disk_hit"),
+        ("misses", "miss"),
+        ("bypassed", "bypass"),
+    )
+}
+
+
+def completion_key(provider: str, model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Hash of everything that determines an LLM completion."""
+    material = json.dumps(
+        {"provider": provider, "model": model, "prompt": prompt, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Two-tier cache of completions for byte-identical prompts.
+
+    A size-bounded in-memory LRU sits in front of an SQLite file, so repeated
+    prompts survive restarts and are shared by every worker on the host. Disk
+    reads and writes run on the bounded executor from async callers.
+    """
+
+    def __init__(
+        self,
+        path: str = COMPLETION_CACHE_PATH,
+        max_bytes: int = COMPLETION_CACHE_MAX_BYTES,
+        disk_max_bytes: int = COMPLETION_CACHE_DISK_MAX_BYTES,
+        ttl: float = COMPLETION_CACHE_TTL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+        # Per-route counters: memory_hits, disk_hits, misses, bypassed
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    # --- Memory tier ---
+    def get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            completion, created_at = entry
+            if self._expired(created_at):
+                self._forget(key)
+                return None
+            self._memory.move_to_end(key)
+            return completion
+
+    def put_memory(self, key: str, completion: str, created_at: Optional[float] = None) -> None:
+        size = len(completion.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._forget(key)
+            self._memory[key] = (completion, created_at or time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._forget(next(iter(self._memory)))
+                self.evictions += 1
+
+    # --- Disk tier ---
+    def get_disk(self, key: str) -> Optional[tuple]:
+        """Return (completion, created_at) from the SQLite tier, or None."""
+        db = self._connect()
+        if db is None:
+            return None
+        with self._db_lock:
+            row = db.execute("SELECT completion, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0], row[1]
+
+    def put_disk(self, key: str, completion: str) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        now = time.time()
+        with self._db_lock:
+            db.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, completion, len(completion.encode("utf-8")), now, now),
+            )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune(db)
+
+    # --- Async API used on the request path ---
+    async def get(self, key: str, route: str) -> Optional[str]:
+        """
+        Look up a completion, promoting disk hits into memory.
+
+        Args:
+            key: Key from `completion_key`
+            route: Route name used for hit metrics
+
+        Returns:
+            Optional[str]: The cached completion, or None on a miss
+        """
+        completion = self.get_memory(key)
+        if completion is not None:
+            self._count(route, "memory_hits")
+            return completion
+        try:
+            row = await run_blocking(self.get_disk, key)
+        except Exception as e:
+            logger.warning(f"Completion cache disk read failed: {e}")
+            row = None
+        if row is None:
+            self._count(route, "misses")
+            return None
+        self.put_memory(key, row[0], row[1])
+        self._count(route, "disk_hits")
+        return row[0]
+
+    async def put(self, key: str, completion: str) -> None:
+        self.put_memory(key, completion)
+        try:
+            await run_blocking(self.put_disk, key, completion)
+        except Exception as e:
+            logger.warning(f"Completion cache disk write failed: {e}")
+
+    def record_bypass(self, route: str) -> None:
+        self._count(route, "bypassed")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        db = self._connect()
+        if db is not None:
+            with self._db_lock:
+                db.execute("DELETE FROM completions")
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return tier sizes and per-route hit ratios."""
+        with self._lock:
+            routes = {}
+            for route, counts in self._routes.items():
+                lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+                hits = counts["memory_hits"] + counts["disk_hits"]
+                routes[route] = {**counts, "hit_ratio": (hits / lookups) if lookups else 0.0}
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_path": self.path or None,
+                "evictions": self.evictions,
+                "routes": routes,
+            }
+
+    # --- Internal helpers ---
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._db is None:
+            with self._db_lock:
+                if self._db is None:
+                    db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    db.execute("PRAGMA journal_mode=WAL")
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS completions ("
+                        "key TEXT PRIMARY KEY, completion TEXT NOT NULL, size INTEGER NOT NULL, "
+                        "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+                    )
+                    db.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+                    self._db = db
+        return self._db
+
+    def _prune(self, db: sqlite3.Connection) -> None:
+        """Drop expired rows, then least recently used rows over the size budget."""
+        if self.ttl > 0:
+            db.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        excess = total - self.disk_max_bytes
+        if excess <= 0:
+            return
+        removed = 0
+        for key, size in db.execute("SELECT key, size FROM completions ORDER BY last_used").fetchall():
+            db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            removed += size
+            if removed >= excess:
+                break
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _forget(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0].encode("utf-8"))
+
+    def _count(self, route: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._routes.setdefault(
+                route, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+            )
+            counts[outcome] += 1
+        _LOOKUPS[outcome].inc()
+
+
+async def record_completion(
+    stream: AsyncIterator[str],
+    cache: CompletionCache,
+    key: Union[str, Callable[[], str]],
+) -> AsyncGenerator[str, None]:
+    """
+    Pass an LLM stream through and cache the completion once it finishes.
+
+    `key` may be a callable, resolved after the stream ends, for streams
+    whose producing provider is only known once it has started.
+    """
+    parts = []
+    async for chunk in stream:
+        parts.append(chunk)
+        yield chunk
+    # Only reached when the stream finished; aborted streams are not cached
+    completion = "".join(parts)
+    if completion.strip():
+        await cache.put(key() if callable(key) else key, completion)
+
+
+# Process-wide completion cache shared by every chat route
+completion_cache = CompletionCache()
@@ -0,0 +1,183 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config.constants import (
+    CHUNK_OVERLAP,
+    CONTEXT_MIN_SCORE,
+    CONTEXT_RELATIVE_SCORE_CUTOFF,
+    CONTEXT_TOKEN_BUDGET,
+)
+from utils.tokenizer import count_tokens
+
+
+@dataclass
+class _Candidate:
+    document_id: Optional[str]
+    chunk_index: Optional[int]
+    start_index: Optional[int]
+    text: str
+    score: float
+    payload: Dict[str, Any]
+
+
+@dataclass
+class AssembledContext:
+    """Packed prompt context and the chunks it was built from."""
+    text: str
+    tokens: int
+    chunks_used: int
+    chunks_dropped: int
+    sections: int
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _overlap(prev: _Candidate, nxt: _Candidate) -> int:
+    """Characters at the start of `nxt` already present at the end of `prev`."""
+    if prev.start_index is not None and nxt.start_index is not None:
+        return max(0, min(len(nxt.text), prev.start_index + len(prev.text) - nxt.start_index))
+    # Chunks stored before start_index was recorded: find the shared boundary
+    for size in range(min(len(prev.text), len(nxt.text), 2 * CHUNK_OVERLAP), 0, -1):
+        if prev.text.endswith(nxt.text[:size]):
+            return size
+    return 0
+
+
+class ContextAssembler:
+    """Builds the document context for a RAG prompt within a token budget.
+
+    Hits scoring far below the best hit are dropped, the rest are packed
+    best-first into the budget, and adjacent chunks of the same document are
+    merged with their shared `CHUNK_OVERLAP` text removed.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        relative_cutoff: float = CONTEXT_RELATIVE_SCORE_CUTOFF,
+        min_score: float = CONTEXT_MIN_SCORE,
+    ):
+        self.token_budget = token_budget
+        self.relative_cutoff = relative_cutoff
+        self.min_score = min_score
+
+    def assemble(self, results: List[Any]) -> AssembledContext:
+        """
+        Pack search hits into a prompt context.
+
+        Args:
+            results: Hits exposing `score` and a `payload` with `page_content`
+
+        Returns:
+            AssembledContext: Context text plus packing statistics
+        """
+        candidates = [self._candidate(r) for r in results if (r.payload or {}).get("page_content")]
+        if not candidates:
+            return AssembledContext(text="", tokens=0, chunks_used=0, chunks_dropped=len(results), sections=0)
+        candidates.sort(key=lambda c: c.score, reverse=True)
+
+        # Adaptive threshold relative to the best hit (scale-free, so it works
+        # for cosine, BM25 and fused scores alike); the best hit always passes
+        cutoff = max(self.min_score, candidates[0].score * self.relative_cutoff)
+        eligible = [candidates[0]] + [c for c in candidates[1:] if c.score >= cutoff]
+
+        selected: List[_Candidate] = []
+        used = 0
+        for candidate in eligible:
+            cost = self._marginal_tokens(candidate, selected)
+            if used + cost > self.token_budget and selected:
+                continue
+            selected.append(candidate)
+            used += cost
+
+        sections = self._merge(selected)
+        text = "\n\n".join(section_text for section_text, _ in sections)
+        return AssembledContext(
+            text=text,
+            tokens=count_tokens(text),
+            chunks_used=len(selected),
+            chunks_dropped=len(results) - len(selected),
+            sections=len(sections),
+            sources=[self._source(c) for c in selected],
+        )
+
+    # --- Internal helpers ---
+    @staticmethod
+    def _candidate(result: Any) -> _Candidate:
+        payload = result.payload or {}
+        chunk_index = payload.get("chunk_index")
+        start_index = payload.get("start_index")
+        return _Candidate(
+            document_id=payload.get("id"),
+            chunk_index=int(chunk_index) if chunk_index is not None else None,
+            start_index=int(start_index) if start_index is not None else None,
+            text=payload["page_content"],
+            score=float(result.score),
+            payload=payload,
+        )
+
+    @staticmethod
+    def _adjacent(a: _Candidate, b: _Candidate) -> bool:
+        return (
+            a.document_id is not None
+            and a.document_id == b.document_id
+            and a.chunk_index is not None
+            and b.chunk_index is not None
+            and abs(a.chunk_index - b.chunk_index) == 1
+        )
+
+    def _marginal_tokens(self, candidate: _Candidate, selected: List[_Candidate]) -> int:
+        """Tokens a candidate adds, not counting text shared with selected neighbours."""
+        start, end = 0, len(candidate.text)
+        for other in selected:
+            if self._adjacent(other, candidate):
+                if other.chunk_index < candidate.chunk_index:
+                    start = max(start, _overlap(other, candidate))
+                else:
+                    end = min(end, len(candidate.text) - _overlap(candidate, other))
+        return count_tokens(candidate.text[start:max(start, end)])
+
+    def _merge(self, selected: List[_Candidate]) -> List[tuple]:
+        """Merge runs of consecutive chunks; returns (text, best score) ordered by score."""
+        ordered = sorted(
+            selected,
+            key=lambda c: (
+                str(c.document_id),
+                c.chunk_index if c.chunk_index is not None else -1,
+                c.start_index or 0,
+            ),
+        )
+        sections = []
+        run: List[_Candidate] = []
+        for candidate in ordered:
+            if run and self._adjacent(run[-1], candidate) and candidate.chunk_index > run[-1].chunk_index:
+                run.append(candidate)
+                continue
+            if run:
+                sections.append(self._join(run))
+            run = [candidate]
+        if run:
+            sections.append(self._join(run))
+        sections.sort(key=lambda s: s[1], reverse=True)
+        return sections
+
+    @staticmethod
+    def _join(run: List[_Candidate]) -> tuple:
+        text = run[0].text
+        for prev, nxt in zip(run, run[1:]):
+            overlap = _overlap(prev, nxt)
+            if overlap:
+                text += nxt.text[overlap:]
+            else:
+                text += "\n" + nxt.text
+        return text, max(c.score for c in run)
+
+    @staticmethod
+    def _source(candidate: _Candidate) -> Dict[str, Any]:
+        payload = candidate.payload
+        return {
+            "document_id": candidate.document_id,
+            "name": payload.get("name") or payload.get("original_filename") or payload.get("source"),
+            "page": payload.get("page"),
+            "chunk_index": candidate.chunk_index,
+            "score": candidate.score,
+        }
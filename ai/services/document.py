@@ -8,10 +8,18 @@ from services.upload import UploadService
 from services.preprocessor import DocumentProcessor
 from services.embedding import EmbeddingService
 from services.store import StoreService
+from services.lexical_index import lexical_index
+from config.constants import LEXICAL_INDEX_ENABLED
 from utils.logger import logger
+from utils.metrics import CHUNKS_INGESTED, DOCUMENTS_INGESTED
+from utils.tracing import span
 from pathlib import Path
 import hashlib
 
+_chunks_ingested = CHUNKS_INGESTED.labels()
+_documents_processed = DOCUMENTS_INGESTED.labels("processed")
+_documents_failed = DOCUMENTS_INGESTED.labels("failed")
+
 
 class DocumentService:
     """Handles document processing and storage operations."""
@@ -45,8 +53,9 @@ class DocumentService:
             
             # 1. Extract document content using upload service
             logger.info("Extracting document content...")
-            extracted_documents = self.upload_service.extract_document(document)
-            logger.info(f"Extracted Documents : {extracted_documents[:50]}")
+            with span("extract"):
+                extracted_documents = self.upload_service.extract_document(document)
+            logger.debug("Extracted documents: %s", extracted_documents[:50])
             
             if not extracted_documents:
                 raise ValueError(f"No content extracted from document {document.name}")
@@ -75,7 +84,8 @@ class DocumentService:
             
             # 3. Chunk the document
             logger.info("Chunking document...")
-            chunks = self.document_processor.chunk_document(langchain_doc)
+            with span("split"):
+                chunks = self.document_processor.chunk_document(langchain_doc)
             
             if not chunks:
                 logger.warning(f"No chunks generated for document {document.id}")
@@ -92,37 +102,40 @@ class DocumentService:
             chunk_count = 0
             for i, chunk in enumerate(chunks):
                 try:
-                    logger.info(f"Processing chunk {i+1}/{len(chunks)}")
+                    logger.debug("Processing chunk %d/%d", i + 1, len(chunks))
                     # Create stable chunk id and content hash
                     chunk_id = f"{document.id}_chunk_{i}"
                     content_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
 
                     # Check cache in Qdrant via payload
-                    existing = self.store_service.get_document(chunk_id)
+                    with span("lookup"):
+                        existing = self.store_service.get_document(chunk_id)
                     if (
                         existing
                         and existing.get("content_hash") == content_hash
                         and existing.get("embedding_model") == getattr(self.embedding_service, 'model_name', None)
                     ):
-                        logger.info(f"Skip unchanged chunk {i+1}: cache hit")
+                        logger.debug("Skip unchanged chunk %d: cache hit", i + 1)
                         continue
 
                     # Generate embeddings when needed
-                    logger.info("Generating embeddings...")
-                    embedding = self.embedding_service.embed_document(chunk)
+                    with span("embed"):
+                        embedding = self.embedding_service.embed_document(chunk)
 
                     # Store the chunk with document metadata
-                    logger.info("Storing chunk in Qdrant...")
-                    self.store_service.store_document(
-                        document=chunk,
-                        vector=embedding,
-                        document_id=chunk_id,
-                        content_hash=content_hash,
-                        embedding_model=getattr(self.embedding_service, 'model_name', None),
-                        **document_metadata,
-                    )
+                    with span("store"):
+                        self.store_service.store_document(
+                            document=chunk,
+                            vector=embedding,
+                            document_id=chunk_id,
+                            content_hash=content_hash,
+                            embedding_model=getattr(self.embedding_service, 'model_name', None),
+                            chunk_index=i,
+                            **document_metadata,
+                        )
                     chunk_count += 1
-                    logger.info(f"[OK] Chunk {i+1} processed and stored successfully")
+                    _chunks_ingested.inc()
+                    logger.debug("[OK] Chunk %d processed and stored", i + 1)
                     
                 except Exception as chunk_error:
                     logger.error(f"[ERROR] Error processing chunk {i+1} of document {document.id}: {str(chunk_error)}")
@@ -131,8 +144,11 @@ class DocumentService:
             
             if chunk_count == 0:
                 raise ValueError(f"Failed to process any chunks for document {document.id}")
+
+            self._index_lexical(document.id, chunks)
             
             logger.info(f"Document processing completed successfully. {chunk_count}/{len(chunks)} chunks processed.")
+            _documents_processed.inc()
             
             return {
                 "document_id": document.id,
@@ -142,10 +158,47 @@ class DocumentService:
             }
             
         except Exception as e:
+            _documents_failed.inc()
             logger.error(f"[ERROR] Error processing document {getattr(document, 'id', 'unknown')}: {str(e)}")
             # Re-raise with additional context
             raise type(e)(f"Failed to process document {getattr(document, 'id', 'unknown')}: {str(e)}") from e
 
+    def delete_document(self, document_id: str) -> dict:
+        """
+        Remove a document's chunks from the vector store and lexical index.
+
+        Args:
+            document_id: ID of the document to remove
+
+        Returns:
+            dict: Deletion summary
+        """
+        self.store_service.delete_document(document_id)
+        lexical_index.remove_document(document_id)
+        logger.info(f"[DELETE] Removed document {document_id}")
+        return {"document_id": document_id, "status": "deleted"}
+
+    def _index_lexical(self, document_id: str, chunks) -> None:
+        """Rebuild the in-process BM25 index for a document from its chunks."""
+        if not LEXICAL_INDEX_ENABLED:
+            return
+        try:
+            with span("lexical_index"):
+                lexical_index.index_document(
+                    document_id,
+                    (
+                        (
+                            self.store_service._normalize_point_id(f"{document_id}_chunk_{i}"),
+                            chunk.page_content,
+                            {"page_content": chunk.page_content, **chunk.metadata, "chunk_index": i},
+                        )
+                        for i, chunk in enumerate(chunks)
+                    ),
+                )
+        except Exception as e:
+            # The lexical index is an accelerator; dense search still works without it
+            logger.error(f"[BM25] Failed to index document {document_id}: {str(e)}")
+
     def _process_local_file_path(self, file_path: str) -> Dict[str, Any]:
         """Reads and loads content from a local file using the proper loader."""
         from services.upload import DocumentLoader  # to avoid circular import
@@ -193,7 +246,8 @@ class DocumentService:
             file_path = document.path
             logger.info(f"[FILE] Starting local processing for: {file_path}")
 
-            processed_data = self._process_local_file_path(file_path)
+            with span("extract"):
+                processed_data = self._process_local_file_path(file_path)
 
             # Build langchain doc with merged metadata
             lang_doc = LangchainDocument(
@@ -212,8 +266,10 @@ class DocumentService:
                 chunk_size=split_size or CHUNK_SIZE,
                 chunk_overlap=split_overlap or CHUNK_OVERLAP,
                 length_function=len,
+                add_start_index=True,
             )
-            chunks = splitter.split_documents([lang_doc])
+            with span("split"):
+                chunks = splitter.split_documents([lang_doc])
             logger.info(f"[SPLIT] Split into {len(chunks)} chunks")
 
             if not chunks:
@@ -222,34 +278,39 @@ class DocumentService:
             chunk_count = 0
             for i, chunk in enumerate(chunks):
                 try:
-                    logger.info(f"[EMBED] Embedding chunk {i + 1}/{len(chunks)}")
+                    logger.debug("[EMBED] Embedding chunk %d/%d", i + 1, len(chunks))
                     # Stable chunk id and content hash
                     chunk_id = f"{document.id}_chunk_{i}"
                     content_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
 
-                    existing = self.store_service.get_document(chunk_id)
+                    with span("lookup"):
+                        existing = self.store_service.get_document(chunk_id)
                     if (
                         existing
                         and existing.get("content_hash") == content_hash
                         and existing.get("embedding_model") == getattr(self.embedding_service, 'model_name', None)
                     ):
-                        logger.info(f"[SKIP] Unchanged chunk {i+1} (cache hit)")
+                        logger.debug("[SKIP] Unchanged chunk %d (cache hit)", i + 1)
                         continue
 
-                    embedding = self.embedding_service.embed_document(chunk)
+                    with span("embed"):
+                        embedding = self.embedding_service.embed_document(chunk)
                     metadata = chunk.metadata
                     # Store the chunk with document metadata
                     try:
-                        logger.info(f"Storing chunk {chunk_count + 1} with ID {chunk_id}")
-                        self.store_service.store_document(
-                            document=chunk,
-                            vector=embedding,
-                            document_id=chunk_id,
-                            content_hash=content_hash,
-                            embedding_model=getattr(self.embedding_service, 'model_name', None),
-                            **metadata,
-                        )
+                        logger.debug("Storing chunk %d with ID %s", chunk_count + 1, chunk_id)
+                        with span("store"):
+                            self.store_service.store_document(
+                                document=chunk,
+                                vector=embedding,
+                                document_id=chunk_id,
+                                content_hash=content_hash,
+                                embedding_model=getattr(self.embedding_service, 'model_name', None),
+                                chunk_index=i,
+                                **metadata,
+                            )
                         chunk_count += 1
+                        _chunks_ingested.inc()
                     except TypeError as te:
                         logger.exception(f"[ERROR] TypeError: {te}")
                     except Exception as e:
@@ -261,7 +322,10 @@ class DocumentService:
             if chunk_count == 0:
                 raise RuntimeError("No chunks stored")
 
+            self._index_lexical(document.id, chunks)
+
             logger.info(f"[DONE] Local document processing complete: {chunk_count}/{len(chunks)} stored")
+            _documents_processed.inc()
             return {
                 "document_id": document.id,
                 "status": "processed",
@@ -270,5 +334,6 @@ class DocumentService:
             }
 
         except Exception as e:
+            _documents_failed.inc()
             logger.error(f"[ERROR] Error in local_process_document: {str(e)}")
             raise Exception(f"Failed to process local document: {str(e)}") from e
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from config.constants import APP_WORKERS, CACHE_MAX_STALENESS
+from utils.logger import logger
+
+# Cap applied when several workers are configured but the cap was turned off
+_MULTI_WORKER_MAX_STALENESS = 300.0
+
+
+class DocumentVersions:
+    """Per-document version counters used to invalidate derived caches.
+
+    Every write or delete touching a document bumps its counter. Caches keep
+    the versions they observed when an entry was computed and treat the entry
+    as stale once any of them has moved on.
+
+    Counters live in this process only: a write handled by another worker
+    never bumps them. Entries are therefore also treated as stale once older
+    than `max_staleness` seconds, which bounds how long another worker's
+    write can go unnoticed. The cap can only be disabled with one worker.
+    """
+
+    def __init__(self, max_staleness: float = CACHE_MAX_STALENESS, workers: int = APP_WORKERS):
+        if workers > 1 and max_staleness <= 0:
+            logger.warning(
+                f"⚠️ CACHE_MAX_STALENESS=0 needs a single worker; capping cache entries at "
+                f"{_MULTI_WORKER_MAX_STALENESS:g}s with {workers} workers"
+            )
+            max_staleness = _MULTI_WORKER_MAX_STALENESS
+        self.max_staleness = max_staleness
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def bump(self, document_id: str) -> int:
+        """Advance a document's version and notify listeners."""
+        with self._lock:
+            version = self._versions.get(document_id, 0) + 1
+            self._versions[document_id] = version
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(document_id)
+        return version
+
+    def get(self, document_id: str) -> int:
+        return self._versions.get(document_id, 0)
+
+    def snapshot(self, document_ids: Iterable[str]) -> Tuple[int, ...]:
+        """Return the current versions of the given documents, in order."""
+        versions = self._versions
+        return tuple(versions.get(d, 0) for d in document_ids)
+
+    def expired(self, observed_at: float) -> bool:
+        """Whether an entry computed at `observed_at` (time.monotonic()) is past the staleness cap."""
+        return self.max_staleness > 0 and time.monotonic() - observed_at > self.max_staleness
+
+    def subscribe(self, listener) -> None:
+        """Register a callable invoked with the document ID after each bump."""
+        with self._lock:
+            self._listeners.append(listener)
+
+
+# Process-wide registry shared by the store and every cache built on top of it
+document_versions = DocumentVersions()
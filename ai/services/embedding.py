@@ -1,15 +1,95 @@
 import os
+import threading
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List, Optional, Tuple
 import httpx
 from langchain_core.documents import Document as LangchainDocument
 from utils.logger import logger
+from utils.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_SECONDS
 from config.constants import EMBEDDINGS_MODEL, VOYAGE_BASE_URL
 
 
+# Model whose vectors the live collection currently holds. It differs from
+# EMBEDDINGS_MODEL only while a re-index to a new model is in progress.
+_serving_model: Optional[str] = None
+
+
+def serving_model() -> str:
+    """Return the embedding model that queries and new chunks must use."""
+    return _serving_model or EMBEDDINGS_MODEL
+
+
+def set_serving_model(model_name: Optional[str]) -> None:
+    """Pin the serving model (None reverts to EMBEDDINGS_MODEL)."""
+    global _serving_model
+    _serving_model = model_name
+    logger.info(f"Serving embedding model set to: {serving_model()}")
+
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared keep-alive client for the embeddings API."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                # Disable redirects so we can detect unexpected HTML responses
+                _http_client = httpx.Client(timeout=30, follow_redirects=False)
+    return _http_client
+
+
+def close_http_client() -> None:
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive async client used on the chat path."""
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(timeout=30, follow_redirects=False)
+    return _async_http_client
+
+
+async def aclose_async_http_client() -> None:
+    global _async_http_client
+    client, _async_http_client = _async_http_client, None
+    if client is not None:
+        await client.aclose()
+
+
+# Label children per model, bound once: EmbeddingService is built per request
+_METRICS: Dict[str, Tuple] = {}
+
+
+def _model_metrics(model_name: str) -> Tuple:
+    """Return the (sync latency, async latency, batch size) metrics for a model."""
+    metrics = _METRICS.get(model_name)
+    if metrics is None:
+        metrics = _METRICS.setdefault(model_name, (
+            EMBEDDING_SECONDS.labels(model_name, "sync"),
+            EMBEDDING_SECONDS.labels(model_name, "async"),
+            EMBEDDING_BATCH_SIZE.labels(model_name),
+        ))
+    return metrics
+
+
 class EmbeddingService:
-    def __init__(self):
-        """Initialize the embedding service with Voyage AI embeddings API."""
+    def __init__(self, model_name: Optional[str] = None):
+        """Initialize the embedding service with Voyage AI embeddings API.
+
+        Args:
+            model_name: Voyage model to use; defaults to the serving model
+        """
         # Ensure .env is loaded
         load_dotenv()
         api_key = os.environ.get("VOYAGE_API_KEY")
@@ -17,10 +97,9 @@ class EmbeddingService:
             raise RuntimeError("VOYAGE_API_KEY environment variable is not set")
         self.api_key = api_key
         self.base_url = VOYAGE_BASE_URL.rstrip("/")
-        self.model_name = EMBEDDINGS_MODEL
-        # Disable redirects so we can detect unexpected HTML responses
-        self.client = httpx.Client(timeout=30, follow_redirects=False)
-        logger.info(f"EmbeddingService initialized with Voyage model: {self.model_name}")
+        self.model_name = model_name or serving_model()
+        self.client = get_http_client()
+        self._sync_latency, self._async_latency, self._batch_size = _model_metrics(self.model_name)
 
     def _headers(self) -> dict:
         return {
@@ -30,37 +109,44 @@ class EmbeddingService:
             "User-Agent": os.environ.get("USER_AGENT", "obot-ai/1.0 (+httpx)"),
         }
 
+    @staticmethod
+    def _parse_embeddings(resp: httpx.Response) -> List[List[float]]:
+        """Validate a Voyage response and return its vectors in input order."""
+        # If redirected, treat as error (often indicates auth/headers issue)
+        if 300 <= resp.status_code < 400:
+            location = resp.headers.get("location", "<none>")
+            logger.error(f"Embeddings request redirected to: {location}")
+            resp.raise_for_status()
+        resp.raise_for_status()
+        # Guard: some proxies may return non-JSON with 2xx. Log details.
+        ctype = resp.headers.get("content-type", "")
+        if "application/json" not in ctype.lower():
+            logger.error(
+                f"Unexpected embeddings response: status={resp.status_code} content-type={ctype} body={resp.text[:300]}"
+            )
+            raise RuntimeError("Embeddings API did not return JSON")
+        data = resp.json()
+        return [item["embedding"] for item in data["data"]]
+
     def embed_document(self, chunkdoc: LangchainDocument) -> List[float]:
         """Generate an embedding for a single LangChain document via Voyage AI."""
         try:
             text = chunkdoc.page_content
-            logger.debug(f"Generating embedding for document with {len(text)} characters")
-            resp = self.client.post(
-                f"{self.base_url}/embeddings",
-                headers=self._headers(),
-                json={
-                    "model": self.model_name,
-                    "input": text,
-                    # Optional hints supported by Voyage
-                    "input_type": "document",
-                },
-            )
-            # If redirected, treat as error (often indicates auth/headers issue)
-            if 300 <= resp.status_code < 400:
-                location = resp.headers.get("location", "<none>")
-                logger.error(f"Embeddings request redirected to: {location}")
-                resp.raise_for_status()
-            resp.raise_for_status()
-            # Guard: some proxies may return non-JSON with 2xx. Log details.
-            ctype = resp.headers.get("content-type", "")
-            if "application/json" not in ctype.lower():
-                logger.error(
-                    f"Unexpected embeddings response: status={resp.status_code} content-type={ctype} body={resp.text[:300]}"
+            logger.debug("Generating embedding for document with %d characters", len(text))
+            self._batch_size.observe(1)
+            with self._sync_latency.time():
+                resp = self.client.post(
+                    f"{self.base_url}/embeddings",
+                    headers=self._headers(),
+                    json={
+                        "model": self.model_name,
+                        "input": text,
+                        # Optional hints supported by Voyage
+                        "input_type": "document",
+                    },
                 )
-                raise RuntimeError("Embeddings API did not return JSON")
-            data = resp.json()
-            vec = data["data"][0]["embedding"]
-            logger.debug(f"Generated embedding with {len(vec)} dimensions")
+            vec = self._parse_embeddings(resp)[0]
+            logger.debug("Generated embedding with %d dimensions", len(vec))
             return vec
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}", exc_info=True)
@@ -70,31 +156,47 @@ class EmbeddingService:
         """Generate embeddings for multiple LangChain documents via Voyage AI."""
         try:
             contents = [doc.page_content for doc in docs]
-            logger.info(f"Generating embeddings for {len(docs)} documents")
-            resp = self.client.post(
-                f"{self.base_url}/embeddings",
-                headers=self._headers(),
-                json={
-                    "model": self.model_name,
-                    "input": contents,
-                    "input_type": "document",
-                },
-            )
-            if 300 <= resp.status_code < 400:
-                location = resp.headers.get("location", "<none>")
-                logger.error(f"Embeddings request redirected to: {location}")
-                resp.raise_for_status()
-            resp.raise_for_status()
-            ctype = resp.headers.get("content-type", "")
-            if "application/json" not in ctype.lower():
-                logger.error(
-                    f"Unexpected batch embeddings response: status={resp.status_code} content-type={ctype} body={resp.text[:300]}"
+            logger.debug("Generating embeddings for %d documents", len(docs))
+            self._batch_size.observe(len(contents))
+            with self._sync_latency.time():
+                resp = self.client.post(
+                    f"{self.base_url}/embeddings",
+                    headers=self._headers(),
+                    json={
+                        "model": self.model_name,
+                        "input": contents,
+                        "input_type": "document",
+                    },
                 )
-                raise RuntimeError("Embeddings API did not return JSON")
-            data = resp.json()
-            vectors = [item["embedding"] for item in data["data"]]
-            logger.info(f"Generated embeddings for {len(docs)} documents successfully")
+            vectors = self._parse_embeddings(resp)
+            logger.debug("Generated embeddings for %d documents", len(docs))
             return vectors
         except Exception as e:
             logger.error(f"Batch embedding failed: {str(e)}", exc_info=True)
             raise e
+
+    async def aembed_document(self, chunkdoc: LangchainDocument) -> List[float]:
+        """Async variant of `embed_document` that never blocks the event loop."""
+        return (await self._aembed([chunkdoc.page_content]))[0]
+
+    async def aembed_documents(self, docs: List[LangchainDocument]) -> List[List[float]]:
+        """Async variant of `embed_documents` that never blocks the event loop."""
+        return await self._aembed([doc.page_content for doc in docs])
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        try:
+            self._batch_size.observe(len(texts))
+            with self._async_latency.time():
+                resp = await get_async_http_client().post(
+                    f"{self.base_url}/embeddings",
+                    headers=self._headers(),
+                    json={
+                        "model": self.model_name,
+                        "input": texts if len(texts) > 1 else texts[0],
+                        "input_type": "document",
+                    },
+                )
+            return self._parse_embeddings(resp)
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}", exc_info=True)
+            raise
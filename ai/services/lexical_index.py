@@ -0,0 +1,228 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Sequence
+
+from config.constants import BM25_K1, BM25_B, LEXICAL_SHORTCUT_MAX_TERMS
+from utils.logger import logger
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# Deliberately small: only words that carry no signal for identifier lookups
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "of", "on", "or", "please",
+    "show", "tell", "that", "the", "this", "to", "was", "what", "when", "where",
+    "which", "who", "why", "with", "you", "about",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into alphanumeric terms, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass
+class SearchHit:
+    """A retrieval result with the same `id`/`score`/`payload` shape as a Qdrant hit."""
+    id: str
+    score: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+    # Fraction of distinct query terms present in the chunk (lexical hits only)
+    coverage: float = 0.0
+
+
+class _DocumentIndex:
+    """Inverted index over the chunks of a single document.
+
+    Postings are stored as parallel `array('I')` columns (chunk ordinal, term
+    frequency) so a document with thousands of chunks stays compact.
+    """
+
+    __slots__ = ("point_ids", "payloads", "lengths", "postings", "total_length")
+
+    def __init__(self):
+        self.point_ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.lengths = array("I")
+        self.postings: Dict[str, tuple] = {}
+        self.total_length = 0
+
+    def add(self, point_id: str, text: str, payload: Dict[str, Any]) -> None:
+        ordinal = len(self.point_ids)
+        terms = tokenize(text)
+        self.point_ids.append(point_id)
+        self.payloads.append(payload)
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        for term, tf in Counter(terms).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = (array("I"), array("I"))
+                self.postings[term] = posting
+            posting[0].append(ordinal)
+            posting[1].append(tf)
+
+    def df(self, term: str) -> int:
+        posting = self.postings.get(term)
+        return len(posting[0]) if posting else 0
+
+
+class LexicalIndex:
+    """Incrementally maintained, per-document BM25 index.
+
+    Each ingested document gets its own inverted index, so re-ingesting or
+    deleting a document only touches that document's postings. Collection
+    statistics (N, df, average length) are aggregated over the documents a
+    query is restricted to, matching how chats filter by `documents`.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._documents: Dict[str, _DocumentIndex] = {}
+        self._lock = threading.Lock()
+
+    def index_document(self, document_id: str, chunks: Iterable[tuple]) -> int:
+        """
+        Build (or rebuild) the index for one document.
+
+        Args:
+            document_id: ID of the source document
+            chunks: Iterable of (point_id, text, payload) tuples
+
+        Returns:
+            int: Number of chunks indexed
+        """
+        doc_index = _DocumentIndex()
+        for point_id, text, payload in chunks:
+            doc_index.add(str(point_id), text or "", payload)
+        # Swap in atomically so concurrent searches never see a half-built index
+        with self._lock:
+            self._documents[document_id] = doc_index
+        logger.info(f"[BM25] Indexed {len(doc_index.point_ids)} chunks for document {document_id}")
+        return len(doc_index.point_ids)
+
+    def remove_document(self, document_id: str) -> None:
+        """Drop a document's postings from the index."""
+        with self._lock:
+            self._documents.pop(document_id, None)
+
+    def covers(self, document_ids: Sequence[str]) -> bool:
+        """Return True if every requested document has been indexed in this process."""
+        with self._lock:
+            return bool(document_ids) and all(d in self._documents for d in document_ids)
+
+    def search(self, query: str, document_ids: Sequence[str], limit: int = 10) -> List[SearchHit]:
+        """
+        Score chunks of the given documents against a query with BM25.
+
+        Args:
+            query: Free-text query
+            document_ids: Documents to restrict the search to
+            limit: Maximum number of hits to return
+
+        Returns:
+            List[SearchHit]: Hits ordered by descending BM25 score
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            indexes = [self._documents[d] for d in document_ids if d in self._documents]
+        if not indexes:
+            return []
+
+        n_chunks = sum(len(ix.point_ids) for ix in indexes)
+        avgdl = (sum(ix.total_length for ix in indexes) / n_chunks) if n_chunks else 0.0
+        if not avgdl:
+            return []
+        idf = {}
+        for term in terms:
+            df = sum(ix.df(term) for ix in indexes)
+            if df:
+                idf[term] = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+
+        k1, b = self.k1, self.b
+        candidates = []
+        for ix in indexes:
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for term, term_idf in idf.items():
+                posting = ix.postings.get(term)
+                if not posting:
+                    continue
+                ordinals, freqs = posting
+                for ordinal, tf in zip(ordinals, freqs):
+                    norm = k1 * (1 - b + b * ix.lengths[ordinal] / avgdl)
+                    scores[ordinal] = scores.get(ordinal, 0.0) + term_idf * tf * (k1 + 1) / (tf + norm)
+                    matched[ordinal] = matched.get(ordinal, 0) + 1
+            for ordinal, score in scores.items():
+                candidates.append((score, matched[ordinal], ix, ordinal))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [
+            SearchHit(
+                id=ix.point_ids[ordinal],
+                score=score,
+                payload=ix.payloads[ordinal],
+                coverage=n_matched / len(terms),
+            )
+            for score, n_matched, ix, ordinal in candidates[:limit]
+        ]
+
+    @staticmethod
+    def is_keyword_query(query: str, max_terms: int = LEXICAL_SHORTCUT_MAX_TERMS) -> bool:
+        """
+        Heuristic for questions that are really identifier lookups.
+
+        A query qualifies when it is short and at least one term contains a
+        digit (lab numbers, part numbers, error codes) or the raw query has a
+        quoted phrase.
+        """
+        terms = tokenize(query)
+        if not terms or len(terms) > max_terms:
+            return False
+        return '"' in query or any(any(ch.isdigit() for ch in t) for t in terms)
+
+    def stats(self) -> Dict[str, int]:
+        """Return index size counters for debugging."""
+        with self._lock:
+            indexes = list(self._documents.values())
+        return {
+            "documents": len(indexes),
+            "chunks": sum(len(ix.point_ids) for ix in indexes),
+            "terms": sum(len(ix.postings) for ix in indexes),
+        }
+
+
+def reciprocal_rank_fusion(*rankings: Sequence[Any], limit: int = 10, k: int = 60) -> List[SearchHit]:
+    """
+    Fuse several ranked result lists with Reciprocal Rank Fusion.
+
+    Args:
+        *rankings: Result lists whose items expose `id`, `score` and `payload`
+        limit: Maximum number of fused hits to return
+        k: RRF damping constant
+
+    Returns:
+        List[SearchHit]: Fused hits; `score` holds the RRF score
+    """
+    fused: Dict[str, float] = {}
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking):
+            key = str(hit.id)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+            payloads.setdefault(key, hit.payload or {})
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [SearchHit(id=key, score=score, payload=payloads[key]) for key, score in ordered]
+
+
+# Process-wide index shared by ingestion and chat
+lexical_index = LexicalIndex()
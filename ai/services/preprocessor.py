@@ -27,6 +27,8 @@ class DocumentProcessor:
             chunk_size=CHUNK_SIZE,
             chunk_overlap=CHUNK_OVERLAP,
             length_function=len,
+            # Lets the context assembler strip overlap between adjacent chunks
+            add_start_index=True,
         )
     
     def create_langchain_document(self, document: AppDocument) -> LangchainDocument:
@@ -83,7 +85,7 @@ class DocumentProcessor:
         prepared_chunks = []
         for idx, chunk in enumerate(chunks):
             chunk_id = str(uuid.uuid4())
-            logger.info(f"Generated valid UUID chunk ID: {chunk_id} for original doc {original_doc.id}, chunk {idx}")
+            logger.debug("Generated chunk ID %s for original doc %s, chunk %d", chunk_id, original_doc.id, idx)
             prepared_chunks.append({
                 'id': chunk_id,
                 'name': f"{original_doc.name}_chunk_{idx}",
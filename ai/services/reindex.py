@@ -0,0 +1,422 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from langchain_core.documents import Document as LangchainDocument
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    PointIdsList,
+    PointStruct,
+    VectorParams,
+)
+
+from config.constants import (
+    EMBEDDINGS_MODEL,
+    EMBEDDING_DIM,
+    REINDEX_BATCH_SIZE,
+    REINDEX_EMBED_RATE,
+    REINDEX_LOCK_DIR,
+    REINDEX_POLL_SECONDS,
+    REINDEX_SOURCE_MODEL,
+)
+from services.embedding import EmbeddingService, set_serving_model
+from utils.file_lock import FileLock
+from utils.logger import logger
+
+_SCROLL_PAGE = 256
+
+# serving name -> collection this process reads and writes while the name is being turned into an alias
+_redirects: Dict[str, str] = {}
+
+
+def resolve_collection(name: str) -> str:
+    """Collection StoreService should use for `name` (differs only during a cut-over)."""
+    return _redirects.get(name, name)
+
+
+class WriteGate:
+    """Lets vector-store writes run concurrently, but lets the cut-over pause them.
+
+    Writers hold the gate shared for the duration of one upsert or delete.
+    `paused()` stops new writers, waits for in-flight ones to finish and
+    holds them off until the block exits. It only covers this process:
+    with several workers, stop ingestion on the others before a migration
+    reaches its cut-over.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._writers = 0
+        self._paused = False
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        with self._cond:
+            while self._paused:
+                self._cond.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writers -= 1
+                if self._writers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        with self._cond:
+            while self._paused:
+                self._cond.wait()
+            self._paused = True
+            while self._writers:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._paused = False
+                self._cond.notify_all()
+
+
+write_gate = WriteGate()
+
+
+def shadow_collection_name(serving_name: str, model_name: str, embedding_dim: int) -> str:
+    """Name of the collection built for a given model and dimension."""
+    slug = re.sub(r"[^0-9a-zA-Z]+", "_", model_name).strip("_").lower()
+    return f"{serving_name}__{slug}_{embedding_dim}"
+
+
+class ReindexMigration:
+    """Re-embeds a live collection into a shadow collection, then swaps an alias.
+
+    While the migration runs, queries and newly ingested chunks keep using the
+    source model against the live collection. Chunk text is read back from the
+    stored payloads, so no files are re-parsed. Passes repeat until one finds
+    nothing left to copy or prune. Writes are then paused, a last catch-up
+    pass copies whatever landed in the meantime, and the serving name is
+    pointed at the shadow collection with an alias swap. The old collection
+    is only dropped once the alias is verified.
+
+    Every worker that notices the mismatch starts one of these, but only the
+    holder of the lock file migrates. The others follow: they poll the alias
+    and switch their serving model once it points at the shadow, and take
+    over the (resumable) migration if the holder dies.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        serving_name: str,
+        source_model: str,
+        target_model: str = EMBEDDINGS_MODEL,
+        target_dim: int = EMBEDDING_DIM,
+        batch_size: int = REINDEX_BATCH_SIZE,
+        embed_rate: float = REINDEX_EMBED_RATE,
+        embedding_service: Optional[EmbeddingService] = None,
+        lock_dir: str = REINDEX_LOCK_DIR,
+        poll_seconds: float = REINDEX_POLL_SECONDS,
+    ):
+        self.client = client
+        self.serving_name = serving_name
+        self.source_model = source_model
+        self.target_model = target_model
+        self.target_dim = target_dim
+        self.batch_size = batch_size
+        self.embed_rate = embed_rate
+        self.shadow_name = shadow_collection_name(serving_name, target_model, target_dim)
+        self._embedding_service = embedding_service
+        self.poll_seconds = poll_seconds
+        self._lock = FileLock(os.path.join(lock_dir, f"reindex-{serving_name}.lock"))
+        self.status: Dict[str, Any] = {
+            "state": "pending",
+            "serving_name": serving_name,
+            "shadow_collection": self.shadow_name,
+            "source_model": source_model,
+            "target_model": target_model,
+            "passes": 0,
+            "embedded": 0,
+            "skipped": 0,
+            "pruned": 0,
+            "error": None,
+        }
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Run the migration on a daemon thread."""
+        set_serving_model(self.source_model)
+        self._thread = threading.Thread(target=self.run, name="reindex-migration", daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        try:
+            while not self._lock.acquire(blocking=False):
+                self.status["state"] = "following"
+                if self._cut_over_elsewhere():
+                    return
+                time.sleep(self.poll_seconds)
+            try:
+                if self._alias_target() == self.shadow_name:
+                    # A previous lock holder already cut over
+                    self._serve_target()
+                    self.status["state"] = "swapped"
+                    return
+                self._migrate()
+            finally:
+                self._lock.release()
+            self.status["state"] = "swapped"
+        except Exception as e:
+            self.status["state"] = "failed"
+            self.status["error"] = str(e)
+            logger.exception(f"[REINDEX] Migration to {self.shadow_name} failed; still serving {self.source_model}")
+
+    def _migrate(self) -> None:
+        self.status["state"] = "running"
+        self._ensure_shadow()
+        while True:
+            self.status["passes"] += 1
+            changed = self._copy_pass()
+            logger.info(
+                f"[REINDEX] Pass {self.status['passes']} done: {changed} changes "
+                f"({self.status['embedded']} embedded, {self.status['skipped']} up to date)"
+            )
+            if changed == 0:
+                break
+        with write_gate.paused():
+            # Catch up on writes that landed during the last pass; nothing new can arrive now
+            changed = self._copy_pass()
+            logger.info(f"[REINDEX] Catch-up pass done: {changed} changes; cutting over")
+            self._swap()
+
+    def _cut_over_elsewhere(self) -> bool:
+        """While following: adopt the target model once the lock holder has swapped the alias."""
+        try:
+            if self._alias_target() != self.shadow_name:
+                return False
+        except Exception as e:
+            logger.warning(f"[REINDEX] Could not check alias '{self.serving_name}': {e}")
+            return False
+        self._serve_target()
+        self.status["state"] = "swapped"
+        return True
+
+    # --- Internal helpers ---
+    def _embedder(self) -> EmbeddingService:
+        if self._embedding_service is None:
+            self._embedding_service = EmbeddingService(model_name=self.target_model)
+        return self._embedding_service
+
+    def _source_collection(self) -> str:
+        return self._alias_target() or self.serving_name
+
+    def _ensure_shadow(self) -> None:
+        existing = {c.name for c in self.client.get_collections().collections}
+        if self.shadow_name in existing:
+            logger.info(f"[REINDEX] Resuming into existing shadow collection '{self.shadow_name}'")
+            return
+        self.client.create_collection(
+            collection_name=self.shadow_name,
+            vectors_config=VectorParams(size=self.target_dim, distance=Distance.COSINE),
+        )
+        logger.info(f"[REINDEX] Created shadow collection '{self.shadow_name}' (dim={self.target_dim})")
+
+    def _copy_pass(self) -> int:
+        """Copy new or changed points into the shadow and prune deleted ones."""
+        source = self._source_collection()
+        live_ids: Set[str] = set()
+        changed = 0
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=source, limit=_SCROLL_PAGE, offset=offset, with_payload=True, with_vectors=False
+            )
+            live_ids.update(str(r.id) for r in records)
+            changed += self._copy_page(records)
+            if offset is None:
+                break
+
+        stale: List[str] = []
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.shadow_name, limit=_SCROLL_PAGE, offset=offset, with_payload=False
+            )
+            stale.extend(str(r.id) for r in records if str(r.id) not in live_ids)
+            if offset is None:
+                break
+        if stale:
+            self.client.delete(collection_name=self.shadow_name, points_selector=PointIdsList(points=stale))
+            self.status["pruned"] += len(stale)
+        return changed + len(stale)
+
+    def _copy_page(self, records: List[Any]) -> int:
+        existing = {
+            str(r.id): (r.payload or {}).get("content_hash")
+            for r in self.client.retrieve(
+                collection_name=self.shadow_name, ids=[r.id for r in records], with_payload=["content_hash"]
+            )
+        }
+        pending = []
+        for record in records:
+            payload = record.payload or {}
+            if not payload.get("page_content"):
+                continue
+            if str(record.id) in existing and existing[str(record.id)] == payload.get("content_hash"):
+                self.status["skipped"] += 1
+                continue
+            pending.append(record)
+
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            started = time.monotonic()
+            vectors = self._embedder().embed_documents(
+                [LangchainDocument(page_content=r.payload["page_content"]) for r in batch]
+            )
+            self.client.upsert(
+                collection_name=self.shadow_name,
+                points=[
+                    PointStruct(id=r.id, vector=v, payload={**r.payload, "embedding_model": self.target_model})
+                    for r, v in zip(batch, vectors)
+                ],
+            )
+            self.status["embedded"] += len(batch)
+            # Throttle so the migration never starves live traffic of embedding quota
+            if self.embed_rate > 0:
+                remaining = len(batch) / self.embed_rate - (time.monotonic() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+        return len(pending)
+
+    def _alias_target(self) -> Optional[str]:
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.serving_name:
+                return alias.collection_name
+        return None
+
+    def _point_alias(self, collection: str, replace: bool) -> None:
+        operations = []
+        if replace:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.serving_name)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(
+            collection_name=collection, alias_name=self.serving_name
+        )))
+        # One call: Qdrant applies the operations atomically
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        target = self._alias_target()
+        if target != collection:
+            raise RuntimeError(f"Alias '{self.serving_name}' points to {target!r}, expected '{collection}'")
+
+    def _backup(self, source: str) -> str:
+        """Copy `source` as-is (stored vectors, no re-embedding) so it survives being dropped."""
+        backup = f"{source}__backup"
+        if backup in {c.name for c in self.client.get_collections().collections}:
+            self.client.delete_collection(backup)
+        self.client.create_collection(
+            collection_name=backup, vectors_config=self.client.get_collection(source).config.params.vectors
+        )
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=source, limit=_SCROLL_PAGE, offset=offset, with_payload=True, with_vectors=True
+            )
+            if records:
+                self.client.upsert(
+                    collection_name=backup,
+                    points=[PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+                )
+            if offset is None:
+                break
+        return backup
+
+    def _swap(self) -> None:
+        """Point the serving name at the shadow. Call with writes paused."""
+        source = self._source_collection()
+        if source == self.shadow_name:
+            # Already serving the shadow; the source is gone and the shadow must stay
+            self._serve_target()
+            return
+        if source != self.serving_name:
+            self._point_alias(self.shadow_name, replace=True)
+            self._serve_target()
+            self.client.delete_collection(source)
+            return
+
+        # Pre-alias deployment: the serving name is a concrete collection, and
+        # Qdrant cannot turn a collection name into an alias in place; the
+        # collection has to be dropped first. Keep a copy until the alias is
+        # verified, and read from the shadow here meanwhile. Other workers see
+        # the name missing for the moment between the drop and the alias.
+        backup = self._backup(source)
+        _redirects[self.serving_name] = self.shadow_name
+        self._serve_target()
+        try:
+            self.client.delete_collection(self.serving_name)
+            self._point_alias(self.shadow_name, replace=False)
+        except Exception:
+            logger.exception(f"[REINDEX] Aliasing '{self.serving_name}' failed; serving the backup '{backup}'")
+            _redirects.pop(self.serving_name, None)
+            set_serving_model(self.source_model)
+            self._point_alias(backup, replace=self._alias_target() is not None)
+            self._clear_caches()
+            raise
+        _redirects.pop(self.serving_name, None)
+        self.client.delete_collection(backup)
+
+    def _serve_target(self) -> None:
+        set_serving_model(None if self.target_model == EMBEDDINGS_MODEL else self.target_model)
+        self._clear_caches()
+        logger.info(f"[REINDEX] '{self.serving_name}' now serves '{self.shadow_name}' ({self.target_model})")
+
+    @staticmethod
+    def _clear_caches() -> None:
+        from services.retrieval_cache import retrieval_cache
+        retrieval_cache.clear()
+
+
+# The migration started for this process, if any
+current_migration: Optional[ReindexMigration] = None
+
+
+def detect_source_model(client: QdrantClient, collection_name: str) -> Optional[str]:
+    """Return the embedding model recorded on the live collection's points."""
+    if REINDEX_SOURCE_MODEL:
+        return REINDEX_SOURCE_MODEL
+    records, _ = client.scroll(collection_name=collection_name, limit=1, with_payload=["embedding_model"])
+    return (records[0].payload or {}).get("embedding_model") if records else None
+
+
+def start_reindex(client: QdrantClient, serving_name: str) -> Optional[ReindexMigration]:
+    """
+    Start a background re-index of the serving collection into the configured model.
+
+    Args:
+        client: Qdrant client
+        serving_name: Collection (or alias) name used by StoreService
+
+    Returns:
+        Optional[ReindexMigration]: The started migration, or None if the source
+        model cannot be determined
+    """
+    global current_migration
+    if current_migration is not None and current_migration.status["state"] in {"pending", "following", "running"}:
+        return current_migration
+    source_model = detect_source_model(client, serving_name)
+    if not source_model or source_model == EMBEDDINGS_MODEL:
+        logger.error(
+            f"[REINDEX] Cannot determine a source model for '{serving_name}' distinct from "
+            f"{EMBEDDINGS_MODEL}; set QDRANT_REINDEX_SOURCE_MODEL. Leaving the collection untouched."
+        )
+        return None
+    current_migration = ReindexMigration(client, serving_name, source_model)
+    current_migration.start()
+    logger.info(f"[REINDEX] Re-indexing '{serving_name}' from {source_model} to {EMBEDDINGS_MODEL} in background")
+    return current_migration
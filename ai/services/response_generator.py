@@ -1,26 +1,91 @@
-from llm_providers.openrouter_provider import OpenRouterProvider
-from llm_providers.ollama_provider import OllamaProvider
+from llm_providers.hedging import HedgedStream, hedged_router
+from llm_providers.registry import registry
+from services.answer_cache import replay_answer
+from services.completion_cache import completion_cache, completion_key, record_completion
+from config.constants import COMPLETION_CACHE_ENABLED
 from utils.logger import logger
-from typing import Literal
+from utils.tracing import span
+from typing import Literal, Optional
 
 
-def get_llm(provider: Literal["openrouter", "ollama"] | str = "openrouter", **kwargs):
-    provider = (provider or "openrouter").lower()
-    if provider == "ollama":
-        return OllamaProvider(**kwargs)
-    # Default and only other option
-    return OpenRouterProvider(**kwargs)
+def served_key(served: HedgedStream, prompt: str) -> str:
+    """Completion key of the provider and model that actually produced a routed stream."""
+    return completion_key(served.provider, served.model, prompt, params={})
 
 
-async def generate_response(prompt: str, provider: str = "openrouter", stream: bool = False, **kwargs):
+def get_llm(provider: Literal["openrouter", "ollama", "gemini"] | str = "openrouter", model_name: str | None = None):
+    # Providers (and their pooled HTTP clients) are built once per process
+    return registry.get(provider, model_name)
+
+
+async def generate_response(
+    prompt: str,
+    provider: str = "openrouter",
+    stream: bool = False,
+    use_cache: bool = True,
+    route: str = "llm",
+    deadline: Optional[float] = None,
+    **kwargs,
+):
+    """
+    Generate a completion, served from the completion cache for repeated prompts.
+
+    Args:
+        prompt: Full prompt sent to the provider
+        provider: Provider name
+        stream: Return an async generator of chunks instead of a string
+        use_cache: Set False to bypass the completion cache
+        route: Route name used for cache hit metrics
+        deadline: Longest wait for provider rate-limit budget, in seconds
+        **kwargs: Passed to `get_llm` (e.g. model_name)
+
+    Raises:
+        RateLimitExceeded: If the provider has no budget within the deadline
+    """
     try:
         llm = get_llm(provider, **kwargs)
 
+        key = None
+        if COMPLETION_CACHE_ENABLED and use_cache:
+            # Providers take no generation params yet; add them here when they do
+            key = completion_key(provider, getattr(llm, "model_name", ""), prompt, params={})
+            with span("completion_cache"):
+                cached = await completion_cache.get(key, route)
+            if cached is not None:
+                logger.info(f"♻️ Completion cache hit on {route} ({len(cached)} chars)")
+                return replay_answer(cached) if stream else cached
+        elif COMPLETION_CACHE_ENABLED:
+            completion_cache.record_bypass(route)
+
+        # Queue for the provider's shared budget rather than tripping upstream 429s
+        with span("admit"):
+            provider, model_name = await hedged_router.admit(prompt, provider, kwargs.pop("model_name", None), deadline)
+        if model_name:
+            kwargs["model_name"] = model_name
+        llm = get_llm(provider, **kwargs)
+        if key is not None:
+            # Admission may have failed over to the secondary; store under what actually answers
+            key = completion_key(provider, getattr(llm, "model_name", ""), prompt, params={})
+
         if stream:
-            # For streaming, return the async generator directly
-            return llm.generate_response_stream(prompt)
+            # Tracks TTFT per provider and hedges to a secondary when one is configured
+            response_stream = hedged_router.stream(prompt, provider, **kwargs)
+            if key is not None:
+                # Stored under the winner: a hedge's answer must not be served as the primary's
+                return response_stream.pipe(
+                    lambda tokens: record_completion(tokens, completion_cache, lambda: served_key(response_stream, prompt))
+                )
+            return response_stream
 
-        response = await llm.generate_response(prompt, stream=stream)
+        if provider.lower() in hedged_router.routes:
+            served = hedged_router.stream(prompt, provider, **kwargs)
+            response = "".join([chunk async for chunk in served])
+            if key is not None:
+                key = served_key(served, prompt)
+        else:
+            response = await llm.generate_response(prompt, stream=stream)
+        if key is not None and isinstance(response, str) and response.strip():
+            await completion_cache.put(key, response)
         return response
 
     except Exception as e:
@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config.constants import RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_MAX_BYTES
+from services.document_versions import document_versions, DocumentVersions
+from utils.metrics import CACHE_LOOKUPS
+
+_hit = CACHE_LOOKUPS.labels("retrieval", "hit")
+_miss = CACHE_LOOKUPS.labels("retrieval", "miss")
+
+# Rough per-hit overhead (ids, score, payload dict) on top of the chunk text
+_HIT_OVERHEAD_BYTES = 512
+
+
+def vector_fingerprint(vector: Sequence[float]) -> str:
+    """Return a compact, stable fingerprint of a query vector."""
+    return hashlib.blake2b(array("f", vector).tobytes(), digest_size=16).hexdigest()
+
+
+def question_fingerprint(question: str) -> str:
+    """Return a fingerprint of a normalized question string."""
+    normalized = " ".join(question.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RetrievalCache:
+    """LRU cache for vector search results, invalidated per document.
+
+    Keys are (query fingerprint, sorted document IDs, limit, with vectors). Each entry records
+    the document versions observed *before* the search ran, so a write that
+    races with a search can never leave a stale entry behind. Entries past
+    the versions' staleness cap are dropped too, since writes made by other
+    workers never bump this process's versions.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+        max_bytes: int = RETRIEVAL_CACHE_MAX_BYTES,
+        versions: DocumentVersions = document_versions,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.versions = versions
+        # key -> (results, versions, size, stored at)
+        self._entries: "OrderedDict[tuple, Tuple[Any, tuple, int, float]]" = OrderedDict()
+        self._keys_by_document: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        versions.subscribe(self.invalidate_document)
+
+    @staticmethod
+    def make_key(fingerprint: str, document_ids: Sequence[str], limit: int, with_vectors: bool = False) -> tuple:
+        return (fingerprint, tuple(sorted(set(document_ids))), limit, with_vectors)
+
+    def get(self, key: tuple) -> Optional[List[Any]]:
+        """Return cached results for a key, or None on a miss or stale entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                _miss.inc()
+                return None
+            results, versions, _, stored_at = entry
+            if versions != self.versions.snapshot(key[1]) or self.versions.expired(stored_at):
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                _miss.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            _hit.inc()
+            return results
+
+    def put(self, key: tuple, results: List[Any], versions: tuple) -> None:
+        """
+        Store results computed against the given document versions.
+
+        Args:
+            key: Key from `make_key`
+            results: Search results to cache (treated as read-only)
+            versions: `DocumentVersions.snapshot` taken before the search ran
+        """
+        size = self._estimate_size(results)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if versions != self.versions.snapshot(key[1]):
+                # A document changed while the search was running
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (results, versions, size, time.monotonic())
+            self._bytes += size
+            for document_id in key[1]:
+                self._keys_by_document.setdefault(document_id, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: str) -> None:
+        """Eagerly drop every entry whose document set contains the document."""
+        with self._lock:
+            for key in list(self._keys_by_document.get(document_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_document.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit ratio and memory-use metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "max_staleness": self.versions.max_staleness,
+            }
+
+    # --- Internal helpers ---
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+        for document_id in key[1]:
+            keys = self._keys_by_document.get(document_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_document[document_id]
+
+    @staticmethod
+    def _estimate_size(results: List[Any]) -> int:
+        size = 0
+        for hit in results:
+            payload = getattr(hit, "payload", None) or {}
+            size += _HIT_OVERHEAD_BYTES + len(payload.get("page_content", "") or "")
+            vector = getattr(hit, "vector", None)
+            if isinstance(vector, list):
+                size += 8 * len(vector)
+        return size
+
+
+# Process-wide cache in front of StoreService searches
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,139 @@
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+from services.chat_stream import ChatStream
+from utils.logger import logger
+
+
+class _Flight:
+    """One in-flight generation whose chunks are fanned out to every subscriber.
+
+    Chunks are buffered for the lifetime of the flight, so a subscriber that
+    joins late first replays what was already produced, then follows live.
+    The upstream is cancelled if every subscriber goes away before it ends.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[AsyncGenerator[str, None]]], on_done: Callable[["_Flight"], None]):
+        self.chunks: List[str] = []
+        self.done = False
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+        self.ready = asyncio.Event()
+        self.started = False
+        self.sources: List[Any] = []
+        self.subscribers = 0
+        self._wake = asyncio.Event()
+        self._on_done = on_done
+        self.task = asyncio.create_task(self._produce(factory))
+
+    async def _produce(self, factory) -> None:
+        try:
+            stream = await factory()
+            self.started = True
+            self.sources = getattr(stream, "sources", [])
+            self.ready.set()
+            async for chunk in stream:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError as e:
+            self.error = e
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self.ready.set()
+            self._notify()
+            self._on_done(self)
+
+    def _notify(self) -> None:
+        wake, self._wake = self._wake, asyncio.Event()
+        wake.set()
+
+    def attach(self) -> None:
+        # Counted before the subscriber starts iterating, so a flight whose
+        # other subscribers all leave is not cancelled under a newcomer
+        self.subscribers += 1
+
+    def detach(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done and not self.cancelled:
+            logger.info("🛑 Every subscriber left; cancelling shared generation")
+            # Unregister together with the cancel, so no newcomer joins a doomed flight
+            self.cancelled = True
+            self._on_done(self)
+            self.task.cancel()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        """Yield buffered chunks, then live ones; call `attach` first."""
+        position = 0
+        try:
+            while True:
+                if position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wake.wait()
+        finally:
+            self.detach()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent requests onto a single upstream stream."""
+
+    def __init__(self):
+        self._flights: Dict[Any, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def stream(
+        self,
+        key: Any,
+        factory: Callable[[], Awaitable[AsyncGenerator[str, None]]],
+    ) -> AsyncGenerator[str, None]:
+        """
+        Return a stream for `key`, joining an identical generation already in flight.
+
+        Args:
+            key: Hashable identity of the request
+            factory: Coroutine function producing the upstream stream; only
+                called when no flight for `key` is running
+
+        Returns:
+            AsyncGenerator[str, None]: Buffered replay plus live chunks
+
+        Raises:
+            Exception: Whatever `factory` raised before its stream started
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.done or flight.cancelled:
+            flight = _Flight(factory, on_done=lambda f: self._finish(key, f))
+            self._flights[key] = flight
+            self.leaders += 1
+        else:
+            self.followers += 1
+            logger.info(f"🔗 Joined in-flight generation ({len(flight.chunks)} chunks buffered)")
+        flight.attach()
+        try:
+            await flight.ready.wait()
+        except BaseException:
+            flight.detach()
+            raise
+        if not flight.started:
+            flight.detach()
+            raise flight.error
+        return ChatStream(flight.subscribe(), flight.sources)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "followers": self.followers}
+
+    def _finish(self, key: Any, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+# Process-wide registry of in-flight chat generations
+single_flight = SingleFlight()
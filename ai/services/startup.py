@@ -0,0 +1,83 @@
+import asyncio
+import time
+from typing import Any, Dict
+
+from config.constants import VECTOR_BACKEND
+from utils.logger import logger
+
+# Components that must be up before the worker reports ready
+REQUIRED_COMPONENTS = ("vector_store",)
+
+
+class Readiness:
+    """Tracks which external dependencies a worker has connected to."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.components: Dict[str, Dict[str, Any]] = {
+            name: {"ready": False, "detail": "pending"} for name in REQUIRED_COMPONENTS
+        }
+
+    def mark(self, name: str, ready: bool, detail: str = "") -> None:
+        self.components[name] = {
+            "ready": ready,
+            "detail": detail,
+            "after_seconds": round(time.monotonic() - self.started_at, 3),
+        }
+
+    @property
+    def ready(self) -> bool:
+        return all(self.components.get(name, {}).get("ready") for name in REQUIRED_COMPONENTS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "components": self.components}
+
+
+readiness = Readiness()
+
+
+async def _connect_vector_store(max_delay: float = 10.0) -> None:
+    """Connect the vector backend off the event loop, retrying with backoff."""
+    from services.store import get_vector_client
+
+    delay = 0.5
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await asyncio.to_thread(get_vector_client)
+            readiness.mark("vector_store", True, VECTOR_BACKEND)
+            logger.info(f"[STARTUP] Vector store ({VECTOR_BACKEND}) ready after {attempt} attempt(s)")
+            return
+        except Exception as e:
+            readiness.mark("vector_store", False, f"attempt {attempt}: {e}")
+            logger.warning(f"[STARTUP] Vector store not ready (attempt {attempt}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+async def warm_up() -> None:
+    """Connect external clients in the background so the worker serves immediately."""
+    from llm_providers.registry import registry
+
+    await asyncio.gather(_connect_vector_store(), registry.prewarm())
+
+
+async def shut_down() -> None:
+    """Close shared clients created during the worker's lifetime."""
+    from services.completion_cache import completion_cache
+    from services.embedding import aclose_async_http_client, close_http_client
+    from llm_providers.registry import registry
+    from utils.executor import shutdown_executor
+
+    close_http_client()
+    await aclose_async_http_client()
+    shutdown_executor()
+    completion_cache.close()
+    await registry.aclose()
+    if VECTOR_BACKEND == "embedded":
+        from utils.embedded_vector_db import close_embedded_client
+        close_embedded_client()
+    else:
+        from utils.qdrant_db import close_client
+        close_client()
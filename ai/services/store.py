@@ -1,26 +1,58 @@
 from typing import List, Dict, Any, Optional, Union
-from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue, MatchAny
+from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue, MatchAny, FilterSelector, SearchRequest
 from pydantic import BaseModel
 import logging
 from datetime import datetime
 
-from utils.qdrant_db import client
-from config.constants import QDRANT_COLLECTION_NAME
+from config.constants import QDRANT_COLLECTION_NAME, RETRIEVAL_CACHE_ENABLED, VECTOR_BACKEND
+from services.document_versions import document_versions
+from services.reindex import resolve_collection, write_gate
+from services.retrieval_cache import retrieval_cache, vector_fingerprint
+from utils.executor import run_blocking
 from utils.logger import logger
+from utils.metrics import VECTOR_STORE_SECONDS
 import uuid
 
+# Bound once here: StoreService is built per request
+_LATENCY = {
+    backend: {op: VECTOR_STORE_SECONDS.labels(backend, op) for op in ("search", "upsert", "delete", "search_batch")}
+    for backend in ("qdrant", "embedded")
+}
+
+
+def get_vector_client(collection_name: str = QDRANT_COLLECTION_NAME, backend: str = VECTOR_BACKEND):
+    """Return the shared client for the configured vector backend."""
+    if backend == "embedded":
+        from utils.embedded_vector_db import get_embedded_client
+        return get_embedded_client(collection_name)
+    # Imported lazily so the embedded backend never connects to Qdrant
+    from utils.qdrant_db import get_client
+    return get_client()
+
+
 class StoreService:
     """Service for handling document storage and retrieval with Qdrant."""
     
-    def __init__(self, collection_name: str = QDRANT_COLLECTION_NAME):
+    def __init__(self, collection_name: str = QDRANT_COLLECTION_NAME, backend: str = VECTOR_BACKEND):
         """
         Initialize the store service.
         
         Args:
             collection_name: Name of the Qdrant collection to use
+            backend: "qdrant" for the Qdrant server or "embedded" for the in-process store
         """
-        self.collection_name = collection_name
-        self.client = client
+        self._collection_name = collection_name
+        self.client = get_vector_client(collection_name, backend)
+        latency = _LATENCY["embedded" if backend == "embedded" else "qdrant"]
+        self._search_latency = latency["search"]
+        self._upsert_latency = latency["upsert"]
+        self._delete_latency = latency["delete"]
+        self._batch_latency = latency["search_batch"]
+
+    @property
+    def collection_name(self) -> str:
+        # Follows a re-index cut-over that is still turning the name into an alias
+        return resolve_collection(self._collection_name)
 
     def store_document(
         self,
@@ -41,9 +73,6 @@ class StoreService:
         Returns:
             bool: True if storage was successful
         """
-        logger.info(
-            f"Storing point id={document_id or 'auto'} for doc={getattr(document, 'id', additional_metadata.get('id', 'unknown'))}"
-        )
         try:
             # Convert various document types into a base payload
             base_payload: Dict[str, Any] = {}
@@ -74,12 +103,12 @@ class StoreService:
                 **additional_metadata,
                 "stored_at": datetime.utcnow().isoformat(),
             }
-            logger.debug(f"Payload keys: {list(payload.keys())}")
+            logger.debug("Payload keys: %s", list(payload))
 
             # Create point structure for Qdrant
             # Qdrant expects string or integer IDs; use string UUIDs for consistency
             final_id = self._normalize_point_id(document_id) if document_id is not None else str(uuid.uuid4())
-            logger.info(f"Creating Qdrant point with ID: {final_id}")
+            logger.debug("Creating Qdrant point with ID: %s", final_id)
             point = PointStruct(
                 id=final_id,
                 vector=vector,
@@ -87,8 +116,14 @@ class StoreService:
             )
 
             # Upsert the point
-            self.client.upsert(collection_name=self.collection_name, points=[point])
-            
+            with write_gate.writing(), self._upsert_latency.time():
+                self.client.upsert(collection_name=self.collection_name, points=[point])
+
+            # Invalidate cached searches over this document
+            source_id = payload.get("id")
+            if source_id is not None:
+                document_versions.bump(str(source_id))
+
             return True
             
         except Exception as e:
@@ -149,13 +184,14 @@ class StoreService:
             
             search_filters = Filter(must=filter_conditions) if filter_conditions else None
             
-            search_results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                query_filter=search_filters,
-                limit=limit,
-                score_threshold=score_threshold
-            )
+            with self._search_latency.time():
+                search_results = self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    query_filter=search_filters,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
             
             return [
                 {
@@ -170,8 +206,132 @@ class StoreService:
             logger.error(f"Error searching documents: {str(e)}")
             return []
 
-    def search_chunks_by_ids(self, vector: list[float], ids: list[str], limit: int = 10):
-        filter_by_ids = Filter(
+    def delete_document(self, document_id: str) -> bool:
+        """
+        Delete every chunk stored for a source document.
+
+        Args:
+            document_id: ID of the source document (the `id` payload field)
+
+        Returns:
+            bool: True if the delete request was accepted
+        """
+        try:
+            with write_gate.writing(), self._delete_latency.time():
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=FilterSelector(
+                        filter=Filter(must=[FieldCondition(key="id", match=MatchValue(value=document_id))])
+                    ),
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting document {document_id}: {str(e)}")
+            raise
+        finally:
+            # Bump even on failure: a partial delete must not be served from cache
+            document_versions.bump(str(document_id))
+
+    def search_chunks_by_ids(self, vector: list[float], ids: list[str], limit: int = 10, with_vectors: bool = False):
+        """
+        Search chunks of the given source documents, served from the retrieval
+        cache when an identical search over unchanged documents was cached.
+        """
+        if not RETRIEVAL_CACHE_ENABLED:
+            return self._search_chunks_by_ids(vector, ids, limit, with_vectors)
+
+        key = retrieval_cache.make_key(vector_fingerprint(vector), ids, limit, with_vectors)
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            return cached
+        versions = document_versions.snapshot(key[1])
+        results = self._search_chunks_by_ids(vector, ids, limit, with_vectors)
+        retrieval_cache.put(key, results, versions)
+        return results
+
+    async def asearch_chunks_by_ids(
+        self, vector: list[float], ids: list[str], limit: int = 10, with_vectors: bool = False
+    ):
+        """
+        Async variant of `search_chunks_by_ids`.
+
+        Cache hits are answered inline; only a miss hands the blocking vector
+        search to the bounded executor.
+        """
+        if not RETRIEVAL_CACHE_ENABLED:
+            return await run_blocking(self._search_chunks_by_ids, vector, ids, limit, with_vectors)
+
+        key = retrieval_cache.make_key(vector_fingerprint(vector), ids, limit, with_vectors)
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            return cached
+        versions = document_versions.snapshot(key[1])
+        results = await run_blocking(self._search_chunks_by_ids, vector, ids, limit, with_vectors)
+        retrieval_cache.put(key, results, versions)
+        return results
+
+    async def asearch_chunks_batch(
+        self, vectors: List[List[float]], ids_list: List[List[str]], limit: int = 10
+    ) -> List[list]:
+        """
+        Run many `asearch_chunks_by_ids` searches at once.
+
+        Cached searches are answered inline; every miss goes to the vector
+        store in a single batch request on the bounded executor.
+
+        Args:
+            vectors: Query vectors
+            ids_list: Source document IDs to search, one list per query vector
+            limit: Maximum hits per query
+
+        Returns:
+            List[list]: Hits for each query, in input order
+        """
+        results: List[Optional[list]] = [None] * len(vectors)
+        misses = []
+        for i, (vector, ids) in enumerate(zip(vectors, ids_list)):
+            if not RETRIEVAL_CACHE_ENABLED:
+                misses.append((i, None, None))
+                continue
+            key = retrieval_cache.make_key(vector_fingerprint(vector), ids, limit)
+            cached = retrieval_cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append((i, key, document_versions.snapshot(key[1])))
+        if misses:
+            found = await run_blocking(
+                self._search_chunks_batch, [vectors[i] for i, _, _ in misses], [ids_list[i] for i, _, _ in misses], limit
+            )
+            for (i, key, versions), hits in zip(misses, found):
+                results[i] = hits
+                if key is not None:
+                    retrieval_cache.put(key, hits, versions)
+        return results
+
+    def _search_chunks_by_ids(self, vector: list[float], ids: list[str], limit: int = 10, with_vectors: bool = False):
+        with self._search_latency.time():
+            results = self.client.search(
+                collection_name=self.collection_name,
+                query_vector=vector,
+                query_filter=self._ids_filter(ids),
+                limit=limit,
+                with_vectors=with_vectors,
+            )
+        return results
+
+    def _search_chunks_batch(self, vectors: List[List[float]], ids_list: List[List[str]], limit: int) -> List[list]:
+        requests = [
+            SearchRequest(vector=vector, filter=self._ids_filter(ids), limit=limit, with_payload=True)
+            for vector, ids in zip(vectors, ids_list)
+        ]
+        with self._batch_latency.time():
+            return self.client.search_batch(collection_name=self.collection_name, requests=requests)
+
+    # --- Internal helpers ---
+    @staticmethod
+    def _ids_filter(ids: List[str]) -> Filter:
+        return Filter(
             must=[
                 FieldCondition(
                     key="id",
@@ -180,15 +340,6 @@ class StoreService:
             ]
         )
 
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=vector,
-            query_filter=filter_by_ids,
-            limit=limit,
-        )
-        return results
-
-    # --- Internal helpers ---
     def _normalize_point_id(self, point_id: Union[str, int, uuid.UUID]) -> str:
         """Return a string ID compatible with Qdrant.
 
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from utils.admission import AdmissionControlMiddleware, AdmissionController, AdmissionGate, AdmissionRejected
+
+
+async def _queued(gate: AdmissionGate, count: int) -> None:
+    while len(gate._waiters) < count:
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slots_are_handed_to_waiters_in_arrival_order():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=10, queue_timeout=5)
+    await gate.acquire()
+    admitted = []
+
+    async def request(name):
+        await gate.acquire()
+        admitted.append(name)
+
+    waiters = []
+    for name in ("first", "second", "third"):
+        waiters.append(asyncio.create_task(request(name)))
+        await _queued(gate, len(waiters))
+
+    for expected in (["first"], ["first", "second"], ["first", "second", "third"]):
+        gate.release(0.1)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert admitted == expected
+        assert gate.in_flight == 1
+    await asyncio.gather(*waiters)
+
+
+@pytest.mark.asyncio
+async def test_newcomer_does_not_overtake_a_handoff():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=10, queue_timeout=5)
+    await gate.acquire()
+    waiter = asyncio.create_task(gate.acquire())
+    await _queued(gate, 1)
+
+    # The slot goes straight to the waiter, so a request arriving now must queue behind it
+    gate.release(0.1)
+    newcomer = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    await waiter
+    assert not newcomer.done()
+    assert gate.in_flight == 1
+
+    gate.release(0.1)
+    await newcomer
+    gate.release(0.1)
+    assert gate.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_shed_with_429():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=1, queue_timeout=5)
+    await gate.acquire()
+    waiter = asyncio.create_task(gate.acquire())
+    await _queued(gate, 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await gate.acquire()
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    assert gate.shed == {"queue_full": 1, "queue_timeout": 0}
+
+    gate.release(0.1)
+    await waiter
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_is_shed_with_503():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=10, queue_timeout=0.01)
+    await gate.acquire()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await gate.acquire()
+    assert rejected.value.status_code == 503
+    assert gate.shed == {"queue_full": 0, "queue_timeout": 1}
+    assert not gate._waiters
+
+    gate.release(0.1)
+    assert gate.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_its_slot():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=10, queue_timeout=5)
+    await gate.acquire()
+    cancelled = asyncio.create_task(gate.acquire())
+    await _queued(gate, 1)
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+
+    gate.release(0.1)
+    assert gate.in_flight == 0
+    await gate.acquire()
+    assert gate.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_answers_shed_requests_with_retry_after():
+    controller = AdmissionController({"chat": (1, 0, 5)})
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionControlMiddleware(app, controller)
+    scope = {"type": "http", "method": "POST", "path": "/api/chat", "headers": []}
+
+    async def call():
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        await middleware(scope, receive, send)
+        return messages
+
+    running = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    shed = await call()
+    release.set()
+    served = await running
+
+    assert shed[0]["status"] == 429
+    assert any(name.lower() == b"retry-after" for name, _ in shed[0]["headers"])
+    assert served[0]["status"] == 200
+    assert controller.gates["chat"].in_flight == 0
@@ -0,0 +1,114 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from services.answer_cache import AnswerCache
+from services.chat_session import SessionStore
+from services.document_versions import DocumentVersions
+from services.retrieval_cache import RetrievalCache
+
+DOCS = ("doc-a", "doc-b")
+
+
+def _hits(text: str = "chunk", with_vector: bool = False):
+    return [
+        SimpleNamespace(
+            id=f"{text}-{i}",
+            score=1.0 - i / 10,
+            payload={"page_content": f"{text} {i}"},
+            vector=[1.0, float(i)] if with_vector else None,
+        )
+        for i in range(3)
+    ]
+
+
+def test_bump_between_snapshot_and_put_drops_the_result():
+    versions = DocumentVersions(max_staleness=0)
+    cache = RetrievalCache(versions=versions)
+    key = cache.make_key("q", DOCS, 5)
+
+    observed = versions.snapshot(key[1])
+    versions.bump("doc-b")  # Re-ingested while the search was running
+    cache.put(key, _hits(), observed)
+
+    assert cache.get(key) is None
+    cache.put(key, _hits(), versions.snapshot(key[1]))
+    assert cache.get(key) is not None
+
+
+def test_concurrent_bumps_never_leave_a_stale_entry():
+    versions = DocumentVersions(max_staleness=0)
+    cache = RetrievalCache(versions=versions)
+    key = cache.make_key("q", DOCS, 5)
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            versions.bump("doc-a")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            cache.put(key, _hits(), versions.snapshot(key[1]))
+    finally:
+        stop.set()
+        thread.join()
+
+    # Whatever survived must match the final versions; anything else was invalidated
+    entry = cache._entries.get(key)
+    assert entry is None or entry[1] == versions.snapshot(key[1])
+
+
+def test_answer_put_racing_a_bump_is_not_cached():
+    versions = DocumentVersions(max_staleness=0)
+    cache = AnswerCache(versions=versions)
+    scope = cache.make_scope(DOCS, "provider", "model", "v1")
+    vector = [1.0, 0.0]
+
+    observed = versions.snapshot(scope[0])
+    versions.bump("doc-a")
+    cache.put(scope, "what is it?", vector, "an answer", observed)
+    assert cache.lookup_exact(scope, "what is it?") is None
+
+    cache.put(scope, "what is it?", vector, "an answer", versions.snapshot(scope[0]))
+    assert cache.lookup_exact(scope, "what is it?").answer == "an answer"
+    versions.bump("doc-b")
+    assert cache.lookup(scope, vector) is None
+
+
+def test_session_pool_is_dropped_after_a_bump():
+    versions = DocumentVersions(max_staleness=0)
+    sessions = SessionStore(versions=versions, min_score=0.0)
+    sessions.put("s1", DOCS, _hits(with_vector=True), versions.snapshot(DOCS))
+    assert sessions.reuse("s1", DOCS, [1.0, 0.0], 2)
+
+    versions.bump("doc-a")
+    assert sessions.reuse("s1", DOCS, [1.0, 0.0], 2) is None
+
+
+def test_entries_expire_past_the_staleness_cap():
+    # Another worker's write never bumps these versions; only age catches it
+    versions = DocumentVersions(max_staleness=0.05)
+    retrieval = RetrievalCache(versions=versions)
+    answers = AnswerCache(versions=versions, ttl=0)
+    sessions = SessionStore(versions=versions, min_score=0.0)
+    key = retrieval.make_key("q", DOCS, 5)
+    scope = answers.make_scope(DOCS, "provider", "model", "v1")
+    retrieval.put(key, _hits(), versions.snapshot(key[1]))
+    answers.put(scope, "what is it?", [1.0, 0.0], "an answer", versions.snapshot(scope[0]))
+    sessions.put("s1", DOCS, _hits(with_vector=True), versions.snapshot(DOCS))
+    assert retrieval.get(key) is not None
+
+    time.sleep(0.1)
+
+    assert retrieval.get(key) is None
+    assert answers.lookup_exact(scope, "what is it?") is None
+    assert sessions.reuse("s1", DOCS, [1.0, 0.0], 2) is None
+
+
+def test_cap_cannot_be_disabled_with_several_workers():
+    assert DocumentVersions(max_staleness=0, workers=1).max_staleness == 0
+    assert DocumentVersions(max_staleness=0, workers=4).max_staleness > 0
+    assert DocumentVersions(max_staleness=30, workers=4).max_staleness == 30
+    assert not DocumentVersions(max_staleness=0).expired(time.monotonic() - 1e6)
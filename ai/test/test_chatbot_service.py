@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from models.chat_model import ChatRequest
+from services import chatbot_service
+from services.answer_cache import AnswerCache
+from services.chatbot_service import ChatbotService
+from services.lexical_index import LexicalIndex
+from services.single_flight import SingleFlight
+
+
+class _FakeRegistry:
+    def get(self, provider: str, model_name=None):
+        return type("LLM", (), {"model_name": "fake-model"})()
+
+    async def ensure_warm(self, provider: str) -> None:
+        pass
+
+
+async def _answer(*args, **kwargs):
+    async def stream():
+        yield "Lab 42 closes at noon."
+    return stream()
+
+
+async def _collect(stream) -> str:
+    return "".join([chunk async for chunk in stream])
+
+
+async def _no_hits(*args, **kwargs):
+    return []
+
+
+@pytest.fixture
+def service(monkeypatch):
+    index = LexicalIndex()
+    index.index_document("doc-a", [
+        ("p1", "Lab 42 closes at noon on Fridays.", {"id": "doc-a", "page_content": "Lab 42 closes at noon on Fridays."}),
+        ("p2", "The library opens at nine.", {"id": "doc-a", "page_content": "The library opens at nine."}),
+    ])
+    monkeypatch.setattr(chatbot_service, "lexical_index", index)
+    monkeypatch.setattr(chatbot_service, "LEXICAL_INDEX_ENABLED", True)
+    monkeypatch.setattr(chatbot_service, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(chatbot_service, "answer_cache", AnswerCache())
+    monkeypatch.setattr(chatbot_service, "registry", _FakeRegistry())
+    service = ChatbotService()
+    service.embedded = 0
+
+    async def embed_question(question):
+        service.embedded += 1
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(service, "embed_question", embed_question)
+    monkeypatch.setattr(service, "call_llm", _answer)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_keyword_shortcut_skips_the_embedding_with_the_answer_cache_on(service):
+    chat = ChatRequest(question="lab 42", documents=["doc-a"])
+
+    assert await _collect(await service._generate(chat)) == "Lab 42 closes at noon."
+    # Asked again: the exact-question hit is served without embedding either
+    assert await _collect(await service._generate(chat)) == "Lab 42 closes at noon."
+    assert service.embedded == 0
+    assert chatbot_service.answer_cache.exact_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_semantic_lookup_still_embeds_prose_questions(service):
+    chat = ChatRequest(question="when does the library open", documents=["doc-a"])
+    service.retrieve = _no_hits
+
+    await _collect(await service._generate(chat))
+    assert service.embedded == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_from_other_sessions_or_deadlines_are_not_coalesced(monkeypatch):
+    monkeypatch.setattr(chatbot_service, "single_flight", SingleFlight())
+    monkeypatch.setattr(chatbot_service, "SINGLE_FLIGHT_ENABLED", True)
+    service = ChatbotService()
+    generated = []
+    gate = asyncio.Event()
+
+    async def generate(chat):
+        generated.append((chat.session_id, chat.timeout))
+
+        async def stream():
+            await gate.wait()
+            yield "Lab 42 closes at noon."
+        return stream()
+
+    monkeypatch.setattr(service, "_generate", generate)
+    requests = [
+        ChatRequest(question="lab 42", documents=["doc-a"], session_id="s1"),
+        ChatRequest(question="lab 42", documents=["doc-a"], session_id="s1"),
+        ChatRequest(question="lab 42", documents=["doc-a"], session_id="s2"),
+        ChatRequest(question="lab 42", documents=["doc-a"], session_id="s1", timeout=5),
+    ]
+    streams = [await service.get_response(chat) for chat in requests]
+    gate.set()
+    await asyncio.gather(*[_collect(stream) for stream in streams])
+
+    assert generated == [("s1", None), ("s2", None), ("s1", 5)]
@@ -0,0 +1,292 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    PointStruct,
+    VectorParams,
+)
+
+from utils.embedded_vector_db import EmbeddedVectorClient
+
+DIM = 8
+COLLECTION = "test_documents"
+
+
+def _point_id(name: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+
+def _vector(seed: int) -> list:
+    return np.random.default_rng(seed).normal(size=DIM).astype(np.float32).tolist()
+
+
+def _make_client(backend: str, tmp_path):
+    if backend == "qdrant":
+        client = QdrantClient(location=":memory:")
+    elif backend == "embedded-memory":
+        client = EmbeddedVectorClient(path=None)
+    else:
+        client = EmbeddedVectorClient(path=str(tmp_path / "vectors"), search_mode=backend.split("-")[1])
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    return client
+
+
+@pytest.fixture(params=["qdrant", "embedded-memory", "embedded-exact", "embedded-hnsw"])
+def client(request, tmp_path):
+    return _make_client(request.param, tmp_path)
+
+
+def _seed(client, n_docs: int = 3, chunks_per_doc: int = 5):
+    points = []
+    for d in range(n_docs):
+        for c in range(chunks_per_doc):
+            points.append(PointStruct(
+                id=_point_id(f"doc{d}_chunk_{c}"),
+                vector=_vector(d * 100 + c),
+                payload={"id": f"doc{d}", "organization_id": f"org{d % 2}", "page_content": f"doc{d} chunk{c}"},
+            ))
+    client.upsert(collection_name=COLLECTION, points=points)
+    return points
+
+
+def test_retrieve_returns_payload(client):
+    _seed(client)
+    records = client.retrieve(collection_name=COLLECTION, ids=[_point_id("doc1_chunk_2")], with_vectors=False)
+    assert len(records) == 1
+    assert records[0].payload["page_content"] == "doc1 chunk2"
+    assert client.retrieve(collection_name=COLLECTION, ids=[_point_id("missing")]) == []
+
+
+def test_search_filters_by_document_ids(client):
+    _seed(client)
+    hits = client.search(
+        collection_name=COLLECTION,
+        query_vector=_vector(101),
+        query_filter=Filter(must=[FieldCondition(key="id", match=MatchAny(any=["doc1", "doc2"]))]),
+        limit=4,
+    )
+    assert len(hits) == 4
+    assert {h.payload["id"] for h in hits} <= {"doc1", "doc2"}
+    assert hits[0].id == _point_id("doc1_chunk_1")
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+    assert [h.score for h in hits] == sorted((h.score for h in hits), reverse=True)
+
+
+def test_search_filters_by_organization(client):
+    _seed(client)
+    hits = client.search(
+        collection_name=COLLECTION,
+        query_vector=_vector(1),
+        query_filter=Filter(must=[FieldCondition(key="organization_id", match=MatchValue(value="org1"))]),
+        limit=20,
+    )
+    assert len(hits) == 5
+    assert {h.payload["id"] for h in hits} == {"doc1"}
+
+
+def test_score_threshold(client):
+    _seed(client)
+    hits = client.search(collection_name=COLLECTION, query_vector=_vector(3), limit=20, score_threshold=0.99)
+    assert [h.id for h in hits] == [_point_id("doc0_chunk_3")]
+
+
+def test_upsert_overwrites_existing_point(client):
+    _seed(client)
+    point_id = _point_id("doc0_chunk_0")
+    client.upsert(collection_name=COLLECTION, points=[
+        PointStruct(id=point_id, vector=_vector(999), payload={"id": "doc0", "page_content": "updated"}),
+    ])
+    hits = client.search(collection_name=COLLECTION, query_vector=_vector(999), limit=1)
+    assert hits[0].id == point_id
+    assert hits[0].payload["page_content"] == "updated"
+    assert len(client.scroll(collection_name=COLLECTION, limit=100)[0]) == 15
+
+
+def test_delete_by_filter(client):
+    _seed(client)
+    client.delete(
+        collection_name=COLLECTION,
+        points_selector=FilterSelector(filter=Filter(must=[FieldCondition(key="id", match=MatchValue(value="doc0"))])),
+    )
+    records, _ = client.scroll(collection_name=COLLECTION, limit=100)
+    assert len(records) == 10
+    assert all(r.payload["id"] != "doc0" for r in records)
+    hits = client.search(collection_name=COLLECTION, query_vector=_vector(0), limit=20)
+    assert all(h.payload["id"] != "doc0" for h in hits)
+
+
+def test_scroll_paginates(client):
+    _seed(client)
+    seen = []
+    offset = None
+    while True:
+        records, offset = client.scroll(collection_name=COLLECTION, limit=4, offset=offset)
+        seen.extend(r.id for r in records)
+        if offset is None:
+            break
+    assert len(seen) == len(set(seen)) == 15
+
+
+def test_embedded_persists_to_disk(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-exact", tmp_path)
+    _seed(client)
+    client.delete(collection_name=COLLECTION, points_selector=[_point_id("doc2_chunk_4")])
+    client.close()
+
+    reopened = EmbeddedVectorClient(path=path, search_mode="exact")
+    records, _ = reopened.scroll(collection_name=COLLECTION, limit=100)
+    assert len(records) == 14
+    hits = reopened.search(collection_name=COLLECTION, query_vector=_vector(203), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_3")
+    assert hits[0].payload["page_content"] == "doc2 chunk3"
+
+
+def test_hnsw_recall_matches_exact():
+    rng = np.random.default_rng(7)
+    exact = EmbeddedVectorClient(path=None, search_mode="exact")
+    graph = EmbeddedVectorClient(path=None, search_mode="hnsw")
+    points = [
+        PointStruct(id=_point_id(str(i)), vector=rng.normal(size=DIM).tolist(), payload={"id": f"doc{i % 10}"})
+        for i in range(2000)
+    ]
+    for c in (exact, graph):
+        c.create_collection(COLLECTION, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+        c.upsert(collection_name=COLLECTION, points=points)
+    assert graph._get(COLLECTION).wait_for_index(timeout=30)
+    assert graph._get(COLLECTION).hnsw.rows == 2000
+
+    overlap = 0
+    for _ in range(20):
+        query = rng.normal(size=DIM).tolist()
+        truth = {h.id for h in exact.search(collection_name=COLLECTION, query_vector=query, limit=10)}
+        found = {h.id for h in graph.search(collection_name=COLLECTION, query_vector=query, limit=10)}
+        overlap += len(truth & found)
+    assert overlap / 200 >= 0.9
+
+
+def test_embedded_reopens_repeatedly(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-exact", tmp_path)
+    _seed(client)
+    client.close()
+    for _ in range(3):
+        client = EmbeddedVectorClient(path=path, search_mode="exact")
+        client.close()
+
+    files = os.listdir(os.path.join(path, COLLECTION))
+    assert [f for f in files if f.endswith(".f32")] == ["vectors.4.f32"]
+    client = EmbeddedVectorClient(path=path, search_mode="exact")
+    hits = client.search(collection_name=COLLECTION, query_vector=_vector(203), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_3")
+
+
+def test_embedded_survives_missing_vectors_file(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-exact", tmp_path)
+    _seed(client)
+    client.close()
+    collection_dir = os.path.join(path, COLLECTION)
+    for name in os.listdir(collection_dir):
+        if name.endswith(".f32"):
+            os.remove(os.path.join(collection_dir, name))
+
+    # Points without vectors are dropped; the service still starts and accepts writes
+    reopened = EmbeddedVectorClient(path=path, search_mode="exact")
+    assert reopened.count(collection_name=COLLECTION).count == 0
+    reopened.upsert(COLLECTION, [PointStruct(id=_point_id("new"), vector=_vector(1), payload={"document_id": "new"})])
+    assert reopened.count(collection_name=COLLECTION).count == 1
+
+
+def test_embedded_ignores_uncommitted_compaction(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-exact", tmp_path)
+    _seed(client)
+    client.close()
+    collection_dir = os.path.join(path, COLLECTION)
+    # A compaction that crashed after building its matrix but before replacing the log
+    with open(os.path.join(collection_dir, "vectors.2.f32"), "wb") as f:
+        f.write(b"\0" * 64)
+    with open(os.path.join(collection_dir, "points.jsonl.tmp"), "w") as f:
+        f.write('{"op": "header", "generation": 2, "vect')
+
+    reopened = EmbeddedVectorClient(path=path, search_mode="exact")
+    records, _ = reopened.scroll(collection_name=COLLECTION, limit=100)
+    assert len(records) == 15
+    hits = reopened.search(collection_name=COLLECTION, query_vector=_vector(203), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_3")
+
+
+def test_second_open_of_a_store_is_refused_without_losing_data(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-exact", tmp_path)
+    _seed(client)
+
+    # Another worker opening the same directory would compact away this one's files
+    with pytest.raises(RuntimeError, match="open in another process"):
+        EmbeddedVectorClient(path=path, search_mode="exact")
+    client.upsert(COLLECTION, [PointStruct(id=_point_id("late"), vector=_vector(99), payload={"id": "late"})])
+    client.close()
+
+    reopened = EmbeddedVectorClient(path=path, search_mode="exact")
+    assert reopened.count(collection_name=COLLECTION).count == 16
+    hits = reopened.search(collection_name=COLLECTION, query_vector=_vector(99), limit=1)
+    assert hits[0].id == _point_id("late")
+
+
+def test_embedded_backend_refuses_several_workers(monkeypatch, tmp_path):
+    from utils import embedded_vector_db
+
+    monkeypatch.setattr(embedded_vector_db, "APP_WORKERS", 2)
+    monkeypatch.setattr(embedded_vector_db, "EMBEDDED_VECTOR_PATH", str(tmp_path))
+    monkeypatch.setattr(embedded_vector_db, "_embedded_client", None)
+    with pytest.raises(RuntimeError, match="single worker"):
+        embedded_vector_db.get_embedded_client(COLLECTION, DIM)
+
+
+def test_search_serves_exact_results_while_the_graph_is_built(tmp_path):
+    client = _make_client("embedded-hnsw", tmp_path)
+    points = _seed(client)
+    collection = client._get(COLLECTION)
+    collection.wait_for_index(timeout=30)
+
+    # The indexer holds the graph; searches must not wait for it
+    with collection._graph_lock:
+        hits = client.search(collection_name=COLLECTION, query_vector=_vector(203), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_3")
+
+    # Rows the graph has not reached yet are still found
+    collection.hnsw.rows = len(points) - 5
+    hits = client.search(collection_name=COLLECTION, query_vector=_vector(204), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_4")
+    client.close()
+
+
+def test_hnsw_graph_is_saved_and_reloaded_across_compaction(tmp_path):
+    path = str(tmp_path / "vectors")
+    client = _make_client("embedded-hnsw", tmp_path)
+    _seed(client)
+    client.delete(collection_name=COLLECTION, points_selector=[_point_id("doc0_chunk_0")])
+    client.upsert(COLLECTION, [PointStruct(id=_point_id("doc1_chunk_1"), vector=_vector(500), payload={"id": "doc1"})])
+    client.close()
+    assert os.path.exists(os.path.join(path, COLLECTION, "hnsw.json"))
+
+    reopened = EmbeddedVectorClient(path=path, search_mode="hnsw")
+    collection = reopened._get(COLLECTION)
+    # Loaded from disk and renumbered to the compacted rows, not rebuilt from scratch
+    assert collection.hnsw is not None and collection.hnsw.rows == 14
+    assert len(collection.hnsw) == 14
+    hits = reopened.search(collection_name=COLLECTION, query_vector=_vector(500), limit=1)
+    assert hits[0].id == _point_id("doc1_chunk_1")
+    hits = reopened.search(collection_name=COLLECTION, query_vector=_vector(203), limit=1)
+    assert hits[0].id == _point_id("doc2_chunk_3")
+    reopened.close()
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from llm_providers import hedging
+from llm_providers.gemini_provider import GeminiProvider
+from llm_providers.hedging import HedgedRouter
+from llm_providers.rate_limit import ProviderScheduler, RateLimitExceeded, Schedulers
+from services import response_generator
+from services.completion_cache import completion_key
+
+
+class _FakeLLM:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    async def generate_response(self, prompt: str, stream: bool = False):
+        return f"answer from {self.model_name}"
+
+    async def generate_response_stream(self, prompt: str):
+        yield f"answer from {self.model_name}"
+
+
+class _FakeRegistry:
+    def __init__(self, **llms):
+        self.llms = llms
+
+    def get(self, provider: str, model_name=None):
+        return self.llms[provider]
+
+
+class _DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, key, route):
+        return self.entries.get(key)
+
+    async def put(self, key, completion):
+        self.entries[key] = completion
+
+    def record_bypass(self, route):
+        pass
+
+
+class _FailingModel:
+    def generate_content(self, prompt: str):
+        raise RuntimeError("quota exhausted")
+
+
+async def _waiting(scheduler: ProviderScheduler, count: int) -> None:
+    while scheduler.waiting < count:
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_refunds_its_reservation():
+    scheduler = ProviderScheduler("test", requests_per_minute=1, max_wait=120)
+    await scheduler.acquire()
+    waiter = asyncio.create_task(scheduler.acquire())
+    await _waiting(scheduler, 1)
+    assert scheduler.requests.level == pytest.approx(-1, abs=0.01)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.waiting == 0
+    assert scheduler.admitted == 1
+    # Only the sent request is still charged: the next caller waits one slot, not two
+    assert scheduler.reserve(deadline=120) == pytest.approx(60, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_refund_tokens_in_any_order():
+    scheduler = ProviderScheduler("test", tokens_per_minute=1000, max_wait=600)
+    await scheduler.acquire(tokens=1000)
+    waiters = [asyncio.create_task(scheduler.acquire(tokens=500)) for _ in range(3)]
+    await _waiting(scheduler, 3)
+
+    waiters[1].cancel()
+    waiters[0].cancel()
+    await asyncio.gather(*waiters[:2], return_exceptions=True)
+
+    assert scheduler.waiting == 1
+    assert scheduler.tokens.level == pytest.approx(-500, abs=1)
+    waiters[2].cancel()
+    await asyncio.gather(waiters[2], return_exceptions=True)
+    assert scheduler.waiting == 0
+    assert scheduler.tokens.level == pytest.approx(0, abs=1)
+
+
+def test_refund_never_exceeds_the_budget():
+    scheduler = ProviderScheduler("test", requests_per_minute=10, tokens_per_minute=100)
+    scheduler.reserve(tokens=10)
+    scheduler.refund(tokens=10)
+    scheduler.refund(tokens=10)
+    assert scheduler.requests.level == 10
+    assert scheduler.tokens.level == 100
+
+
+@pytest.mark.asyncio
+async def test_failover_completion_is_cached_under_the_secondary(monkeypatch):
+    registry = _FakeRegistry(primary=_FakeLLM("primary-model"), secondary=_FakeLLM("secondary-model"))
+    scheduler_set = Schedulers()
+    scheduler_set._schedulers["primary"] = ProviderScheduler("primary", requests_per_minute=1, max_wait=0)
+    scheduler_set.get("primary").reserve()
+    cache = _DictCache()
+    monkeypatch.setattr(hedging, "registry", registry)
+    monkeypatch.setattr(hedging, "schedulers", scheduler_set)
+    monkeypatch.setattr(response_generator, "registry", registry)
+    monkeypatch.setattr(response_generator, "hedged_router", HedgedRouter(routes={"primary": ("secondary", None)}))
+    monkeypatch.setattr(response_generator, "completion_cache", cache)
+    monkeypatch.setattr(response_generator, "COMPLETION_CACHE_ENABLED", True)
+
+    response = await response_generator.generate_response("prompt", "primary", deadline=0)
+
+    assert response == "answer from secondary-model"
+    assert list(cache.entries) == [completion_key("secondary", "secondary-model", "prompt", params={})]
+
+
+@pytest.mark.asyncio
+async def test_provider_error_is_raised_and_not_cached(monkeypatch):
+    gemini = GeminiProvider.__new__(GeminiProvider)
+    gemini.model, gemini.model_name = _FailingModel(), "gemini-test"
+    registry = _FakeRegistry(gemini=gemini)
+    cache = _DictCache()
+    monkeypatch.setattr(hedging, "schedulers", Schedulers())
+    monkeypatch.setattr(response_generator, "registry", registry)
+    monkeypatch.setattr(response_generator, "hedged_router", HedgedRouter(routes={}))
+    monkeypatch.setattr(response_generator, "completion_cache", cache)
+    monkeypatch.setattr(response_generator, "COMPLETION_CACHE_ENABLED", True)
+
+    with pytest.raises(RuntimeError, match="quota exhausted"):
+        await response_generator.generate_response("prompt", "gemini")
+    assert cache.entries == {}
+
+
+@pytest.mark.asyncio
+async def test_acquire_past_the_deadline_raises():
+    scheduler = ProviderScheduler("test", requests_per_minute=1, max_wait=0)
+    scheduler.reserve()
+    with pytest.raises(RateLimitExceeded):
+        await scheduler.acquire()
@@ -0,0 +1,96 @@
+import threading
+import time
+import uuid
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from services import embedding
+from services.reindex import ReindexMigration
+
+SERVING = "docs"
+
+
+class _FakeEmbedder:
+    def embed_documents(self, documents):
+        return [[1.0, 0.0, 0.0, 0.5] for _ in documents]
+
+
+@pytest.fixture(autouse=True)
+def _restore_serving_model(monkeypatch):
+    monkeypatch.setattr(embedding, "_serving_model", None)
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(location=":memory:")
+    client.create_collection(SERVING, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert(SERVING, points=[
+        PointStruct(id=str(uuid.uuid4()), vector=[1.0, 0.0], payload={"page_content": f"chunk {i}", "id": "doc"})
+        for i in range(5)
+    ])
+    return client
+
+
+def _migration(client, tmp_path) -> ReindexMigration:
+    return ReindexMigration(
+        client, SERVING, "old-model", target_model="new-model", target_dim=4, embed_rate=0,
+        embedding_service=_FakeEmbedder(), lock_dir=str(tmp_path), poll_seconds=0.01,
+    )
+
+
+def _state(client):
+    aliases = {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+    return sorted(c.name for c in client.get_collections().collections), aliases
+
+
+def test_migration_cuts_over_to_the_shadow(client, tmp_path):
+    migration = _migration(client, tmp_path)
+    migration.run()
+
+    assert migration.status["state"] == "swapped"
+    assert _state(client) == (["docs__new_model_4"], {SERVING: "docs__new_model_4"})
+    assert client.count(SERVING).count == 5
+    assert embedding.serving_model() == "new-model"
+
+
+def test_second_migration_after_cut_over_keeps_the_serving_collection(client, tmp_path):
+    _migration(client, tmp_path).run()
+    second = _migration(client, tmp_path)
+    second.run()
+
+    assert second.status["state"] == "swapped"
+    assert _state(client) == (["docs__new_model_4"], {SERVING: "docs__new_model_4"})
+    assert client.count(SERVING).count == 5
+
+
+def test_swap_never_drops_the_collection_it_serves(client, tmp_path):
+    _migration(client, tmp_path).run()
+    _migration(client, tmp_path)._swap()
+
+    assert _state(client) == (["docs__new_model_4"], {SERVING: "docs__new_model_4"})
+
+
+def test_follower_waits_for_the_lock_holder_and_adopts_the_new_model(client, tmp_path):
+    leader, follower = _migration(client, tmp_path), _migration(client, tmp_path)
+    assert leader._lock.acquire(blocking=False)
+    thread = threading.Thread(target=follower.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while follower.status["state"] != "following" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert follower.status["state"] == "following"
+        embedding.set_serving_model("old-model")
+
+        leader.run()
+        thread.join(timeout=5)
+    finally:
+        leader._lock.release()
+        thread.join(timeout=5)
+
+    assert follower.status["state"] == "swapped"
+    assert follower.status["passes"] == 0
+    assert embedding.serving_model() == "new-model"
+    assert _state(client) == (["docs__new_model_4"], {SERVING: "docs__new_model_4"})
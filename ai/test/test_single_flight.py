@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+class _Upstream:
+    """Factory for fake LLM streams that yield `chunks`, pausing on `gate` after the first."""
+
+    def __init__(self, chunks=("a", "b", "c")):
+        self.chunks = chunks
+        self.calls = 0
+        self.cancelled = 0
+        self.gate = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        return self._stream()
+
+    async def _stream(self):
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == 1:
+                    await self.gate.wait()
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+async def _collect(stream) -> str:
+    return "".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_generation():
+    flights = SingleFlight()
+    upstream = _Upstream()
+    first = await flights.stream("key", upstream)
+    second = await flights.stream("key", upstream)
+    upstream.gate.set()
+
+    assert await asyncio.gather(_collect(first), _collect(second)) == ["abc", "abc"]
+    assert upstream.calls == 1
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 1}
+
+
+@pytest.mark.asyncio
+async def test_newcomer_after_last_subscriber_cancels_gets_a_fresh_flight():
+    flights = SingleFlight()
+    upstream = _Upstream()
+    stream = await flights.stream("key", upstream)
+    iterator = stream.__aiter__()
+    assert await iterator.__anext__() == "a"
+
+    # The last subscriber leaves mid-stream; the newcomer arrives before the cancel lands
+    await iterator.aclose()
+    newcomer = await flights.stream("key", upstream)
+    upstream.gate.set()
+
+    assert await _collect(newcomer) == "abc"
+    assert upstream.calls == 2
+    assert upstream.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_finished_flight_still_registered_is_not_joined():
+    flights = SingleFlight()
+    upstream = _Upstream()
+    stream = await flights.stream("key", upstream)
+    flight = flights._flights["key"]
+    upstream.gate.set()
+    assert await _collect(stream) == "abc"
+    # Simulate the window between the producer finishing and unregistering
+    flight.chunks = ["stale"]
+    flights._flights["key"] = flight
+
+    assert await _collect(await flights.stream("key", upstream)) == "abc"
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_factory_error_reaches_every_waiter():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        flights.stream("key", failing), flights.stream("key", failing), return_exceptions=True
+    )
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    assert flights.stats()["in_flight"] == 0
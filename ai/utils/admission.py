@@ -0,0 +1,196 @@
+"""
+Admission control for expensive routes.
+
+Each route class gets a gate with a concurrency limit and a bounded FIFO
+queue. A request that finds the queue full is shed at once with 429; one
+that waits longer than the queue deadline is shed with 503. Both carry a
+Retry-After estimated from recent service times, so overload fails fast and
+predictably instead of slowing every request down.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from config.constants import ADMISSION_LIMITS
+from utils.logger import logger
+from utils.tracing import mark
+from utils.metrics import Counter, Gauge, Histogram
+from utils.response_formatter import format_rate_limited_response
+
+ADMISSION_IN_FLIGHT = Gauge("obot_admission_in_flight", "Requests admitted and running.", ("route",))
+ADMISSION_QUEUE_DEPTH = Gauge("obot_admission_queue_depth", "Requests waiting for admission.", ("route",))
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "obot_admission_queue_seconds", "Time admitted requests spent queued.", ("route",)
+)
+ADMISSION_SHED = Counter("obot_admission_shed_total", "Requests rejected by admission control.", ("route", "reason"))
+
+# (method, path) -> route class limited by ADMISSION_LIMITS
+ADMISSION_ROUTES: Dict[Tuple[str, str], str] = {
+    ("POST", "/api/chat"): "chat",
+    ("POST", "/api/chat/llm"): "chat",
+    ("POST", "/api/chat/batch"): "batch",
+    ("POST", "/api/embedd/local"): "ingest",
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, route: str, status_code: int, retry_after: float, reason: str):
+        super().__init__(f"Server busy ({route} {reason.replace('_', ' ')}); retry in {retry_after:.0f}s")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded, deadline-aware FIFO queue.
+
+    Slots are handed directly from a finishing request to the oldest waiter,
+    so queued requests are admitted in arrival order and never overtaken by
+    newcomers.
+    """
+
+    def __init__(self, route: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.route = route
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+        # Smoothed time a request holds its slot, for Retry-After hints
+        self.service_time = 1.0
+        self._waiters: deque = deque()
+        self._in_flight = ADMISSION_IN_FLIGHT.labels(route)
+        self._depth = ADMISSION_QUEUE_DEPTH.labels(route)
+        self._queued = ADMISSION_QUEUE_SECONDS.labels(route)
+        self._shed = {reason: ADMISSION_SHED.labels(route, reason) for reason in self.shed}
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            AdmissionRejected: 429 if the queue is full, 503 if the queue deadline passed
+        """
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._depth.set(len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            raise self._reject("queue_timeout", 503)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as the client went away
+                self.release(0.0)
+            else:
+                self._forget(waiter)
+            raise
+        self._admit(time.monotonic() - started)
+
+    def release(self, held: float) -> None:
+        """Free a slot, handing it to the oldest live waiter if there is one."""
+        if held > 0:
+            self.service_time = 0.8 * self.service_time + 0.2 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._depth.set(len(self._waiters))
+                return
+        self._depth.set(0)
+        self.in_flight -= 1
+        self._in_flight.set(self.in_flight)
+
+    def retry_after(self) -> float:
+        """Rough seconds until the current queue drains."""
+        return max(1.0, math.ceil(self.service_time * (len(self._waiters) + 1) / self.max_concurrent))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "service_time": self.service_time,
+        }
+
+    def _admit(self, queued: float) -> None:
+        self.admitted += 1
+        self._in_flight.set(self.in_flight)
+        self._queued.observe(queued)
+        if queued > 0:
+            mark("queue", queued)
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._depth.set(len(self._waiters))
+
+    def _reject(self, reason: str, status_code: int) -> AdmissionRejected:
+        self.shed[reason] += 1
+        self._shed[reason].inc()
+        retry_after = self.retry_after()
+        logger.warning(f"🚧 Shedding {self.route} request ({reason}, {self.in_flight} in flight, {len(self._waiters)} queued)")
+        return AdmissionRejected(self.route, status_code, retry_after, reason)
+
+
+class AdmissionController:
+    """Gates for every limited route class, configured from ADMISSION_LIMITS."""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int, float]]] = None):
+        limits = ADMISSION_LIMITS if limits is None else limits
+        self.gates = {route: AdmissionGate(route, *limit) for route, limit in limits.items()}
+
+    def gate_for(self, method: str, path: str) -> Optional[AdmissionGate]:
+        route = ADMISSION_ROUTES.get((method, path.rstrip("/") or "/"))
+        return self.gates.get(route) if route else None
+
+    def stats(self) -> Dict[str, object]:
+        return {route: gate.stats() for route, gate in self.gates.items()}
+
+
+# Process-wide gates shared by the middleware and the debug endpoint
+admission = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware holding a gate slot for the whole response, streaming included."""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        gate = self.controller.gate_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await gate.acquire()
+        except AdmissionRejected as e:
+            response = format_rate_limited_response(str(e), e.retry_after, status_code=e.status_code)
+            await response(scope, receive, send)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.monotonic() - started)
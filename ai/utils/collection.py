@@ -1,9 +1,10 @@
-from utils.qdrant_db import client
+from utils.qdrant_db import get_client
 from qdrant_client.models import VectorParams, Distance
 
 
 def ensure_qdrant_collection_exists(collection_name: str, embedding_dim: int = 768):
     """Ensure a Qdrant collection exists, and create it if not."""
+    client = get_client()
     collections = client.get_collections().collections
     if not any(c.name == collection_name for c in collections):
         client.create_collection(
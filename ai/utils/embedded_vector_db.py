@@ -0,0 +1,813 @@
+import heapq
+import json
+import math
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.models import (
+    CollectionDescription,
+    CollectionsResponse,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    PointIdsList,
+    Record,
+    ScoredPoint,
+    UpdateResult,
+    UpdateStatus,
+)
+
+from config.constants import (
+    APP_WORKERS,
+    EMBEDDED_VECTOR_PATH,
+    EMBEDDED_VECTOR_SEARCH,
+    EMBEDDING_DIM,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    HNSW_MIN_POINTS,
+    QDRANT_COLLECTION_NAME,
+)
+from utils.file_lock import FileLock
+from utils.logger import logger
+
+# Payload fields that get an inverted index for fast filtering
+INDEXED_FIELDS = ("id", "organization_id")
+
+# Below this fraction of matching points a filtered search skips the graph
+# and scores the candidates exactly (mirrors Qdrant's query planner)
+_FILTERED_EXACT_RATIO = 0.1
+
+_INITIAL_CAPACITY = 1024
+
+# Rows added to the HNSW graph per hold of the graph lock
+_HNSW_BATCH = 64
+# Rows added since the last save before the graph is written to disk again
+_HNSW_SAVE_EVERY = 2000
+
+
+class _HNSWIndex:
+    """Minimal Hierarchical Navigable Small World graph over cosine similarity.
+
+    Rows are added in order, so the graph always covers rows [0, rows);
+    deleted or overwritten rows stay in the graph for navigation and are
+    filtered out of results by the caller.
+    """
+
+    def __init__(self, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, seed: int = 42):
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(max(m, 2))
+        self.layers: List[Dict[int, List[int]]] = []
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+        self.rows = 0
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.layers[0]) if self.layers else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "entry_point": self.entry_point,
+            "max_level": self.max_level,
+            "layers": [{str(row): links for row, links in layer.items()} for layer in self.layers],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], mapping: Dict[int, int]) -> "_HNSWIndex":
+        """Rebuild a saved graph, renumbering rows through `mapping` and dropping unmapped ones.
+
+        `mapping` must preserve row order, so the covered rows stay a prefix.
+        """
+        index = cls()
+        for saved in data["layers"]:
+            layer = {}
+            for row, links in saved.items():
+                new_row = mapping.get(int(row))
+                if new_row is not None:
+                    layer[new_row] = [mapping[n] for n in links if n in mapping]
+            index.layers.append(layer)
+        while index.layers and not index.layers[-1]:
+            index.layers.pop()
+        if index.layers:
+            index.max_level = len(index.layers) - 1
+            entry_point = mapping.get(data["entry_point"])
+            index.entry_point = entry_point if entry_point in index.layers[-1] else next(iter(index.layers[-1]))
+        index.rows = sum(1 for old_row in mapping if old_row < data["rows"])
+        return index
+
+    def add(self, row: int, vectors: np.ndarray) -> None:
+        self.rows = max(self.rows, row + 1)
+        query = vectors[row]
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        while len(self.layers) <= level:
+            self.layers.append({})
+
+        if self.entry_point is None:
+            for lc in range(level + 1):
+                self.layers[lc][row] = []
+            self.entry_point, self.max_level = row, level
+            return
+
+        entry = [self.entry_point]
+        for lc in range(self.max_level, level, -1):
+            entry = [row_ for _, row_ in self._search_layer(query, entry, 1, lc, vectors)]
+
+        for lc in range(min(level, self.max_level), -1, -1):
+            candidates = self._search_layer(query, entry, self.ef_construction, lc, vectors)
+            max_links = self.m0 if lc == 0 else self.m
+            neighbors = [row_ for _, row_ in candidates[:self.m]]
+            self.layers[lc][row] = neighbors
+            for neighbor in neighbors:
+                links = self.layers[lc].setdefault(neighbor, [])
+                links.append(row)
+                if len(links) > max_links:
+                    sims = vectors[links] @ vectors[neighbor]
+                    keep = np.argsort(-sims)[:max_links]
+                    self.layers[lc][neighbor] = [links[i] for i in keep]
+            entry = [row_ for _, row_ in candidates]
+
+        for lc in range(level + 1):
+            self.layers[lc].setdefault(row, [])
+        if level > self.max_level:
+            self.entry_point, self.max_level = row, level
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        ef: int,
+        vectors: np.ndarray,
+        accept: Callable[[int], bool],
+    ) -> List[Tuple[float, int]]:
+        if self.entry_point is None:
+            return []
+        entry = [self.entry_point]
+        for lc in range(self.max_level, 0, -1):
+            entry = [row for _, row in self._search_layer(query, entry, 1, lc, vectors)]
+        found = self._search_layer(query, entry, max(ef, k), 0, vectors)
+        return [(sim, row) for sim, row in found if accept(row)][:k]
+
+    def _search_layer(self, query, entry, ef, lc, vectors) -> List[Tuple[float, int]]:
+        """Greedy best-first search on one layer; returns (sim, row) best first."""
+        layer = self.layers[lc]
+        visited = set(entry)
+        entry_sims = vectors[entry] @ query
+        candidates = [(-float(s), r) for s, r in zip(entry_sims, entry)]
+        heapq.heapify(candidates)
+        results = [(float(s), r) for s, r in zip(entry_sims, entry)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, row = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+            fresh = [n for n in layer.get(row, ()) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            sims = vectors[fresh] @ query
+            for sim, neighbor in zip(sims.tolist(), fresh):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+
+class _EmbeddedCollection:
+    """A single collection: float32 vector matrix, payloads and indexes.
+
+    With a storage directory the matrix is a `np.memmap` that grows by
+    doubling, and every upsert/delete is appended to a JSON-lines log that is
+    replayed (and compacted) on open. The log's header line names the matrix
+    file its rows refer to, so compaction commits with a single log replace.
+    The HNSW graph is extended by a background thread as rows arrive and is
+    saved next to the matrix it indexes; searches score rows the graph does
+    not cover yet exactly, so neither writes nor searches wait on a build.
+    The directory is locked for as long as the collection is open: another
+    process opening it would compact away the files this one is writing.
+    """
+
+    def __init__(self, name: str, dim: int, path: Optional[str] = None, search_mode: str = EMBEDDED_VECTOR_SEARCH):
+        self.name = name
+        self.dim = dim
+        self.path = path
+        self.search_mode = search_mode
+        self.lock = threading.RLock()
+        self.ids: List[Optional[str]] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.row_by_id: Dict[str, int] = {}
+        self.field_index: Dict[str, Dict[Any, set]] = {f: {} for f in INDEXED_FIELDS}
+        self.capacity = 0
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.hnsw: Optional[_HNSWIndex] = None
+        # Held while the graph is walked or extended; searches never wait for it
+        self._graph_lock = threading.Lock()
+        self._indexer: Optional[threading.Thread] = None
+        self._unsaved_rows = 0
+        self._closing = False
+        self._log = None
+        self._vectors_file: Optional[str] = None
+        self._file_lock: Optional[FileLock] = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._file_lock = FileLock(os.path.join(path, ".lock"))
+            if not self._file_lock.acquire(blocking=False):
+                raise RuntimeError(
+                    f"Embedded collection '{name}' at {path} is open in another process; "
+                    f"the embedded backend supports a single worker per EMBEDDED_VECTOR_PATH"
+                )
+            try:
+                self._load()
+            except BaseException:
+                self._file_lock.release()
+                raise
+        else:
+            self._ensure_capacity(_INITIAL_CAPACITY)
+
+    # --- Writes ---
+    def upsert(self, points: Sequence[Any]) -> None:
+        with self.lock:
+            entries = []
+            for point in points:
+                point_id, payload = str(point.id), dict(point.payload or {})
+                row = self._apply_upsert(point_id, np.asarray(point.vector, dtype=np.float32), payload)
+                entries.append({"op": "upsert", "id": point_id, "row": row, "payload": payload})
+            if self.path:
+                # Vectors first, so a logged row never points at an unwritten vector
+                self.vectors.flush()
+                for entry in entries:
+                    self._log.write(json.dumps(entry, default=str) + "\n")
+                self._log.flush()
+            self._schedule_index()
+
+    def delete_ids(self, ids: Sequence[Any]) -> None:
+        with self.lock:
+            for point_id in ids:
+                self._apply_delete(str(point_id), log=True)
+            if self._log:
+                self._log.flush()
+
+    def delete_filter(self, query_filter: Filter) -> None:
+        with self.lock:
+            rows = np.nonzero(self._filter_mask(query_filter))[0]
+            self.delete_ids([self.ids[r] for r in rows])
+
+    # --- Reads ---
+    def retrieve(self, ids: Sequence[Any], with_payload: bool, with_vectors: bool) -> List[Record]:
+        with self.lock:
+            records = []
+            for point_id in ids:
+                row = self.row_by_id.get(str(point_id))
+                if row is not None:
+                    records.append(self._record(row, with_payload, with_vectors))
+            return records
+
+    def scroll(self, query_filter, limit, offset, with_payload, with_vectors) -> Tuple[List[Record], Optional[str]]:
+        with self.lock:
+            rows = np.nonzero(self._filter_mask(query_filter))[0]
+            ordered = sorted(rows.tolist(), key=lambda r: self.ids[r])
+            if offset is not None:
+                ordered = [r for r in ordered if self.ids[r] >= str(offset)]
+            page = ordered[:limit]
+            next_offset = self.ids[ordered[limit]] if len(ordered) > limit else None
+            return [self._record(r, with_payload, with_vectors) for r in page], next_offset
+
+    def count(self, query_filter: Optional[Filter] = None) -> int:
+        with self.lock:
+            return int(self._filter_mask(query_filter).sum())
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        query_filter: Optional[Filter],
+        limit: int,
+        score_threshold: Optional[float],
+        with_payload: bool,
+        with_vectors: bool,
+        exact: bool = False,
+    ) -> List[ScoredPoint]:
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        with self.lock:
+            size = len(self.ids)
+            if size == 0:
+                return []
+            mask = self._filter_mask(query_filter)
+            n_matching = int(mask.sum())
+            if n_matching == 0:
+                return []
+            use_graph = (
+                not exact
+                and self.search_mode != "exact"
+                and (self.search_mode == "hnsw" or size >= HNSW_MIN_POINTS)
+                and n_matching >= _FILTERED_EXACT_RATIO * size
+            )
+            if use_graph:
+                found = self._search_hnsw(query, mask, limit)
+            else:
+                found = self._search_exact(query, mask, limit)
+            hits = []
+            for sim, row in found:
+                if score_threshold is not None and sim < score_threshold:
+                    continue
+                hits.append(ScoredPoint(
+                    id=self.ids[row],
+                    version=0,
+                    score=float(sim),
+                    payload=dict(self.payloads[row]) if with_payload else None,
+                    vector=self.vectors[row].tolist() if with_vectors else None,
+                ))
+            return hits
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the background indexer is idle; True if it finished in time."""
+        indexer = self._indexer
+        if indexer is not None:
+            indexer.join(timeout)
+            return not indexer.is_alive()
+        return True
+
+    def close(self) -> None:
+        self._closing = True
+        self.wait_for_index()
+        self._save_index()
+        with self.lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            if self.path and isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+            if self._file_lock is not None:
+                self._file_lock.release()
+
+    # --- Internal helpers ---
+    def _search_exact(self, query: np.ndarray, mask: np.ndarray, limit: int) -> List[Tuple[float, int]]:
+        rows = np.nonzero(mask)[0]
+        sims = self.vectors[rows] @ query
+        if len(rows) > limit:
+            top = np.argpartition(-sims, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-sims[top])]
+        return [(float(sims[i]), int(rows[i])) for i in top]
+
+    def _search_hnsw(self, query: np.ndarray, mask: np.ndarray, limit: int) -> List[Tuple[float, int]]:
+        if self.hnsw is None or not self._graph_lock.acquire(blocking=False):
+            # Graph missing or being extended right now: exact search keeps serving meanwhile
+            self._schedule_index()
+            return self._search_exact(query, mask, limit)
+        try:
+            covered = self.hnsw.rows
+            ef = max(HNSW_EF_SEARCH, limit)
+            accept = mask.__getitem__
+            found = self.hnsw.search(query, limit, ef, self.vectors, accept)
+            # Filters can starve the graph walk; widen the beam, then fall back to exact
+            while len(found) < limit and ef < 8 * max(HNSW_EF_SEARCH, limit):
+                ef *= 2
+                found = self.hnsw.search(query, limit, ef, self.vectors, accept)
+        finally:
+            self._graph_lock.release()
+        if covered < len(mask):
+            # Rows the indexer has not reached yet are scored exactly and merged in
+            tail = mask.copy()
+            tail[:covered] = False
+            if tail.any():
+                found = sorted(found + self._search_exact(query, tail, limit), reverse=True)[:limit]
+            self._schedule_index()
+        if len(found) < min(limit, int(mask.sum())):
+            return self._search_exact(query, mask, limit)
+        return found
+
+    def _wants_index(self) -> bool:
+        if self.search_mode == "exact":
+            return False
+        return self.search_mode == "hnsw" or len(self.ids) >= HNSW_MIN_POINTS
+
+    def _schedule_index(self) -> None:
+        """Start the background indexer if the graph is behind. Call with `self.lock` held."""
+        if self._closing or self._indexer is not None or not self._wants_index():
+            return
+        if self.hnsw is not None and self.hnsw.rows >= len(self.ids):
+            return
+        self._indexer = threading.Thread(target=self._extend_index, name=f"hnsw-{self.name}", daemon=True)
+        self._indexer.start()
+
+    def _extend_index(self) -> None:
+        started = self.hnsw.rows if self.hnsw is not None else 0
+        try:
+            while not self._closing:
+                with self.lock:
+                    size, vectors = len(self.ids), self.vectors
+                    if self.hnsw is not None and self.hnsw.rows >= size:
+                        break
+                # Rows below `size` never move, so the graph can grow without the collection lock
+                with self._graph_lock:
+                    if self.hnsw is None:
+                        self.hnsw = _HNSWIndex()
+                    end = min(size, self.hnsw.rows + _HNSW_BATCH)
+                    for row in range(self.hnsw.rows, end):
+                        self.hnsw.add(row, vectors)
+                    self._unsaved_rows += end - started
+                    started = end
+        except Exception:
+            logger.exception(f"[Embedded] Extending the HNSW graph for '{self.name}' failed; using exact search")
+        finally:
+            with self.lock:
+                self._indexer = None
+        if self.hnsw is not None and self._unsaved_rows >= _HNSW_SAVE_EVERY:
+            logger.info(f"[Embedded] HNSW graph for '{self.name}' covers {self.hnsw.rows} rows")
+            self._save_index()
+        if not self._closing:
+            with self.lock:
+                # Rows that arrived after the last check
+                self._schedule_index()
+
+    def _save_index(self) -> None:
+        if not self.path or self.hnsw is None or not self._unsaved_rows:
+            return
+        with self._graph_lock:
+            data = {"vectors": os.path.basename(self._vectors_file), **self.hnsw.to_dict()}
+            self._unsaved_rows = 0
+        index_file = os.path.join(self.path, "hnsw.json")
+        try:
+            with open(index_file + ".tmp", "w") as f:
+                json.dump(data, f)
+            os.replace(index_file + ".tmp", index_file)
+        except OSError as e:
+            logger.warning(f"[Embedded] Could not save the HNSW graph for '{self.name}': {e}")
+
+    def _load_index(self, vectors_name: str, mapping: Dict[int, int]) -> None:
+        """Restore the graph saved for `vectors_name`, renumbered to the compacted rows."""
+        index_file = os.path.join(self.path, "hnsw.json")
+        if not mapping or self.search_mode == "exact" or not os.path.exists(index_file):
+            return
+        try:
+            with open(index_file) as f:
+                data = json.load(f)
+            if data.get("vectors") != vectors_name:
+                return  # Built on another matrix generation; rows don't line up
+            self.hnsw = _HNSWIndex.from_dict(data, mapping)
+        except (OSError, ValueError, KeyError, TypeError, StopIteration) as e:
+            logger.warning(f"[Embedded] Ignoring unreadable HNSW graph for '{self.name}': {e}")
+            return
+        # Saved again under the new matrix name once the log is committed
+        self._unsaved_rows = len(self.hnsw)
+
+    def _filter_mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        size = len(self.ids)
+        mask = self.alive[:size].copy()
+        if query_filter is None:
+            return mask
+        for condition in query_filter.must or []:
+            mask &= self._condition_mask(condition, size)
+        if query_filter.should:
+            any_mask = np.zeros(size, dtype=bool)
+            for condition in query_filter.should:
+                any_mask |= self._condition_mask(condition, size)
+            mask &= any_mask
+        for condition in query_filter.must_not or []:
+            mask &= ~self._condition_mask(condition, size)
+        return mask
+
+    def _condition_mask(self, condition: Any, size: int) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self._filter_mask(condition)
+        if not isinstance(condition, FieldCondition):
+            raise NotImplementedError(f"Unsupported filter condition: {type(condition).__name__}")
+        if isinstance(condition.match, MatchValue):
+            values = [condition.match.value]
+        elif isinstance(condition.match, MatchAny):
+            values = list(condition.match.any)
+        else:
+            raise NotImplementedError(f"Unsupported match type: {type(condition.match).__name__}")
+
+        mask = np.zeros(size, dtype=bool)
+        index = self.field_index.get(condition.key)
+        if index is not None:
+            for value in values:
+                rows = index.get(value)
+                if rows:
+                    mask[list(rows)] = True
+            return mask
+        wanted = set(values)
+        for row, payload in enumerate(self.payloads):
+            if payload is not None and payload.get(condition.key) in wanted:
+                mask[row] = True
+        return mask
+
+    def _record(self, row: int, with_payload: bool, with_vectors: bool) -> Record:
+        return Record(
+            id=self.ids[row],
+            payload=dict(self.payloads[row]) if with_payload else None,
+            vector=self.vectors[row].tolist() if with_vectors else None,
+        )
+
+    def _normalize(self, vector: np.ndarray) -> np.ndarray:
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Vector dimension error: expected dim: {self.dim}, got {vector.shape[-1]}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _apply_upsert(self, point_id: str, vector: np.ndarray, payload: Dict[str, Any]) -> int:
+        vector = self._normalize(vector)
+        # Overwrites append a fresh row so the HNSW graph never points at a moved vector
+        self._apply_delete(point_id, log=False)
+        row = len(self.ids)
+        self._ensure_capacity(row + 1)
+        self.vectors[row] = vector
+        self.alive[row] = True
+        self.ids.append(point_id)
+        self.payloads.append(payload)
+        self.row_by_id[point_id] = row
+        for field, index in self.field_index.items():
+            value = payload.get(field)
+            if value is not None and not isinstance(value, (list, dict)):
+                index.setdefault(value, set()).add(row)
+        return row
+
+    def _apply_delete(self, point_id: str, log: bool) -> None:
+        row = self.row_by_id.pop(point_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        payload = self.payloads[row] or {}
+        for field, index in self.field_index.items():
+            rows = index.get(payload.get(field))
+            if rows is not None:
+                rows.discard(row)
+        if log and self._log:
+            self._log.write(json.dumps({"op": "delete", "id": point_id}) + "\n")
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        capacity = max(_INITIAL_CAPACITY, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        if self.path:
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+                del self.vectors
+            with open(self._vectors_file, "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+            self.vectors = np.memmap(self._vectors_file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        else:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            vectors[:len(self.vectors)] = self.vectors
+            self.vectors = vectors
+        self.capacity = capacity
+
+    def _load(self) -> None:
+        """Replay the point log into a freshly compacted matrix, then commit it by replacing the log.
+
+        Until the new log is in place the previous log and matrix stay
+        untouched, so a crash at any point reopens one consistent pair.
+        """
+        meta_file = os.path.join(self.path, "collection.json")
+        log_file = os.path.join(self.path, "points.jsonl")
+        if os.path.exists(meta_file):
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                raise ValueError(f"Embedded collection '{self.name}' has dim={meta.get('dim')}, expected {self.dim}")
+        else:
+            with open(meta_file, "w") as f:
+                json.dump({"name": self.name, "dim": self.dim, "distance": "Cosine"}, f)
+
+        # Logs written before the header existed refer to vectors.f32
+        header = {"generation": 0, "vectors": "vectors.f32"}
+        live: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        if os.path.exists(log_file):
+            with open(log_file) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write; everything before it is intact
+                        break
+                    if entry["op"] == "header":
+                        header = entry
+                    elif entry["op"] == "upsert":
+                        live[entry["id"]] = (entry["row"], entry["payload"])
+                    else:
+                        live.pop(entry["id"], None)
+
+        old_vectors = None
+        old_file = os.path.join(self.path, header["vectors"])
+        if live:
+            if os.path.exists(old_file):
+                rows = os.path.getsize(old_file) // (self.dim * 4)
+                old_vectors = np.array(np.memmap(old_file, dtype=np.float32, mode="r", shape=(rows, self.dim)))
+            else:
+                logger.warning(f"[Embedded] '{self.name}': {header['vectors']} is missing; its points cannot be restored")
+
+        # Build the compacted matrix under a new name; the current one stays valid until the log says otherwise
+        generation = header["generation"] + 1
+        vectors_name = f"vectors.{generation}.f32"
+        self._vectors_file = os.path.join(self.path, vectors_name)
+        if os.path.exists(self._vectors_file):
+            os.remove(self._vectors_file)  # left over from a compaction that never committed
+        self._ensure_capacity(max(_INITIAL_CAPACITY, len(live)))
+        skipped = 0
+        mapping: Dict[int, int] = {}
+        # In old-row order, so a saved graph's covered rows stay a prefix after renumbering
+        for point_id, (row, payload) in sorted(live.items(), key=lambda item: item[1][0]):
+            if old_vectors is None or row >= len(old_vectors):
+                skipped += 1
+                continue
+            mapping[row] = self._apply_upsert(point_id, old_vectors[row], payload)
+        if skipped:
+            logger.warning(f"[Embedded] '{self.name}': skipped {skipped} points whose vectors were not on disk")
+        self.vectors.flush()
+
+        tmp_log = log_file + ".tmp"
+        with open(tmp_log, "w") as f:
+            f.write(json.dumps({"op": "header", "generation": generation, "vectors": vectors_name}) + "\n")
+            for row, point_id in enumerate(self.ids):
+                f.write(json.dumps({"op": "upsert", "id": point_id, "row": row, "payload": self.payloads[row]}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_log, log_file)
+        # Committed: older matrices are no longer referenced
+        for name in os.listdir(self.path):
+            if name.startswith("vectors.") and name.endswith(".f32") and name != vectors_name:
+                os.remove(os.path.join(self.path, name))
+        self._log = open(log_file, "a")
+        self._load_index(header["vectors"], mapping)
+        self._save_index()
+        self._schedule_index()
+        logger.info(f"[Embedded] Loaded collection '{self.name}' with {len(self.ids)} points from {self.path}")
+
+
+class EmbeddedVectorClient:
+    """In-process vector store exposing the subset of `QdrantClient` used by `StoreService`.
+
+    Accepts and returns the same `qdrant_client.models` types, so services and
+    routes work unchanged against either backend.
+    """
+
+    def __init__(self, path: Optional[str] = EMBEDDED_VECTOR_PATH, search_mode: str = EMBEDDED_VECTOR_SEARCH):
+        self.path = path or None
+        self.search_mode = search_mode
+        self._collections: Dict[str, _EmbeddedCollection] = {}
+        self._lock = threading.Lock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            try:
+                for name in sorted(os.listdir(self.path)):
+                    meta_file = os.path.join(self.path, name, "collection.json")
+                    if os.path.exists(meta_file):
+                        with open(meta_file) as f:
+                            meta = json.load(f)
+                        self._collections[name] = _EmbeddedCollection(
+                            name, meta["dim"], os.path.join(self.path, name), search_mode
+                        )
+            except BaseException:
+                # Don't keep locks on the collections that did open
+                self.close()
+                raise
+
+    # --- Collections ---
+    def get_collections(self) -> CollectionsResponse:
+        with self._lock:
+            return CollectionsResponse(collections=[CollectionDescription(name=n) for n in self._collections])
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def create_collection(self, collection_name: str, vectors_config: Any, **kwargs) -> bool:
+        with self._lock:
+            if collection_name in self._collections:
+                raise ValueError(f"Collection {collection_name} already exists")
+            path = os.path.join(self.path, collection_name) if self.path else None
+            self._collections[collection_name] = _EmbeddedCollection(
+                collection_name, vectors_config.size, path, self.search_mode
+            )
+            return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+        if collection is None:
+            return False
+        collection.close()
+        if collection.path:
+            for name in os.listdir(collection.path):
+                os.remove(os.path.join(collection.path, name))
+            os.rmdir(collection.path)
+        return True
+
+    # --- Points ---
+    def upsert(self, collection_name: str, points: Sequence[Any], wait: bool = True, **kwargs) -> UpdateResult:
+        self._get(collection_name).upsert(points)
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector: Any, wait: bool = True, **kwargs) -> UpdateResult:
+        collection = self._get(collection_name)
+        if isinstance(points_selector, FilterSelector):
+            collection.delete_filter(points_selector.filter)
+        elif isinstance(points_selector, Filter):
+            collection.delete_filter(points_selector)
+        elif isinstance(points_selector, PointIdsList):
+            collection.delete_ids(points_selector.points)
+        else:
+            collection.delete_ids(list(points_selector))
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def retrieve(self, collection_name: str, ids: Sequence[Any], with_payload: bool = True,
+                 with_vectors: bool = False, **kwargs) -> List[Record]:
+        return self._get(collection_name).retrieve(ids, with_payload, with_vectors)
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Filter] = None, limit: int = 10,
+               offset: Optional[Any] = None, with_payload: bool = True, with_vectors: bool = False,
+               **kwargs) -> Tuple[List[Record], Optional[str]]:
+        return self._get(collection_name).scroll(scroll_filter, limit, offset, with_payload, with_vectors)
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, **kwargs):
+        from qdrant_client.models import CountResult
+        return CountResult(count=self._get(collection_name).count(count_filter))
+
+    def search(self, collection_name: str, query_vector: Sequence[float], query_filter: Optional[Filter] = None,
+               search_params: Any = None, limit: int = 10, with_payload: bool = True,
+               with_vectors: bool = False, score_threshold: Optional[float] = None, **kwargs) -> List[ScoredPoint]:
+        exact = bool(getattr(search_params, "exact", False))
+        return self._get(collection_name).search(
+            query_vector, query_filter, limit, score_threshold, with_payload, with_vectors, exact=exact
+        )
+
+    def search_batch(self, collection_name: str, requests: Sequence[Any], **kwargs) -> List[List[ScoredPoint]]:
+        # Same contract as QdrantClient.search_batch: one result list per SearchRequest
+        collection = self._get(collection_name)
+        return [
+            collection.search(
+                request.vector,
+                request.filter,
+                request.limit,
+                request.score_threshold,
+                request.with_payload is not False,
+                bool(request.with_vector),
+                exact=bool(getattr(request.params, "exact", False)),
+            )
+            for request in requests
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+
+    def _get(self, collection_name: str) -> _EmbeddedCollection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+
+_embedded_client: Optional[EmbeddedVectorClient] = None
+_embedded_client_lock = threading.Lock()
+
+
+def get_embedded_client(collection_name: str = QDRANT_COLLECTION_NAME,
+                        embedding_dim: int = EMBEDDING_DIM) -> EmbeddedVectorClient:
+    """Return the process-wide embedded client, creating the collection if needed."""
+    global _embedded_client
+    with _embedded_client_lock:
+        if _embedded_client is None:
+            if EMBEDDED_VECTOR_PATH and APP_WORKERS > 1:
+                raise RuntimeError(
+                    f"VECTOR_BACKEND=embedded with EMBEDDED_VECTOR_PATH needs a single worker "
+                    f"(WEB_CONCURRENCY={APP_WORKERS}); use Qdrant for several workers"
+                )
+            _embedded_client = EmbeddedVectorClient()
+            logger.info(f"[Embedded] Vector store ready (path={_embedded_client.path or ':memory:'})")
+        if not _embedded_client.collection_exists(collection_name):
+            from qdrant_client.models import VectorParams, Distance
+            _embedded_client.create_collection(
+                collection_name, vectors_config=VectorParams(size=embedding_dim, distance=Distance.COSINE)
+            )
+        return _embedded_client
+
+
+def close_embedded_client() -> None:
+    """Flush and close the process-wide embedded client, if it was created."""
+    global _embedded_client
+    with _embedded_client_lock:
+        if _embedded_client is not None:
+            _embedded_client.close()
+            _embedded_client = None
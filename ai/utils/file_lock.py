@@ -0,0 +1,68 @@
+"""
+Advisory inter-process locks on a file, for state shared by several workers.
+
+Locks are `flock`-based, so they are released by the OS when the holder
+exits or crashes, and two handles on the same path conflict even within one
+process. They only coordinate processes that see the same filesystem.
+"""
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive (or shared) lock on `path`, created if missing."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True, shared: bool = False) -> bool:
+        """
+        Take the lock.
+
+        Args:
+            blocking: Wait for the lock instead of giving up at once
+            shared: Take a shared lock, compatible with other shared holders
+
+        Returns:
+            bool: True if the lock is now held
+        """
+        if self._fd is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -1,7 +1,29 @@
+"""
+Application logging.
+
+Records are handed to a `QueueHandler`, and a listener thread does the
+formatting and the file/console writes. Request handlers on the event loop
+therefore never block on disk I/O. Output is plain text or one JSON object
+per line (LOG_FORMAT). Chatty call sites below WARNING are rate-limited per
+call site (LOG_RATE_LIMIT/LOG_RATE_BURST). When a site is let through again,
+its record notes how many similar records were dropped.
+
+Prefer lazy arguments on hot paths, e.g. `logger.debug("Chunk %d stored", i)`.
+They are only formatted when the record is actually emitted.
+"""
+import atexit
+import json
 import logging
-import sys
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Tuple
+
+from config.constants import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_ENABLED, LOG_RATE_BURST, LOG_RATE_LIMIT
 
 # Compute project directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -10,31 +32,158 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 log_dir = os.path.join(project_root, 'logs')
 os.makedirs(log_dir, exist_ok=True)
 
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Listeners started by setup_logger, stopped (and drained) at exit
+_listeners: List[QueueListener] = []
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text layout, noting records dropped by the rate limiter."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        text = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site for records below WARNING.
+
+    Each site (logger, file, line) may emit `burst` records at once and
+    `rate` per second after that. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1, burst)
+        # site -> [tokens, last refill, suppressed since last emit]
+        self._buckets: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        # Shared by several handlers in unqueued mode: decide once per record
+        decided = record.__dict__.get("_rate_allowed")
+        if decided is not None:
+            return decided
+        record._rate_allowed = self._allow(record)
+        return record._rate_allowed
+
+    def _allow(self, record: logging.LogRecord) -> bool:
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                bucket = self._buckets[site] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """Resolves the message in the caller but leaves layout and exception text to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Args may be mutated after the call returns, so bind them now
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def make_formatter(fmt: str = LOG_FORMAT) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT)
+
+
 # Configure the logger
-def setup_logger(name, log_file, level=logging.INFO):
-    """Function to setup a logger with a file handler and console handler."""
+def setup_logger(
+    name, log_file, level=LOG_LEVEL, fmt=LOG_FORMAT, queued=LOG_QUEUE_ENABLED, rate_limit=LOG_RATE_LIMIT
+):
+    """
+    Set up a logger writing to a rotating file and stdout.
+
+    Args:
+        name: Logger name
+        log_file: Path of the rotating log file
+        level: Minimum level to emit
+        fmt: "text" or "json"
+        queued: Write from a listener thread instead of the calling thread
+        rate_limit: Records per second per call site below WARNING (0 disables)
+
+    Returns:
+        logging.Logger: The configured logger
+    """
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
     # Create file handler
     file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=5)
-    file_handler.setLevel(level)
-
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
+    formatter = make_formatter(fmt)
+    for handler in (file_handler, console_handler):
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
 
-    # Create formatter and add it to the handlers
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    if queued:
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        listener = QueueListener(records, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        handlers = [_QueueHandler(records)]
+    else:
+        handlers = [file_handler, console_handler]
 
-    # Add the handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # On the attached handlers so child loggers are limited too, and dropped records never reach the queue
+    limiter = RateLimitFilter(rate_limit, LOG_RATE_BURST) if rate_limit > 0 else None
+    for handler in handlers:
+        if limiter is not None:
+            handler.addFilter(limiter)
+        logger.addHandler(handler)
 
     return logger
 
+
+@atexit.register
+def stop_logging() -> None:
+    """Flush queued records and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
 # Create loggers for different modules
 logger = setup_logger('bot-ai-v2', os.path.join(log_dir, 'bot-ai-v2.log'))
 
@@ -42,4 +191,3 @@ logger = setup_logger('bot-ai-v2', os.path.join(log_dir, 'bot-ai-v2.log'))
 def log_info(message):
     """Log an info message."""
     logger.info(message)
-
@@ -0,0 +1,219 @@
+"""
+Minimal Prometheus instrumentation with pre-bound label sets.
+
+`labels(...)` is meant to be called once, at import or construction time;
+the bound child it returns only increments preallocated numbers on the hot
+path. Updates rely on the GIL rather than locks, so a scrape may observe a
+histogram mid-update, which Prometheus tolerates.
+"""
+import bisect
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Default latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        registry.register(self)
+
+    def labels(self, *values: str):
+        """Return the child for a label set, creating it on first use."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, values)} {child.value}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child: _HistogramChild) -> List[str]:
+        lines = []
+        running = 0
+        for bound, count in zip((*self.buckets, float("inf")), child.counts):
+            running += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {running}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {child.sum}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- Embeddings ---
+EMBEDDING_SECONDS = Histogram(
+    "obot_embedding_request_seconds", "Latency of embedding API calls.", ("model", "mode")
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "obot_embedding_batch_size", "Texts per embedding API call.", ("model",), buckets=SIZE_BUCKETS
+)
+
+# --- Vector store ---
+VECTOR_STORE_SECONDS = Histogram(
+    "obot_vector_store_seconds", "Latency of vector store operations.", ("backend", "operation")
+)
+CHUNKS_INGESTED = Counter("obot_chunks_ingested_total", "Chunks embedded and stored during ingestion.")
+DOCUMENTS_INGESTED = Counter(
+    "obot_documents_ingested_total", "Documents processed by ingestion.", ("status",)
+)
+
+# --- LLM ---
+LLM_TTFT_SECONDS = Histogram(
+    "obot_llm_time_to_first_token_seconds", "Time from request to first streamed token.", ("provider", "model")
+)
+LLM_STREAM_SECONDS = Histogram(
+    "obot_llm_stream_seconds", "Total duration of LLM streams.", ("provider", "model")
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "obot_llm_tokens_per_second",
+    "Streamed deltas per second after the first token (about one token per delta).",
+    ("provider", "model"),
+    buckets=(1, 5, 10, 20, 40, 60, 80, 120, 160, 240),
+)
+LLM_STREAM_TOKENS = Counter(
+    "obot_llm_stream_tokens_total", "Non-empty deltas streamed from LLM providers.", ("provider", "model")
+)
+LLM_STREAMS_IN_FLIGHT = Gauge("obot_llm_streams_in_flight", "LLM streams currently open.", ("provider",))
+LLM_STREAM_ERRORS = Counter("obot_llm_stream_errors_total", "LLM streams that failed.", ("provider",))
+
+# --- Caches ---
+CACHE_LOOKUPS = Counter("obot_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
@@ -0,0 +1,210 @@
+"""
+On-demand CPU and memory profiling for a running worker.
+
+The CPU profiler samples every thread's Python stack with
+`sys._current_frames()` from a background thread and aggregates the
+samples into collapsed stacks (`frame;frame;frame count`). flamegraph.pl,
+speedscope and inferno read that format directly. The memory profiler
+wraps `tracemalloc`: start it, let traffic run, then diff a new snapshot
+against the baseline.
+
+Nothing runs until an endpoint asks for it: the sampler thread lives only
+for the requested duration, and tracemalloc is only tracing between
+`start` and `stop`.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Leaf frames meaning the thread is parked rather than using CPU
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("handlers.py", "dequeue"),
+}
+
+# Trace noise from the profiler itself and the import system
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a CPU profile is requested while another one is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Semicolons separate frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame) -> List[str]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+class CpuProfiler:
+    """Sampling profiler over all threads; one profile at a time per process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float, include_idle: bool = False) -> Dict[str, object]:
+        """
+        Sample every thread's stack for `seconds`. Blocks, so run it off the event loop.
+
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            include_idle: Keep samples of threads parked in a wait/select/queue get
+
+        Returns:
+            Dict[str, object]: "collapsed" stack text plus sample counts
+
+        Raises:
+            ProfilerBusy: If another profile is in progress
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running")
+        try:
+            stacks: Counter = Counter()
+            names: Dict[int, str] = {}
+            me = threading.get_ident()
+            ticks = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_at = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                frames = sys._current_frames()
+                for ident, frame in frames.items():
+                    if ident == me or (not include_idle and _is_idle(frame)):
+                        continue
+                    name = names.get(ident)
+                    if name is None:
+                        # Refresh on unseen idents only; threads are rarely created mid-profile
+                        names.update((t.ident, t.name) for t in threading.enumerate())
+                        name = names.get(ident, f"thread-{ident}")
+                    stacks[";".join([name.replace(";", ":"), *_stack(frame)])] += 1
+                # Don't keep other threads' frames (and their locals) alive between samples
+                frames = frame = None
+                ticks += 1
+                next_at += interval
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+            elapsed = time.perf_counter() - started
+        finally:
+            self._lock.release()
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return {
+            "collapsed": collapsed + "\n" if collapsed else "",
+            "ticks": ticks,
+            "samples": sum(stacks.values()),
+            "seconds": elapsed,
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc baseline and diff, for allocation hot spots between two points in time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_at: Optional[float] = None
+
+    def start(self, frames: int) -> Dict[str, object]:
+        """Start tracing (or restart with a new baseline) keeping `frames` frames per allocation."""
+        with self._lock:
+            if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+                tracemalloc.stop()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+            self._started_at = time.time()
+        return self.status()
+
+    def diff(self, limit: int, group_by: str = "lineno", reset: bool = False) -> Dict[str, object]:
+        """
+        Compare a new snapshot with the baseline.
+
+        Args:
+            limit: Number of entries to return, largest growth first
+            group_by: "lineno", "filename" or "traceback"
+            reset: Make the new snapshot the baseline for the next diff
+
+        Returns:
+            Dict[str, object]: Traced totals and the top allocation differences
+
+        Raises:
+            RuntimeError: If tracing has not been started
+        """
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                raise RuntimeError("Memory profiling is not running; start it first")
+            snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+            stats = snapshot.compare_to(self._baseline, group_by)
+            if reset:
+                self._baseline = snapshot
+        top = []
+        for stat in stats[:limit]:
+            entry = {
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+                # Frames run oldest to most recent; the last one did the allocating
+                "location": str(stat.traceback[-1]),
+            }
+            if group_by == "traceback":
+                entry["traceback"] = stat.traceback.format(most_recent_first=True)
+            top.append(entry)
+        return {**self.status(), "group_by": group_by, "top": top}
+
+    def stop(self) -> Dict[str, object]:
+        with self._lock:
+            status = self.status()
+            tracemalloc.stop()
+            self._baseline = None
+            self._started_at = None
+        return status
+
+    def status(self) -> Dict[str, object]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "started_at": self._started_at,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "overhead_kb": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+        }
+
+
+# Process-wide: a profile covers every thread of the worker
+cpu_profiler = CpuProfiler()
+memory_profiler = MemoryProfiler()
@@ -1,6 +1,8 @@
 import os
 import time
 import socket
+import threading
+from typing import Optional
 from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance
 from config.constants import QDRANT_COLLECTION_NAME, EMBEDDING_DIM
@@ -11,8 +13,14 @@ load_dotenv()
 
 DEFAULT_QDRANT_HOST = os.environ.get('QDRANT_HOST', 'localhost')
 DEFAULT_QDRANT_PORT = int(os.environ.get("QDRANT_PORT", "6333"))
+# ":memory:" or a directory runs Qdrant in-process (local mode) instead of
+# connecting to QDRANT_HOST; meant for tests and offline benchmarks
+QDRANT_LOCATION = os.environ.get("QDRANT_LOCATION", "")
 DEFAULT_EMBEDDING_DIM = EMBEDDING_DIM
 AUTO_RECREATE = os.environ.get("QDRANT_AUTO_RECREATE_ON_DIM_MISMATCH", "true").lower() in {"1","true","yes","y"}
+# Takes precedence over AUTO_RECREATE for non-empty collections: keep serving
+# the old vectors while a shadow collection is built, then swap an alias.
+REINDEX_ON_MISMATCH = os.environ.get("QDRANT_REINDEX_ON_DIM_MISMATCH", "false").lower() in {"1","true","yes","y"}
 
 def wait_for_qdrant(host: str = DEFAULT_QDRANT_HOST, port: int = DEFAULT_QDRANT_PORT,
                     retries: int = 10, delay: int = 2) -> None:
@@ -46,6 +54,8 @@ def ensure_collection_exists(client: QdrantClient, collection_name: str,
     """
     logger.info(f"[Qdrant] Using collection '{collection_name}' with expected dim={embedding_dim}")
     existing_collections = {col.name for col in client.get_collections().collections}
+    # After a re-index the serving name is an alias rather than a collection
+    existing_collections |= {alias.alias_name for alias in client.get_aliases().aliases}
     if collection_name in existing_collections:
         # Try to validate vector dimension; if not accessible, just warn
         try:
@@ -64,7 +74,11 @@ def ensure_collection_exists(client: QdrantClient, collection_name: str,
                 msg = (
                     f"Collection '{collection_name}' vector size={size} != expected {embedding_dim}."
                 )
-                if AUTO_RECREATE:
+                if REINDEX_ON_MISMATCH and client.count(collection_name).count > 0:
+                    logger.warning(msg + " Re-indexing into a shadow collection in the background.")
+                    from services.reindex import start_reindex
+                    start_reindex(client, collection_name)
+                elif AUTO_RECREATE:
                     logger.warning(msg + " Recreating collection to match expected dimension.")
                     try:
                         client.delete_collection(collection_name)
@@ -112,4 +126,72 @@ def initialize_qdrant(host: str = DEFAULT_QDRANT_HOST,
     return client
 
 
-client = initialize_qdrant(collection_name=QDRANT_COLLECTION_NAME, embedding_dim=EMBEDDING_DIM)
+_client: Optional[QdrantClient] = None
+_client_lock = threading.Lock()
+
+
+class _SerializedClient:
+    """Runs a local-mode client's calls one at a time.
+
+    Local mode (QDRANT_LOCATION) keeps points in plain Python/numpy structures
+    that are not thread-safe, and searches from executor threads racing with
+    ingestion upserts fail with shape mismatches. A Qdrant server needs none of this.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return call
+
+
+def get_client() -> QdrantClient:
+    """
+    Return the shared Qdrant client, connecting on first use.
+
+    Unlike `initialize_qdrant`, this never sleeps waiting for Qdrant: if the
+    server is unreachable the error propagates and the next call retries.
+
+    Returns:
+        QdrantClient: Initialized and verified client
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            if QDRANT_LOCATION == ":memory:":
+                client = _SerializedClient(QdrantClient(location=":memory:"))
+            elif QDRANT_LOCATION:
+                client = _SerializedClient(QdrantClient(path=QDRANT_LOCATION))
+            else:
+                client = QdrantClient(host=DEFAULT_QDRANT_HOST, port=DEFAULT_QDRANT_PORT)
+            ensure_collection_exists(client, QDRANT_COLLECTION_NAME, EMBEDDING_DIM)
+            _client = client
+            where = QDRANT_LOCATION or f"{DEFAULT_QDRANT_HOST}:{DEFAULT_QDRANT_PORT}"
+            logger.info(f"[OK] Qdrant client ready at {where}")
+    return _client
+
+
+def close_client() -> None:
+    """Close the shared client, if it was ever created."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def __getattr__(name: str):
+    # Keep `from utils.qdrant_db import client` working without connecting at import
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+import math
 from fastapi.responses import JSONResponse
 from typing import Any
 
@@ -36,4 +37,19 @@ def format_error_response(error_message: str, status_code: int = 400) -> JSONRes
             "status": "error",
             "message": error_message
         }
-    )
\ No newline at end of file
+    )
+
+
+def format_rate_limited_response(error_message: str, retry_after: float, status_code: int = 429) -> JSONResponse:
+    """
+    Format a 429 (or 503) response with a Retry-After hint.
+    Args:
+        error_message (str): The error message to include in the response.
+        retry_after (float): Seconds the client should wait before retrying.
+        status_code (int): 429 for rate limits and full queues, 503 for overload.
+    Returns:
+        JSONResponse: A formatted JSON response with a Retry-After header.
+    """
+    response = format_error_response(error_message, status_code=status_code)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
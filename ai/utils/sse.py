@@ -0,0 +1,145 @@
+import asyncio
+import json
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from config.constants import SSE_HEARTBEAT_SECONDS, STREAM_FLUSH_MAX_CHARS, STREAM_FLUSH_MS
+from utils.logger import logger
+from utils.tracing import current_trace
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def wants_sse(request: Request) -> bool:
+    """True when the client asked for Server-Sent Events via its Accept header."""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def format_event(event: str, data: Any) -> str:
+    """Encode one SSE event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def merge_deltas(
+    chunks: AsyncIterator[str],
+    window: float = STREAM_FLUSH_MS / 1000.0,
+    max_chars: int = STREAM_FLUSH_MAX_CHARS,
+    idle: Optional[float] = None,
+) -> AsyncGenerator[Optional[str], None]:
+    """
+    Merge deltas that arrive within `window` seconds into a single write.
+
+    Args:
+        chunks: Upstream text chunks
+        window: Longest a delta is held back waiting for more
+        max_chars: Flush early once this much text is buffered
+        idle: If set, yield None after this many idle seconds (for heartbeats)
+
+    Returns:
+        AsyncGenerator[Optional[str], None]: Merged text, or None on idle
+    """
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    buffer: List[str] = []
+    size = 0
+    flush_at = 0.0
+    try:
+        while True:
+            timeout = max(0.0, flush_at - loop.time()) if buffer else idle
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if pending in done:
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    break
+                except Exception:
+                    # Deliver what was produced before surfacing the failure
+                    if buffer:
+                        yield "".join(buffer)
+                        buffer = []
+                    raise
+                pending = asyncio.ensure_future(iterator.__anext__())
+                if not chunk:
+                    continue
+                if not buffer:
+                    flush_at = loop.time() + window
+                buffer.append(chunk)
+                size += len(chunk)
+                if size < max_chars and window > 0:
+                    continue
+            elif not buffer:
+                yield None
+                continue
+            yield "".join(buffer)
+            buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except BaseException:
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def text_stream(chunks: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+    """Plain-text stream for older clients, with tiny deltas merged per write."""
+    async for text in merge_deltas(chunks):
+        if text:
+            yield text
+
+
+async def sse_stream(
+    chunks: AsyncIterator[str],
+    sources: Optional[List[Dict[str, Any]]] = None,
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncGenerator[str, None]:
+    """
+    Encode a chat stream as typed Server-Sent Events.
+
+    Emits `sources` first (when there are any), then `token` events, and ends
+    with `done` (carrying the request's stage timings), or `error` if the
+    upstream fails. Comment lines are sent
+    while the upstream is idle so proxies keep the connection open.
+    """
+    if sources:
+        yield format_event("sources", sources)
+    produced = 0
+    try:
+        async for text in merge_deltas(chunks, idle=heartbeat):
+            if text is None:
+                yield ": keep-alive\n\n"
+                continue
+            produced += len(text)
+            yield format_event("token", {"text": text})
+    except Exception as e:
+        logger.error(f"SSE stream failed after {produced} chars: {e}")
+        yield format_event("error", {"message": str(e)})
+        return
+    done: Dict[str, Any] = {"chars": produced}
+    trace = current_trace()
+    if trace is not None:
+        done["timing"] = trace.summary()
+    yield format_event("done", done)
+
+
+def chat_streaming_response(request: Request, chunks: AsyncIterator[str]) -> StreamingResponse:
+    """Stream chat chunks as SSE when the client accepts it, else as text/plain."""
+    if wants_sse(request):
+        return StreamingResponse(
+            sse_stream(chunks, getattr(chunks, "sources", None)),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+    return StreamingResponse(text_stream(chunks), media_type="text/plain")
@@ -0,0 +1,40 @@
+import re
+from functools import lru_cache
+
+from config.constants import CONTEXT_TOKENIZER
+from utils.logger import logger
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a heuristic count
+    tiktoken = None
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        logger.info("tiktoken not installed; using heuristic token counts")
+        return None
+    try:
+        return tiktoken.get_encoding(CONTEXT_TOKENIZER)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer '{CONTEXT_TOKENIZER}': {e}; using heuristic token counts")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in a text, caching results for repeated chunks.
+
+    Uses tiktoken when available; otherwise estimates from word and
+    punctuation counts (about 4/3 tokens per word for English text).
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(_WORD_RE.findall(text)) * 4 + 2) // 3
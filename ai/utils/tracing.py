@@ -0,0 +1,173 @@
+"""
+Lightweight per-request stage timing.
+
+A `Trace` lives in a context variable for the duration of one request and
+accumulates the wall time of named stages (embed, search, context, llm_ttft,
+...). Stages are reported in a `Server-Timing` header, in the final SSE
+event of chat streams, and, when TRACING_OTEL_ENABLED is set and the
+OpenTelemetry SDK is installed, as OpenTelemetry spans.
+
+Outside a traced request `span` and `mark` cost a context-variable lookup.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config.constants import TRACING_OTEL_ENABLED, TRACING_SLOW_SECONDS
+from utils.logger import logger
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional: stage timing works without the exporter
+    otel_trace = None
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Stage durations for one request, aggregated by stage name."""
+
+    __slots__ = ("name", "started", "stages")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        # name -> [total seconds, count]; insertion order is first-seen order
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> Dict[str, object]:
+        """Stage durations in milliseconds, plus the request's total so far."""
+        stages = {}
+        for stage, (seconds, count) in self.stages.items():
+            stages[stage] = {"ms": round(seconds * 1000, 2), "count": count} if count > 1 else round(seconds * 1000, 2)
+        return {"total_ms": round(self.elapsed() * 1000, 2), "stages": stages}
+
+    def server_timing(self) -> str:
+        """Render completed stages as a Server-Timing header value."""
+        entries = []
+        for stage, (seconds, count) in self.stages.items():
+            entry = f"{stage};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count}x"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_trace(name: str) -> Tuple[Trace, contextvars.Token]:
+    """Make a new trace current; pass the token to `end_trace`."""
+    trace = Trace(name)
+    return trace, _current.set(trace)
+
+
+def end_trace(trace: Trace, token: contextvars.Token) -> None:
+    _current.reset(token)
+    elapsed = trace.elapsed()
+    if TRACING_SLOW_SECONDS and elapsed >= TRACING_SLOW_SECONDS:
+        logger.warning(f"🐢 Slow request {trace.name} ({elapsed:.2f}s): {trace.summary()['stages']}")
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@lru_cache(maxsize=1)
+def _tracer():
+    """OpenTelemetry tracer, or None when exporting is disabled or unavailable."""
+    if not TRACING_OTEL_ENABLED:
+        return None
+    if otel_trace is None:
+        logger.warning("TRACING_OTEL_ENABLED is set but opentelemetry is not installed; spans are not exported")
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.warning(f"OpenTelemetry SDK or OTLP exporter missing ({e}); spans are not exported")
+        return None
+    # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+    provider = TracerProvider(resource=Resource.create({"service.name": "obot-ai"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    otel_trace.set_tracer_provider(provider)
+    logger.info("OpenTelemetry span export enabled")
+    return otel_trace.get_tracer("obot")
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a block as a stage of the current request."""
+    trace = _current.get()
+    tracer = _tracer()
+    if trace is None and tracer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        if tracer is not None:
+            with tracer.start_as_current_span(stage, attributes=attributes):
+                yield
+        else:
+            yield
+    finally:
+        if trace is not None:
+            trace.add(stage, time.perf_counter() - started)
+
+
+def mark(stage: str, seconds: float, **attributes) -> None:
+    """Record a stage measured elsewhere that ended just now (e.g. time to first token)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+    tracer = _tracer()
+    if tracer is not None:
+        end = time.time_ns()
+        tracer.start_span(stage, start_time=end - int(seconds * 1e9), attributes=attributes).end(end_time=end)
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace per HTTP request and adding `Server-Timing`.
+
+    The header carries the stages finished before the response started;
+    streamed chat responses report the rest in their final SSE event.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace, token = start_trace(f"{scope['method']} {scope['path']}")
+        tracer = _tracer()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if tracer is not None:
+                with tracer.start_as_current_span(trace.name, kind=otel_trace.SpanKind.SERVER):
+                    await self.app(scope, receive, send_with_timing)
+            else:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            end_trace(trace, token)